@@ -1,5 +1,6 @@
-from fastapi import APIRouter
-from app.services.monitoring_service import get_monitoring_info
+from fastapi import APIRouter, Query
+from app.core.config import settings
+from app.services.monitoring_service import get_monitoring_info, telemetry_sampler
 
 router = APIRouter(prefix="/monitoring", tags=["Monitoring"])
 
@@ -7,3 +8,11 @@ router = APIRouter(prefix="/monitoring", tags=["Monitoring"])
 @router.get("")
 def monitoring():
     return get_monitoring_info()
+
+
+@router.get("/history")
+def monitoring_history(
+    window: float = Query(300, gt=0, le=settings.MONITORING_HISTORY_SECONDS),
+    points: int = Query(60, ge=1, le=1000)
+):
+    return telemetry_sampler.history(window, points)
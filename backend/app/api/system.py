@@ -1,8 +1,11 @@
-from fastapi import APIRouter
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from app.core.config import load_user_settings, save_user_settings
-from app.services.ollama_service import ollama_service
-from app.core.logger import logger, LOG_FILE
-import os
+from app.services.health_service import health_monitor
+from app.services.log_service import log_reader, LogFilter, LogReader
+from app.core.logger import logger
 
 router = APIRouter()
 
@@ -13,7 +16,10 @@ async def get_settings():
 
 @router.post("/settings")
 async def update_settings(new_settings: dict):
-    save_user_settings(new_settings)
+    try:
+        save_user_settings(new_settings)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     logger.info("Paramètres utilisateur mis à jour")
     return {"message": "Configuration mise à jour"}
 
@@ -23,33 +29,62 @@ async def update_settings(new_settings: dict):
 async def health_check():
     """
     Vérifie si Ollama est en ligne.
-    Retourne 200 si OK, 503 si Ollama KO.
+    Réponse issue de la sonde en arrière-plan (voir HealthMonitor).
     """
-    is_ollama_alive = await ollama_service.check_connection()
-    
-    status = "healthy" if is_ollama_alive else "degraded"
-    
-    return {
-        "status": status,
-        "checks": {
-            "backend": "ok", # Si on répond à cette route, c'est que FastAPI tourne
-            "ollama": "ok" if is_ollama_alive else "unreachable"
-        }
-    }
+    return await health_monitor.current()
 
 @router.get("/logs")
-async def get_logs(limit: int = 100):
+async def get_logs(
+    limit: int = Query(100, ge=1, le=5000),
+    cursor: Optional[str] = None,
+    level: Optional[str] = None,
+    contains: Optional[str] = None
+):
     """
-    Retourne les dernières lignes du fichier de log pour la console UI.
+    Retourne les dernières lignes du fichier de log pour la console UI,
+    ou seulement les nouvelles lignes depuis `cursor`.
     """
-    if not os.path.exists(LOG_FILE):
-        return {"logs": ["Log file not found yet."]}
-        
     try:
-        with open(LOG_FILE, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            # On retourne les N dernières lignes
-            return {"logs": lines[-limit:]}
+        if cursor:
+            lines, next_cursor, reset, truncated = await asyncio.to_thread(log_reader.read_since, cursor, level, contains)
+            skipped = max(0, len(lines) - limit)
+            return {"logs": lines[skipped:], "cursor": next_cursor, "reset": reset,
+                    "truncated": truncated or skipped > 0, "skipped": skipped}
+        lines, next_cursor = await asyncio.to_thread(log_reader.tail, limit, level, contains)
+        return {"logs": lines, "cursor": next_cursor, "reset": False, "truncated": False, "skipped": 0}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Erreur lecture logs: {e}")
-        return {"logs": ["Error reading logs"]}
\ No newline at end of file
+        return {"logs": ["Error reading logs"], "cursor": cursor, "reset": False, "truncated": False, "skipped": 0}
+
+@router.get("/logs/stream")
+async def follow_logs(
+    request: Request,
+    cursor: Optional[str] = None,
+    level: Optional[str] = None,
+    contains: Optional[str] = None
+):
+    """
+    Mode suivi (SSE) : pousse les nouvelles lignes dès qu'elles sont écrites.
+    """
+    # Reconnexion EventSource : Last-Event-ID est plus récent que le curseur initial
+    cursor = request.headers.get("last-event-id") or cursor
+    try:
+        LogFilter(level, contains)
+        if cursor:
+            LogReader.parse_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def stream():
+        async for event in log_reader.follow(cursor, level, contains):
+            if await request.is_disconnected():
+                break
+            yield event
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,8 +1,21 @@
 import json
 import os
+import sys
+import threading
+import time
+from typing import Optional
+from pydantic import BaseModel, ConfigDict
 # Correction de l'import pour Pydantic V2
 from pydantic_settings import BaseSettings
 
+from app.core.logger import logger
+
+# Dossier backend/ (ou dossier de l'exécutable en mode PyInstaller, comme main.py)
+if getattr(sys, 'frozen', False):
+    BACKEND_DIR = os.path.dirname(os.path.abspath(sys.executable))
+else:
+    BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 class Settings(BaseSettings):
     # --- Paramètres Statiques (Variables d'environnement) ---
     APP_NAME: str = "Horizon AI Core"
@@ -13,8 +26,151 @@ class Settings(BaseSettings):
     CORS_ORIGINS: list = ["http://localhost", "http://localhost:3000", "http://localhost:5173"]
     
     # Ollama settings
-    OLLAMA_BASE_URL: str = "http://localhost:11434"
+    OLLAMA_BASE_URL: str = "http://127.0.0.1:11434"
     OLLAMA_DEFAULT_MODEL: str = "qwen2.5:7b"
+    # Durée de maintien du modèle (et de son cache KV) en mémoire après une requête
+    OLLAMA_KEEP_ALIVE: str = "30m"
+
+    # Pool HTTP vers Ollama (un seul client partagé, voir OllamaService)
+    OLLAMA_POOL_MAX_CONNECTIONS: int = 20
+    OLLAMA_POOL_MAX_KEEPALIVE: int = 10
+    OLLAMA_KEEPALIVE_EXPIRY: float = 30.0
+    OLLAMA_HTTP2: bool = False  # Nécessite le paquet optionnel "h2"
+
+    # Timeouts par opération (secondes)
+    OLLAMA_CONNECT_TIMEOUT: float = 5.0
+    OLLAMA_HEALTH_TIMEOUT: float = 2.0
+    OLLAMA_REQUEST_TIMEOUT: float = 60.0
+
+    # Cache des métadonnées Ollama (secondes) : liste des modèles, détails d'un modèle
+    OLLAMA_TAGS_TTL: float = 5.0
+    OLLAMA_SHOW_TTL: float = 300.0
+
+    # Historique SQLite : FULL = fsync à chaque transaction (regroupées par lot)
+    HISTORY_DB_SYNCHRONOUS: str = "FULL"
+    HISTORY_WRITE_BATCH: int = 256
+    # Chat : intervalle de sauvegarde de la réponse en cours de génération (secondes)
+    CHAT_CHECKPOINT_INTERVAL: float = 2.0
+
+    # Fenêtre de contexte : part de num_ctx réservée au prompt (le reste pour la réponse),
+    # num_ctx par défaut d'Ollama, seuil de déclenchement du résumé (fraction du budget),
+    # messages récents jamais résumés, modèle de résumé ("" = modèle de la conversation)
+    CONTEXT_PROMPT_RATIO: float = 0.75
+    CONTEXT_DEFAULT_NUM_CTX: int = 4096
+    CONTEXT_SUMMARY_TRIGGER: float = 0.5
+    CONTEXT_KEEP_RECENT_MESSAGES: int = 6
+    CONTEXT_SUMMARY_MODEL: str = ""
+    CONTEXT_DIGEST_TTL: float = 30.0
+    # Cache des réponses déterministes (température 0 ou graine fixée), sur disque :
+    # désactivé par défaut, chemin (vide = backend/data/response_cache.db), taille max
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_PATH: str = ""
+    RESPONSE_CACHE_MAX_MB: int = 256
+    # Images jointes au chat : côté le plus long après réduction (0 = aucune ;
+    # nécessite le paquet optionnel "Pillow"), qualité JPEG, taille max acceptée,
+    # cache disque des payloads préparés (chemin vide = backend/data/image_cache)
+    IMAGE_MAX_SIDE: int = 1024
+    IMAGE_JPEG_QUALITY: int = 90
+    IMAGE_MAX_UPLOAD_MB: int = 50
+    IMAGE_CACHE_PATH: str = ""
+    IMAGE_CACHE_MAX_MB: int = 200
+    # Recherche plein texte : nombre de mots dans l'extrait surligné
+    SEARCH_SNIPPET_TOKENS: int = 12
+
+    # Recherche web du chat : backend ("duckduckgo", "fixture" = fichier JSON,
+    # "http" = service local), budget de temps (secondes) et cache TTL + LRU
+    WEB_SEARCH_BACKEND: str = "duckduckgo"
+    WEB_SEARCH_TARGET: str = ""
+    WEB_SEARCH_TIMEOUT: float = 4.0
+    WEB_SEARCH_CACHE_SIZE: int = 128
+    WEB_SEARCH_CACHE_TTL: float = 900.0
+
+    # Monitoring : période d'échantillonnage et profondeur de l'historique (secondes)
+    MONITORING_SAMPLE_INTERVAL: float = 1.0
+    MONITORING_HISTORY_SECONDS: int = 3600
+
+    # Santé d'Ollama : sonde unique en arrière-plan (secondes)
+    HEALTH_PROBE_INTERVAL: float = 5.0
+
+    # Supervision du processus Ollama : lancement si aucun serveur ne répond,
+    # commande ("ollama" du PATH, chemin de l'exécutable ou commande complète),
+    # intervalle des sondes et échecs consécutifs avant relance, délai de
+    # démarrage, backoff entre relances (initial, max ; secondes), arrêt avec le
+    # backend, et attente max d'un chat pendant une relance (au-delà : 503)
+    OLLAMA_AUTOSTART: bool = True
+    OLLAMA_BINARY: str = "ollama"
+    OLLAMA_SUPERVISOR_INTERVAL: float = 5.0
+    OLLAMA_SUPERVISOR_FAILURES: int = 3
+    OLLAMA_START_TIMEOUT: float = 30.0
+    OLLAMA_RESTART_BACKOFF: float = 1.0
+    OLLAMA_RESTART_BACKOFF_MAX: float = 60.0
+    OLLAMA_STOP_ON_EXIT: bool = True
+    CHAT_OLLAMA_WAIT: float = 15.0
+
+    # Canal d'événements SSE : taille de file par client et keep-alive (secondes)
+    EVENTS_QUEUE_SIZE: int = 256
+    EVENTS_KEEPALIVE: float = 15.0
+
+    # Téléchargements de modèles : parallélisme, taille de la file d'attente,
+    # fenêtre de calcul du débit, cadence des événements / sauvegardes (secondes)
+    PULL_MAX_CONCURRENT: int = 2
+    PULL_MAX_QUEUED: int = 16
+    PULL_RATE_WINDOW: float = 5.0
+    PULL_PUBLISH_INTERVAL: float = 0.25
+    PULL_PERSIST_INTERVAL: float = 2.0
+    PULL_HISTORY_SIZE: int = 50
+
+    # Résidence des modèles en VRAM : nombre de modèles préchargés au démarrage
+    # (modèle par défaut puis les plus utilisés, 0 = aucun), keep_alive des modèles
+    # préchargés (négatif = jusqu'à éviction), VRAM utilisable (0 = lue par
+    # gpu_service) et part réservée aux modèles, attente d'Ollama au démarrage,
+    # durée de validité de la table /api/ps mise en cache (secondes)
+    RESIDENCY_PRELOAD: int = 1
+    RESIDENCY_PINNED_KEEP_ALIVE: str = "-1m"
+    RESIDENCY_VRAM_MB: int = 0
+    RESIDENCY_VRAM_RATIO: float = 0.9
+    RESIDENCY_STARTUP_TIMEOUT: float = 60.0
+    RESIDENCY_REFRESH_TTL: float = 5.0
+
+    # Compatibilité matériel / modèles : durée de validité du profil matériel
+    # (secondes) et part de la RAM utilisable pour les couches déchargées sur CPU
+    COMPAT_HARDWARE_TTL: float = 300.0
+    COMPAT_RAM_RATIO: float = 0.8
+
+    # Benchmarks de modèles : historique (chemin vide = backend/data/benchmarks.jsonl),
+    # vagues par cellule, tokens générés par requête, seuil de régression (écart relatif)
+    BENCHMARK_PATH: str = ""
+    BENCHMARK_REPEAT: int = 3
+    BENCHMARK_MAX_TOKENS: int = 128
+    BENCHMARK_REGRESSION_THRESHOLD: float = 0.1
+
+    # Traçage des requêtes (étapes du chat, cascade par requête) : désactivé par
+    # défaut, activable à chaud ; nombre de traces gardées en mémoire. Profileur
+    # par échantillonnage : intervalle (secondes), requêtes max par capture
+    TRACING_ENABLED: bool = False
+    TRACING_BUFFER_SIZE: int = 200
+    PROFILER_INTERVAL: float = 0.005
+    PROFILER_MAX_REQUESTS: int = 100
+
+    # Ordonnanceur des générations : créneaux simultanés (total, par modèle),
+    # taille de la file d'attente (au-delà : 429) et délai au bout duquel une
+    # requête en attente passe devant le regroupement par modèle (secondes)
+    SCHEDULER_MAX_ACTIVE: int = 4
+    SCHEDULER_MODEL_CONCURRENCY: int = 2
+    SCHEDULER_MAX_QUEUED: int = 32
+    SCHEDULER_AGING: float = 10.0
+
+    # Console : intervalle de scrutation du fichier de log en mode suivi (secondes)
+    LOGS_FOLLOW_INTERVAL: float = 0.5
+
+    # Dossier des données (historique, téléchargements, caches, logs, réglages) :
+    # vide = backend/data. Lu aussi par app.core.logger, importé avant ce module.
+    DATA_PATH: str = ""
+
+    # Réglages utilisateur : chemin (vide = <données>/user_settings.json) et
+    # intervalle minimal entre deux vérifications du mtime
+    USER_SETTINGS_PATH: str = ""
+    USER_SETTINGS_REVALIDATE_INTERVAL: float = 2.0
 
     class Config:
         env_file = ".env"
@@ -23,37 +179,103 @@ class Settings(BaseSettings):
 # Initialisation des paramètres système
 settings = Settings()
 
+# Dossier des données : chemin absolu (backend/data, ou à côté de l'exécutable en
+# mode PyInstaller) ne dépendant pas du dossier depuis lequel le processus a été lancé
+DATA_DIR = settings.DATA_PATH or os.path.join(BACKEND_DIR, "data")
+
 # --- Gestion des Paramètres Utilisateur (Dynamiques) ---
-# Ce fichier sera créé dans le dossier 'data' à la racine de ton projet
-USER_SETTINGS_PATH = "data/user_settings.json"
+USER_SETTINGS_PATH = settings.USER_SETTINGS_PATH or os.path.join(DATA_DIR, "user_settings.json")
+
+class UserSettings(BaseModel):
+    """Schéma des réglages utilisateur (les clés inconnues sont conservées)."""
+    model_config = ConfigDict(extra="allow")
+
+    language: str = "fr"
+    internetAccess: bool = False
+    runAtStartup: bool = False
+    userName: str = "Admin"
+    autoUpdate: bool = True
+    ollama_models_path: Optional[str] = None
+
+class UserSettingsStore:
+    """
+    Cache mémoire des réglages utilisateur.
+    Lecture : aucun accès disque, sauf un stat (mtime/taille) au plus toutes les
+    USER_SETTINGS_REVALIDATE_INTERVAL secondes pour détecter une édition externe.
+    Écriture : validation, fichier temporaire puis renommage atomique ; la nouvelle
+    valeur est visible immédiatement par les lecteurs.
+    """
+
+    def __init__(self, path: str, revalidate_interval: float):
+        self.path = path
+        self.revalidate_interval = revalidate_interval
+        self._data: Optional[dict] = None
+        self._stamp = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def validate(data: dict) -> dict:
+        """Complète les valeurs manquantes ; lève ValueError si un type est invalide."""
+        return UserSettings.model_validate(data).model_dump(exclude_none=True)
+
+    @staticmethod
+    def _stamp_of(stat: os.stat_result):
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _reload(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._write(self.validate({}))
+            return
+
+        if self._data is not None and self._stamp == self._stamp_of(stat):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._data = self.validate(json.load(f))
+        except Exception as e:
+            logger.warning(f"⚠️ Réglages utilisateur invalides, valeurs par défaut utilisées : {e}")
+            self._data = self.validate({})
+        self._stamp = self._stamp_of(stat)
+
+    def _write(self, data: dict):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._data = data
+        self._stamp = self._stamp_of(os.stat(self.path))
+
+    def get(self) -> dict:
+        now = time.monotonic()
+        if self._data is None or now - self._checked_at >= self.revalidate_interval:
+            with self._lock:
+                self._reload()
+                self._checked_at = now
+        return dict(self._data)
+
+    def save(self, data: dict) -> dict:
+        validated = self.validate(data)
+        with self._lock:
+            self._write(validated)
+            self._checked_at = time.monotonic()
+        return dict(validated)
+
+user_settings_store = UserSettingsStore(USER_SETTINGS_PATH, settings.USER_SETTINGS_REVALIDATE_INTERVAL)
 
 def get_default_user_settings():
     """Paramètres par défaut au premier lancement."""
-    return {
-        "language": "fr",
-        "internetAccess": False,
-        "runAtStartup": False,
-        "userName": "Admin",
-        "autoUpdate": True
-    }
+    return UserSettingsStore.validate({})
 
 def load_user_settings():
-    """Charge les réglages depuis le JSON ou renvoie les défauts."""
-    # Création du chemin absolu pour éviter les erreurs de dossier
-    if not os.path.exists(USER_SETTINGS_PATH):
-        os.makedirs(os.path.dirname(USER_SETTINGS_PATH), exist_ok=True)
-        save_user_settings(get_default_user_settings())
-        return get_default_user_settings()
-    
-    try:
-        with open(USER_SETTINGS_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return get_default_user_settings()
+    """Renvoie les réglages depuis le cache mémoire (revalidé par mtime)."""
+    return user_settings_store.get()
 
 def save_user_settings(data: dict):
-    """Sauvegarde les réglages modifiés par l'utilisateur."""
-    # S'assurer que le dossier existe avant de sauvegarder
-    os.makedirs(os.path.dirname(USER_SETTINGS_PATH), exist_ok=True)
-    with open(USER_SETTINGS_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
\ No newline at end of file
+    """Valide et sauvegarde les réglages modifiés par l'utilisateur."""
+    return user_settings_store.save(data)
@@ -5,8 +5,9 @@ from logging.handlers import RotatingFileHandler
 
 # Définir le chemin du dossier de logs relatif à ce fichier
 # Remonte de 'backend/app/core/' vers la racine 'backend/' puis 'data/logs'
+# (ou <DATA_PATH>/logs : variable lue ici directement, la configuration importe ce module)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-LOG_DIR = os.path.join(BASE_DIR, "data", "logs")
+LOG_DIR = os.path.join(os.environ.get("DATA_PATH") or os.path.join(BASE_DIR, "data"), "logs")
 
 # Créer le dossier si inexistant
 os.makedirs(LOG_DIR, exist_ok=True)
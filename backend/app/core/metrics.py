@@ -0,0 +1,246 @@
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Format d'exposition texte de Prometheus (lu par Prometheus, VictoriaMetrics, Grafana Agent...)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STREAM_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+WRITE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500)
+
+_REGISTRY: List["_Metric"] = []
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class _GaugeValue(_CounterValue):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Dernière case : +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class _Metric:
+    """
+    Métrique et ses séries (une par combinaison de labels). Pas de verrou :
+    chaque métrique n'est mise à jour que depuis un seul thread (boucle asyncio,
+    ou thread d'écriture de l'historique), une mise à jour coûte une addition.
+    """
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}   # Labels (texte) -> série
+        self._lookup: Dict[Tuple, object] = {}               # Valeurs telles que passées -> série
+        _REGISTRY.append(self)
+
+    def _new(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        series = self._lookup.get(values)
+        if series is None:
+            # Première fois : conversion en texte (200 et "200" donnent la même série)
+            key = tuple(str(v) for v in values)
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = self._new()
+            self._lookup[values] = series
+        return series
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_format_value(s.value)}"
+                for key, s in list(self._series.items())]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new(self):
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """Valeur instantanée ; avec `function`, lue au moment du scrape (rien sur le chemin chaud)."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def _new(self):
+        return _GaugeValue()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def _samples(self) -> List[str]:
+        if self.function is not None:
+            return [f"{self.name} {_format_value(self.function())}"]
+        return super()._samples()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, s in list(self._series.items()):  # Copie : une série peut apparaître pendant le scrape
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), s.counts):
+                cumulative += count
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(s.sum)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    """Toutes les métriques au format texte de Prometheus."""
+    lines = []
+    for metric in _REGISTRY:
+        try:
+            lines += metric.render()
+        except Exception:
+            continue  # Une sonde (Gauge function) en erreur ne casse pas le scrape
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    Latence des requêtes HTTP par route (gabarit FastAPI, pas le chemin brut :
+    cardinalité bornée), mesurée jusqu'à l'envoi des en-têtes de la réponse.
+    La durée des flux SSE est suivie à part (horizon_chat_stream_duration_seconds).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        recorded = False
+
+        def record(status):
+            nonlocal recorded
+            recorded = True
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, status).observe(time.perf_counter() - start)
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start":
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        except Exception:
+            if not recorded:
+                record(500)
+            raise
+
+
+# --- Métriques du backend ---
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "horizon_http_request_duration_seconds", "Latence des requêtes HTTP (jusqu'aux en-têtes de réponse)",
+    ("method", "route", "status")
+)
+CHAT_TTFT_SECONDS = Histogram(
+    "horizon_chat_ttft_seconds", "Délai entre la requête de chat et le premier token", ("model", "cache")
+)
+CHAT_STREAM_SECONDS = Histogram(
+    "horizon_chat_stream_duration_seconds", "Durée totale d'une réponse de chat streamée", ("model", "cache"),
+    buckets=STREAM_BUCKETS
+)
+CHAT_TOKENS_PER_SECOND = Histogram(
+    "horizon_chat_tokens_per_second", "Vitesse de génération rapportée par Ollama (dernier chunk)", ("model",),
+    buckets=RATE_BUCKETS
+)
+CHAT_TOKENS = Counter("horizon_chat_tokens_total", "Tokens générés par Ollama pour le chat", ("model",))
+CHAT_ACTIVE_STREAMS = Gauge("horizon_chat_active_streams", "Réponses de chat en cours de streaming")
+UPSTREAM_ERRORS = Counter("horizon_ollama_errors_total", "Erreurs des appels à Ollama", ("operation",))
+HISTORY_WRITE_SECONDS = Histogram(
+    "horizon_history_write_seconds", "Délai entre la soumission d'une écriture d'historique et son commit",
+    buckets=WRITE_BUCKETS
+)
+SEARCH_STAGE_SECONDS = Histogram(
+    "horizon_web_search_stage_seconds", "Latence de l'étape de recherche web du chat", ("stage",)
+)
+SEARCH_OUTCOMES = Counter("horizon_web_search_total", "Recherches web par issue", ("outcome",))
+PULL_BYTES = Counter("horizon_pull_bytes_total", "Octets de modèles téléchargés", ("model",))
+PULLS = Counter("horizon_pulls_total", "Téléchargements de modèles terminés", ("status",))
+# Lue au scrape : la fonction est fournie par pull_service (pull_manager.current_rate)
+PULL_RATE = Gauge("horizon_pull_rate_bytes_per_second", "Débit instantané des téléchargements en cours")
@@ -0,0 +1,192 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logger import logger
+
+IDLE = "idle"
+ARMED = "armed"
+RUNNING = "running"
+DONE = "done"
+
+# Fonctions feuilles d'un thread qui attend (boucle asyncio sur select, pool
+# d'exécution ou écrivain SQLite sur leur file) : échantillons comptés à part
+_IDLE_LEAVES = {
+    ("selectors.py", "select"), ("threading.py", "wait"), ("queue.py", "get"),
+    ("thread.py", "_worker"), ("threading.py", "_wait_for_tstate_lock"),
+}
+MAX_DEPTH = 128
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Profileur par échantillonnage, sans dépendance : un thread relève la pile de
+    chaque thread Python (sys._current_frames) toutes les `interval` secondes,
+    uniquement pendant qu'une des N requêtes capturées est en cours. Rien n'est
+    instrumenté : le coût est nul tant qu'aucune capture n'est armée.
+
+    Le rapport donne le temps propre / cumulé par fonction et les piles repliées
+    ("thread;f1;f2 N"), lisibles par flamegraph.pl ou speedscope. Les requêtes
+    concurrentes partagent la boucle asyncio : leurs échantillons sont mêlés.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._reset(0, settings.PROFILER_INTERVAL)
+        self.capture = 0       # Numéro de la capture en cours (une requête d'une capture remplacée l'ignore)
+        self.status = IDLE
+
+    def _reset(self, requests: int, interval: float):
+        self.requests = requests
+        self.interval = interval
+        self.started = 0       # Requêtes capturées (commencées)
+        self.active = 0        # Requêtes capturées en cours
+        self.trace_ids: List[str] = []
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.idle = 0          # Piles de threads en attente (non comptées)
+        self.started_at = None
+        self.finished_at = None
+        self.sampling_seconds = 0.0
+
+    @property
+    def armed(self) -> bool:
+        return self.status in (ARMED, RUNNING) and self.started < self.requests
+
+    # --- Capture ---
+
+    def arm(self, requests: int, interval: Optional[float] = None) -> Dict:
+        """Capture les `requests` prochaines requêtes ; remplace une capture précédente."""
+        if not 1 <= requests <= settings.PROFILER_MAX_REQUESTS:
+            raise ValueError(f"Nombre de requêtes invalide (1 à {settings.PROFILER_MAX_REQUESTS})")
+        interval = interval or settings.PROFILER_INTERVAL
+        if not 0.001 <= interval <= 1:
+            raise ValueError("Intervalle d'échantillonnage invalide (0.001 à 1 s)")
+        with self._lock:
+            self._reset(requests, interval)
+            self.capture += 1
+            self.status = ARMED
+        self._ensure_thread()
+        logger.info(f"🔬 Profileur armé pour {requests} requête(s) ({interval * 1000:g} ms)")
+        return self.report(stacks=False)
+
+    def cancel(self):
+        with self._lock:
+            if self.status in (ARMED, RUNNING):
+                self.status = DONE
+                self.finished_at = time.time()
+
+    def begin(self, trace_id: str) -> int:
+        """Début d'une requête : numéro de la capture dont elle fait partie, 0 sinon."""
+        with self._lock:
+            if not self.armed:
+                return 0
+            self.started += 1
+            self.active += 1
+            self.trace_ids.append(trace_id)
+            if self.status == ARMED:
+                self.status = RUNNING
+                self.started_at = time.time()
+            return self.capture
+
+    def end(self, capture: int):
+        with self._lock:
+            if capture != self.capture:
+                return
+            self.active -= 1
+            if self.active == 0 and self.started >= self.requests and self.status == RUNNING:
+                self.status = DONE
+                self.finished_at = time.time()
+                logger.info(f"🔬 Capture terminée : {self.samples} échantillons sur {self.started} requête(s)")
+
+    # --- Échantillonnage ---
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="horizon-profiler", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        me = threading.get_ident()
+        while self.status in (ARMED, RUNNING):
+            if self.active:
+                started = time.perf_counter()
+                self._sample(me)
+                self.sampling_seconds += time.perf_counter() - started
+            time.sleep(self.interval)
+
+    def _sample(self, me: int):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            leaf = frame.f_code
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            stacks.append((names.get(ident, str(ident)), leaf, stack))
+        with self._lock:
+            if self.status != RUNNING:
+                return
+            self.samples += 1
+            for thread, leaf, stack in stacks:
+                if (os.path.basename(leaf.co_filename), leaf.co_name) in _IDLE_LEAVES:
+                    self.idle += 1
+                    continue
+                self.stacks[(thread,) + tuple(reversed(stack))] += 1
+
+    # --- Rapport ---
+
+    def collapsed(self) -> str:
+        """Piles repliées (une ligne par pile, racine en premier)."""
+        with self._lock:
+            items = list(self.stacks.items())
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(items))
+
+    def report(self, stacks: bool = True, top: int = 30) -> Dict:
+        with self._lock:
+            items = list(self.stacks.items())
+            report = {
+                "status": self.status,
+                "requests": self.requests,
+                "captured": self.started,
+                "in_flight": self.active,
+                "trace_ids": list(self.trace_ids),
+                "interval_ms": round(self.interval * 1000, 2),
+                "samples": self.samples,
+                "idle_stacks": self.idle,
+                "sampling_overhead_ms": round(self.sampling_seconds * 1000, 1),
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+        if not stacks:
+            return report
+        own, total, threads = Counter(), Counter(), Counter()
+        for stack, count in items:
+            threads[stack[0]] += count
+            own[stack[-1]] += count
+            for name in set(stack[1:]):  # Récursion : une fois par pile
+                total[name] += count
+        samples = sum(count for _, count in items) or 1
+        report["functions"] = [
+            {"function": name, "self": own[name], "total": count,
+             "self_pct": round(100 * own[name] / samples, 1), "total_pct": round(100 * count / samples, 1)}
+            for name, count in sorted(total.items(), key=lambda item: (own[item[0]], item[1]), reverse=True)[:top]
+        ]
+        report["threads"] = dict(threads.most_common())
+        return report
+
+
+# Singleton
+sampling_profiler = SamplingProfiler()
@@ -0,0 +1,153 @@
+import importlib.abc
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+def _timed(fullname: str) -> bool:
+    # Modules de l'application et paquets tiers (niveau racine) : pas la stdlib
+    if fullname.startswith("app."):
+        return True
+    return "." not in fullname and fullname not in sys.stdlib_module_names
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    Finder placé en tête de sys.meta_path : ne trouve rien lui-même, mesure
+    exec_module sur le loader trouvé (imports imbriqués compris). Le loader
+    n'est pas remplacé : module.__loader__ reste celui d'origine.
+    """
+
+    def __init__(self):
+        self.modules: Dict[str, tuple] = {}   # Module -> (total, propre) en secondes
+        self._local = threading.local()       # Pile des temps des imports imbriqués, par thread
+
+    def find_spec(self, fullname, path, target=None):
+        if not _timed(fullname):
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            self._wrap(spec.loader)
+        return spec
+
+    def _wrap(self, loader):
+        """exec_module mesuré le temps d'un import, posé sur l'instance puis retiré."""
+        attrs = getattr(loader, "__dict__", None)
+        if attrs is None or isinstance(loader, type) or "exec_module" in attrs:
+            return  # Loader de classe (builtins, frozen) ou déjà mesuré (import imbriqué)
+        original = loader.exec_module
+
+        def exec_module(module):
+            self.enter()
+            started = time.perf_counter()
+            try:
+                original(module)
+            finally:
+                self.leave(module.__name__, time.perf_counter() - started)
+                if attrs.get("exec_module") is exec_module:
+                    del attrs["exec_module"]
+
+        attrs["exec_module"] = exec_module
+
+    def enter(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)  # Temps des imports enfants mesurés
+
+    def leave(self, name: str, duration: float):
+        stack = self._local.stack
+        children = stack.pop()
+        if stack:
+            stack[-1] += duration
+        self.modules[name] = (duration, max(0.0, duration - children))
+
+
+class StartupReport:
+    """
+    Temps de démarrage du backend : import de chaque module (total et propre,
+    comme `python -X importtime`, mais lisible depuis l'API), étapes du
+    démarrage et jalons (démarrage terminé, première réponse de santé, Ollama
+    joignable). Le finder d'import n'est actif que jusqu'à la fin du démarrage.
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.started_at = time.time()
+        self.stages: Dict[str, float] = {}   # Étape -> durée (secondes)
+        self.marks: Dict[str, float] = {}    # Jalon -> secondes depuis t0
+        self.modules: Dict[str, tuple] = {}
+        self._timer: Optional[_ImportTimer] = None
+        self._stage_started: Dict[str, float] = {}
+
+    # --- Mesure ---
+
+    def install(self):
+        if self._timer is None:
+            self._timer = _ImportTimer()
+            self.modules = self._timer.modules
+            sys.meta_path.insert(0, self._timer)
+
+    def uninstall(self):
+        if self._timer is not None:
+            try:
+                sys.meta_path.remove(self._timer)
+            except ValueError:
+                pass
+            self._timer = None
+
+    def begin(self, stage: str):
+        self._stage_started[stage] = time.perf_counter()
+
+    def end(self, stage: str):
+        started = self._stage_started.pop(stage, None)
+        if started is not None:
+            self.stages[stage] = time.perf_counter() - started
+
+    def mark(self, name: str):
+        """Jalon : seule la première occurrence compte."""
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.t0
+
+    # --- Rapport ---
+
+    def _process_age(self) -> Optional[float]:
+        """Délai entre le lancement du processus (interpréteur) et t0."""
+        try:
+            import psutil
+            return max(0.0, self.started_at - psutil.Process().create_time())
+        except Exception:
+            return None
+
+    def slowest(self, limit: int = 20) -> List[Dict]:
+        modules = sorted(list(self.modules.items()), key=lambda item: item[1][0], reverse=True)
+        return [{"module": name, "total_ms": round(total * 1000, 1), "self_ms": round(own * 1000, 1)}
+                for name, (total, own) in modules[:limit]]
+
+    def to_dict(self, limit: int = 20) -> Dict:
+        process_age = self._process_age()
+        return {
+            "started_at": self.started_at,
+            "interpreter_ms": round(process_age * 1000, 1) if process_age is not None else None,
+            "stages_ms": {name: round(d * 1000, 1) for name, d in self.stages.items()},
+            "marks_ms": {name: round(t * 1000, 1) for name, t in self.marks.items()},
+            "modules_timed": len(self.modules),
+            "imports": self.slowest(limit),
+        }
+
+    def summary(self) -> str:
+        parts = [f"{name} {d * 1000:.0f} ms" for name, d in self.stages.items()]
+        slowest = ", ".join(f"{m['module']} {m['total_ms']:.0f}" for m in self.slowest(3))
+        return " | ".join(parts) + (f" | imports les plus lents (ms) : {slowest}" if slowest else "")
+
+
+# Singleton
+startup_report = StartupReport()
@@ -0,0 +1,213 @@
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.profiler import sampling_profiler
+
+# Routes jamais tracées : la consultation des traces ne doit pas remplir le tampon
+_UNTRACED_PREFIXES = ("/metrics", "/api/v1/debug/")
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("horizon_trace", default=None)
+
+
+class Trace:
+    """Cascade d'une requête : étapes (début, durée) relatives à son arrivée."""
+    __slots__ = ("id", "method", "path", "route", "status", "started_at", "t0",
+                 "headers", "duration", "profiled", "spans")
+
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.route = None
+        self.status = None
+        self.started_at = time.time()
+        self.t0 = time.perf_counter()
+        self.headers = None    # Envoi des en-têtes (secondes depuis l'arrivée)
+        self.duration = None   # Dernier octet du corps (flux SSE compris)
+        self.profiled = False
+        self.spans: List[tuple] = []  # (nom, début, fin, attributs) en perf_counter
+
+    def add(self, name: str, start: float, end: float, attrs: Optional[Dict] = None):
+        self.spans.append((name, start, end, attrs))
+
+    def to_dict(self) -> Dict:
+        spans, open_ends = [], []
+        # Profondeur déduite de l'inclusion des intervalles (pas de pile à maintenir
+        # entre les await, ni de contextvar à restaurer dans les générateurs)
+        for name, start, end, attrs in sorted(self.spans, key=lambda s: (s[1], -s[2])):
+            while open_ends and open_ends[-1] < end:
+                open_ends.pop()
+            spans.append({
+                "name": name,
+                "start_ms": round((start - self.t0) * 1000, 2),
+                "duration_ms": round((end - start) * 1000, 2),
+                "depth": len(open_ends),
+                **({"attrs": attrs} if attrs else {}),
+            })
+            open_ends.append(end)
+        return {
+            "id": self.id,
+            "method": self.method,
+            "route": self.route,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "headers_ms": round(self.headers * 1000, 2) if self.headers is not None else None,
+            "duration_ms": round(self.duration * 1000, 2) if self.duration is not None else None,
+            "profiled": self.profiled,
+            "spans": spans,
+        }
+
+
+class _Span:
+    __slots__ = ("trace", "name", "attrs", "start")
+
+    def __init__(self, trace: Trace, name: str, attrs: Dict):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.trace.add(self.name, self.start, time.perf_counter(), self.attrs)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class _NoopSpan:
+    """Traçage inactif : un seul objet partagé, rien n'est mesuré ni alloué."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, **attrs):
+    """
+    Étape de la requête en cours : `with span("web_search"):` (aussi autour d'un
+    await). Hors requête tracée, renvoie un objet inerte partagé.
+    """
+    trace = _current.get()
+    if trace is None:
+        return _NOOP
+    return _Span(trace, name, attrs)
+
+
+def record(name: str, start: float, end: Optional[float] = None, **attrs):
+    """Étape déjà mesurée (perf_counter), ex. durées rapportées par Ollama."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, start, time.perf_counter() if end is None else end, attrs or None)
+
+
+class Tracer:
+    """
+    Traces des dernières requêtes (tampon circulaire de TRACING_BUFFER_SIZE).
+    Désactivé, le middleware ne crée rien : une lecture de booléen par requête,
+    un contextvar vide par span. Activable à chaud (POST /api/v1/debug/tracing) ;
+    une capture du profileur trace aussi les requêtes qu'elle échantillonne.
+    """
+
+    def __init__(self, size: Optional[int] = None, enabled: Optional[bool] = None):
+        self.enabled = settings.TRACING_ENABLED if enabled is None else enabled
+        self.traces: Deque[Trace] = deque(maxlen=size or settings.TRACING_BUFFER_SIZE)
+
+    def recent(self, limit: int = 50, route: Optional[str] = None, min_ms: float = 0) -> List[Dict]:
+        """Traces terminées, de la plus récente à la plus ancienne."""
+        traces = []
+        for trace in reversed(list(self.traces)):  # Copie : le tampon bouge pendant le parcours
+            if route and trace.route != route and trace.path != route:
+                continue
+            if (trace.duration or 0) * 1000 < min_ms:
+                continue
+            traces.append(trace.to_dict())
+            if len(traces) >= limit:
+                break
+        return traces
+
+    def get(self, trace_id: str) -> Optional[Dict]:
+        trace = next((t for t in list(self.traces) if t.id == trace_id), None)
+        return trace.to_dict() if trace else None
+
+    def clear(self):
+        self.traces.clear()
+
+    def status(self) -> Dict:
+        return {"enabled": self.enabled, "buffered": len(self.traces), "capacity": self.traces.maxlen}
+
+
+class TracingMiddleware:
+    """
+    Crée la trace de la requête (contextvar visible des routes, services et du
+    générateur de la réponse streamée) ; la trace est rangée dans le tampon au
+    dernier octet du corps, durée des flux SSE comprise.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (tracer.enabled or sampling_profiler.armed):
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        if path.startswith(_UNTRACED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(scope["method"], path)
+        capture = sampling_profiler.begin(trace.id)
+        trace.profiled = bool(capture)
+        token = _current.set(trace)
+        finished = False
+
+        def finish(status):
+            nonlocal finished
+            finished = True
+            trace.duration = time.perf_counter() - trace.t0
+            trace.status = trace.status or status
+            trace.route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            tracer.traces.append(trace)
+
+        async def send_traced(message):
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+                trace.headers = time.perf_counter() - trace.t0
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                await send(message)
+                finish(trace.status)
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_traced)
+        finally:
+            if not finished:
+                finish(500)  # Exception ou client déconnecté avant la fin du corps
+            if capture:
+                sampling_profiler.end(capture)
+            _current.reset(token)
+
+
+# Singleton
+tracer = Tracer()
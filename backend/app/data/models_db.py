@@ -1,20 +1,127 @@
+# Catalogue de modèles de la bibliothèque Ollama proposés au téléchargement.
+# Architecture reprise des métadonnées GGUF (/api/show -> model_info) :
+# nombre de paramètres, couches, dimension, têtes d'attention (et têtes K/V
+# pour le cache KV), longueur de contexte native et quantification par défaut.
 MODELS = [
     {
-        "name": "LLaMA 7B",
-        "min_vram": 6,
-        "min_ram": 12,
-        "min_threads": 8,
+        "name": "llama3.2:3b",
+        "parameters": 3_210_000_000,
+        "quantization": "Q4_K_M",
+        "layers": 28,
+        "embedding": 3072,
+        "heads": 24,
+        "kv_heads": 8,
+        "context_length": 131072,
     },
     {
-        "name": "LLaMA 13B",
-        "min_vram": 10,
-        "min_ram": 16,
-        "min_threads": 12,
+        "name": "phi3:mini",
+        "parameters": 3_820_000_000,
+        "quantization": "Q4_0",
+        "layers": 32,
+        "embedding": 3072,
+        "heads": 32,
+        "kv_heads": 32,
+        "context_length": 131072,
     },
     {
-        "name": "Mixtral 8x7B",
-        "min_vram": 16,
-        "min_ram": 32,
-        "min_threads": 16,
+        "name": "mistral:7b",
+        "parameters": 7_250_000_000,
+        "quantization": "Q4_0",
+        "layers": 32,
+        "embedding": 4096,
+        "heads": 32,
+        "kv_heads": 8,
+        "context_length": 32768,
+    },
+    {
+        "name": "llava:7b",
+        "parameters": 7_240_000_000,
+        "quantization": "Q4_0",
+        "layers": 32,
+        "embedding": 4096,
+        "heads": 32,
+        "kv_heads": 32,
+        "context_length": 4096,
+    },
+    {
+        "name": "qwen2.5:7b",
+        "parameters": 7_620_000_000,
+        "quantization": "Q4_K_M",
+        "layers": 28,
+        "embedding": 3584,
+        "heads": 28,
+        "kv_heads": 4,
+        "context_length": 32768,
+    },
+    {
+        "name": "deepseek-r1:7b",
+        "parameters": 7_620_000_000,
+        "quantization": "Q4_K_M",
+        "layers": 28,
+        "embedding": 3584,
+        "heads": 28,
+        "kv_heads": 4,
+        "context_length": 131072,
+    },
+    {
+        "name": "llama3.1:8b",
+        "parameters": 8_030_000_000,
+        "quantization": "Q4_K_M",
+        "layers": 32,
+        "embedding": 4096,
+        "heads": 32,
+        "kv_heads": 8,
+        "context_length": 131072,
+    },
+    {
+        "name": "gemma2:9b",
+        "parameters": 9_240_000_000,
+        "quantization": "Q4_0",
+        "layers": 42,
+        "embedding": 3584,
+        "heads": 16,
+        "kv_heads": 8,
+        "head_dim": 256,
+        "context_length": 8192,
+    },
+    {
+        "name": "codellama:13b",
+        "parameters": 13_000_000_000,
+        "quantization": "Q4_0",
+        "layers": 40,
+        "embedding": 5120,
+        "heads": 40,
+        "kv_heads": 40,
+        "context_length": 16384,
+    },
+    {
+        "name": "qwen2.5:14b",
+        "parameters": 14_800_000_000,
+        "quantization": "Q4_K_M",
+        "layers": 48,
+        "embedding": 5120,
+        "heads": 40,
+        "kv_heads": 8,
+        "context_length": 32768,
+    },
+    {
+        "name": "mixtral:8x7b",
+        "parameters": 46_700_000_000,
+        "quantization": "Q4_0",
+        "layers": 32,
+        "embedding": 4096,
+        "heads": 32,
+        "kv_heads": 8,
+        "context_length": 32768,
+    },
+    {
+        "name": "llama3.1:70b",
+        "parameters": 70_600_000_000,
+        "quantization": "Q4_K_M",
+        "layers": 80,
+        "embedding": 8192,
+        "heads": 64,
+        "kv_heads": 8,
+        "context_length": 131072,
     },
 ]
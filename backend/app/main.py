@@ -1,10 +1,7 @@
 import sys
-import os
-import json
 import time
-import base64
+import hashlib
 import subprocess
-import threading
 import multiprocessing
 from pathlib import Path
 from typing import Optional
@@ -15,10 +12,6 @@ multiprocessing.freeze_support()
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-
 # --- CONFIGURATION DES CHEMINS ---
 current_file = Path(__file__).resolve()
 
@@ -29,18 +22,48 @@ else:
 
 sys.path.append(str(backend_dir))
 
+# --- RAPPORT DE DÉMARRAGE (temps d'import de chaque module, /api/v1/system/startup) ---
+from app.core.startup import startup_report
+startup_report.install()
+startup_report.begin("imports")
+
+import asyncio
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Query, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+
 # --- IMPORTS SERVICES ---
-from app.services.ollama_service import ollama_service
-from app.services.monitoring_service import get_monitoring_info
+# Services rarement utilisés (benchmarks, compatibilité) : importés dans leurs routes
+from contextlib import aclosing
+from app.services.ollama_service import ollama_service, StreamChunk
+from app.services.monitoring_service import get_monitoring_info, telemetry_sampler
 from app.services.search_service import search_service
-from app.core.config import load_user_settings, save_user_settings
+from app.services.chat_history_service import chat_history_service, MessageDraft
+from app.services.event_service import event_bus, EventBus, EventBusLogHandler, TOPICS
+from app.services.health_service import health_monitor
+from app.services.supervisor_service import ollama_supervisor
+from app.services.context_service import context_window
+from app.services.residency_service import residency_manager
+from app.services.scheduler_service import request_scheduler, Admission, SchedulerFullError
+from app.services.response_cache_service import response_cache
+from app.services.image_service import image_pipeline, ImageTooLargeError
+from app.services.pull_service import pull_manager, QueueFullError, FINISHED as PULL_FINISHED
+from app.services.log_service import log_reader, LogFilter, LogReader
+from app.core.config import DATA_DIR, settings, load_user_settings, save_user_settings
 from app.core.logger import logger
+from app.core import metrics
+from app.core.tracing import tracer, span, record, TracingMiddleware
+from app.core.profiler import sampling_profiler
+
+startup_report.end("imports")
+from app.core.metrics import (
+    CHAT_ACTIVE_STREAMS, CHAT_STREAM_SECONDS, CHAT_TOKENS, CHAT_TOKENS_PER_SECOND, CHAT_TTFT_SECONDS
+)
 
 app = FastAPI(title="Horizon AI")
 
 # --- DATA DIR ---
-DATA_DIR = backend_dir / "data"
-DATA_DIR.mkdir(parents=True, exist_ok=True)
+Path(DATA_DIR).mkdir(parents=True, exist_ok=True)
 
 # --- CORS ---
 app.add_middleware(
@@ -49,7 +72,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Retry-After", "X-Cache"],
 )
+# --- MÉTRIQUES (latence par route, exposées sur /metrics) ---
+app.add_middleware(metrics.MetricsMiddleware)
+# --- TRAÇAGE (cascade des étapes par requête, /api/v1/debug/traces) ---
+app.add_middleware(TracingMiddleware)
 
 # ======================================================
 # EVENTS STARTUP / SHUTDOWN
@@ -57,33 +85,54 @@ app.add_middleware(
 
 @app.on_event("startup")
 async def startup_event():
+    startup_report.begin("startup")
     logger.info("🚀 Horizon AI Backend démarré.")
+    # Import des anciens fichiers JSON (premier démarrage après mise à jour) hors de la boucle
+    await asyncio.to_thread(chat_history_service.import_legacy, DATA_DIR)
+
+    # Canal d'événements : télémétrie, santé / modèles et logs poussés aux clients
+    event_bus.bind_loop(asyncio.get_running_loop())
+    log_handler = EventBusLogHandler(event_bus)
+    log_handler.setFormatter(logger.handlers[0].formatter)
+    logger.addHandler(log_handler)
+    telemetry_sampler.add_listener(
+        lambda snapshot: event_bus.publish_state("telemetry", {k: v for k, v in snapshot.items() if k != "timestamp"})
+    )
+    telemetry_sampler.start()
 
-    def try_start_ollama():
-        try:
-            settings = load_user_settings()
-            env_vars = os.environ.copy()
-
-            ollama_path = settings.get("ollama_models_path")
-            if ollama_path:
-                env_vars["OLLAMA_MODELS"] = str(ollama_path)
-                logger.info(f"📂 Dossier Ollama personnalisé : {ollama_path}")
-
-            subprocess.Popen(
-                ["ollama", "serve"],
-                env=env_vars,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-
-            logger.info("🟢 Ollama lancé")
-        except Exception as e:
-            logger.warning(f"⚠️ Impossible de lancer Ollama : {e}")
+    await ollama_service.start()
+    # Serveur Ollama existant réutilisé, sinon lancé et relancé en cas de panne (tâche de fond)
+    ollama_supervisor.add_listener(lambda state: health_monitor.refresh())
+    ollama_supervisor.start()
+    health_monitor.start()
+    await pull_manager.start()
+    # Préchargement du modèle par défaut dès qu'Ollama répond (tâche de fond)
+    residency_manager.start()
 
-    threading.Thread(target=try_start_ollama, daemon=True).start()
+    startup_report.end("startup")
+    startup_report.mark("startup_complete")
+    # Imports suivants (services chargés à la demande) : plus de finder intercalé
+    startup_report.uninstall()
+    logger.info(f"⏱️ Démarrage : {startup_report.summary()}")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await pull_manager.stop()
+    benchmarks = sys.modules.get("app.services.benchmark_service")
+    if benchmarks is not None:
+        await benchmarks.benchmark_runner.stop()
+    await residency_manager.stop()
+    # Superviseur d'abord : son passage à STOPPED déclenche encore une sonde de santé
+    await ollama_supervisor.stop()
+    await health_monitor.stop()
+    await context_window.stop()
+    await ollama_service.close()
+    telemetry_sampler.stop()
+    chat_history_service.close()
+    await response_cache.stop()
+    response_cache.close()
+    sampling_profiler.cancel()
     logger.info("🛑 Horizon AI Backend arrêté.")
 
 # ======================================================
@@ -91,18 +140,8 @@ async def shutdown_event():
 # ======================================================
 
 def save_to_history(chat_id: str, model: str, role: str, content: str):
-    file_path = DATA_DIR / f"{chat_id}.json"
-
-    if file_path.exists():
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    else:
-        data = {"id": chat_id, "model": model, "messages": []}
-
-    data["messages"].append({"role": role, "content": content})
-
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    # Écriture asynchrone dans SQLite : ne bloque pas la boucle (voir ChatHistoryService)
+    return chat_history_service.append_message(chat_id, model, role, content)
 
 # ======================================================
 # SYSTEM / SETTINGS / LOGS
@@ -115,68 +154,221 @@ async def get_settings():
 
 @app.post("/api/v1/settings")
 async def update_settings(new_settings: dict):
-    save_user_settings(new_settings)
+    try:
+        save_user_settings(new_settings)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     logger.info("⚙️ Paramètres utilisateur mis à jour")
     return {"message": "Configuration mise à jour"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Métriques au format texte de Prometheus (latences, chat, Ollama, historique, recherche, pulls)."""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/api/v1/debug/traces")
+async def get_traces(
+    limit: int = Query(50, ge=1, le=1000),
+    route: Optional[str] = None,
+    min_ms: float = Query(0, ge=0)
+):
+    """Cascades des dernières requêtes (étapes, début et durée en ms depuis l'arrivée)."""
+    return {"tracing": tracer.status(), "traces": tracer.recent(limit, route, min_ms)}
+
+
+@app.get("/api/v1/debug/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    trace = tracer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace introuvable")
+    return trace
+
+
+@app.delete("/api/v1/debug/traces")
+async def clear_traces():
+    tracer.clear()
+    return tracer.status()
+
+
+@app.post("/api/v1/debug/tracing")
+async def set_tracing(enabled: bool = Form(...)):
+    """Active / désactive le traçage à chaud (désactivé : aucun coût mesurable)."""
+    tracer.enabled = enabled
+    logger.info(f"🧭 Traçage des requêtes {'activé' if enabled else 'désactivé'}")
+    return tracer.status()
+
+
+@app.post("/api/v1/debug/profile", status_code=202)
+async def start_profile(requests: int = Form(...), interval_ms: Optional[float] = Form(None)):
+    """Profileur par échantillonnage sur les `requests` prochaines requêtes (tracées elles aussi)."""
+    try:
+        return sampling_profiler.arm(requests, interval_ms / 1000 if interval_ms else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/v1/debug/profile")
+async def get_profile(format: str = Query("json", pattern="^(json|collapsed)$"), top: int = Query(30, ge=1, le=500)):
+    """Rapport de la dernière capture ; format=collapsed : piles repliées pour flamegraph.pl / speedscope."""
+    if format == "collapsed":
+        return Response(sampling_profiler.collapsed(), media_type="text/plain; charset=utf-8")
+    return sampling_profiler.report(top=top)
+
+
+@app.delete("/api/v1/debug/profile")
+async def cancel_profile():
+    sampling_profiler.cancel()
+    return sampling_profiler.report(stacks=False)
+
+
 @app.get("/api/v1/system/health")
 async def health_check():
-    is_ollama_alive = await ollama_service.check_connection()
-    return {
-        "status": "healthy" if is_ollama_alive else "degraded",
-        "checks": {
-            "backend": "ok",
-            "ollama": "ok" if is_ollama_alive else "unreachable"
-        }
-    }
+    # Résultat de la sonde en arrière-plan : aucun appel à Ollama par requête
+    state = await health_monitor.current()
+    startup_report.mark("first_health_response")
+    return state
 
 
-@app.get("/api/v1/system/logs")
-async def get_logs(limit: int = 100):
-    from app.core.logger import LOG_FILE
+@app.get("/api/v1/system/ollama")
+async def get_ollama_process():
+    """État du serveur Ollama supervisé : starting / ready / degraded / restarting, processus, relances."""
+    return ollama_supervisor.info()
 
-    if not os.path.exists(LOG_FILE):
-        return {"logs": ["Log file not found"]}
 
+@app.get("/api/v1/system/startup")
+async def get_startup_report(limit: int = Query(20, ge=1, le=500)):
+    """Temps d'import par module (total / propre), étapes du démarrage et jalons (ms depuis le lancement de main.py)."""
+    return startup_report.to_dict(limit)
+
+
+@app.get("/api/v1/system/logs")
+async def get_logs(
+    limit: int = Query(100, ge=1, le=5000),
+    cursor: Optional[str] = None,
+    level: Optional[str] = None,
+    contains: Optional[str] = None
+):
+    """
+    Sans curseur : les `limit` dernières lignes. Avec `cursor` : uniquement les
+    lignes écrites depuis. Le curseur renvoyé sert à l'appel suivant.
+    Plus de `limit` nouvelles lignes : seules les plus récentes sont renvoyées,
+    avec truncated=True et le nombre de lignes sautées (`skipped`).
+    """
     try:
-        with open(LOG_FILE, "r", encoding="utf-8") as f:
-            return {"logs": f.readlines()[-limit:]}
+        if cursor:
+            lines, next_cursor, reset, truncated = await asyncio.to_thread(log_reader.read_since, cursor, level, contains)
+            skipped = max(0, len(lines) - limit)
+            return {"logs": lines[skipped:], "cursor": next_cursor, "reset": reset,
+                    "truncated": truncated or skipped > 0, "skipped": skipped}
+        lines, next_cursor = await asyncio.to_thread(log_reader.tail, limit, level, contains)
+        return {"logs": lines, "cursor": next_cursor, "reset": False, "truncated": False, "skipped": 0}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Erreur lecture logs: {e}")
-        return {"logs": ["Error reading logs"]}
+        return {"logs": ["Error reading logs"], "cursor": cursor, "reset": False, "truncated": False, "skipped": 0}
+
+@app.get("/api/v1/system/logs/stream")
+async def follow_logs(
+    request: Request,
+    cursor: Optional[str] = None,
+    level: Optional[str] = None,
+    contains: Optional[str] = None
+):
+    """Mode suivi (SSE) : pousse les nouvelles lignes dès qu'elles sont écrites."""
+    # Reconnexion EventSource : Last-Event-ID est plus récent que le curseur initial
+    cursor = request.headers.get("last-event-id") or cursor
+    try:
+        LogFilter(level, contains)
+        if cursor:
+            LogReader.parse_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def stream():
+        async for event in log_reader.follow(cursor, level, contains):
+            if await request.is_disconnected():
+                break
+            yield event
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ======================================================
+# ÉVÉNEMENTS (SSE)
+# ======================================================
+
+@app.get("/api/v1/events")
+async def events(request: Request, topics: str = ",".join(TOPICS)):
+    """
+    Canal unique d'événements poussés : telemetry, health, models, logs, pulls.
+    Instantané à la connexion pour les topics d'état, puis deltas uniquement.
+    """
+    wanted = [t.strip() for t in topics.split(",") if t.strip()]
+    unknown = set(wanted) - set(TOPICS)
+    if unknown or not wanted:
+        raise HTTPException(status_code=400, detail=f"Topics inconnus : {sorted(unknown)}")
+
+    async def stream():
+        async for event in event_bus.subscribe(wanted):
+            if await request.is_disconnected():
+                break
+            yield EventBus.format_sse(event)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # ======================================================
 # CONVERSATIONS
 # ======================================================
 
 @app.get("/api/v1/conversations")
-async def list_conversations():
-    convs = []
-
+async def list_conversations(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    order: str = "desc"
+):
+    # Pagination par clé sur les index SQLite.
+    # Le curseur de la page suivante est renvoyé dans l'en-tête X-Next-Cursor.
     try:
-        for file in DATA_DIR.glob("chat_*.json"):
-            with open(file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                title = data["messages"][0]["content"] if data.get("messages") else "New chat"
-                convs.append({
-                    "id": file.stem,
-                    "title": title[:40] + "...",
-                    "model": data.get("model")
-                })
-        return sorted(convs, key=lambda x: x["id"], reverse=True)
-    except Exception as e:
-        logger.error(f"Erreur conversations: {e}")
-        return []
+        convs, next_cursor = await asyncio.to_thread(
+            chat_history_service.list_conversations, sort=sort, order=order, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return convs
+
+@app.get("/api/v1/conversations/search")
+async def search_conversations(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    # Index FTS5 mis à jour à chaque message : pas de scan des conversations.
+    # Requête hors de la boucle asyncio : une recherche par frappe ne gèle pas les streams
+    results, next_offset = await asyncio.to_thread(chat_history_service.search, q, limit=limit, offset=offset)
+    return {"query": q, "results": results, "next_offset": next_offset}
 
 @app.get("/api/v1/conversations/{chat_id}")
 async def get_conversation(chat_id: str):
-    file_path = DATA_DIR / f"{chat_id}.json"
-    if not file_path.exists():
+    conversation = await asyncio.to_thread(chat_history_service.get_conversation, chat_id)
+    if conversation is None:
         raise HTTPException(status_code=404, detail="Session non trouvée")
 
-    with open(file_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return conversation
 
 # ======================================================
 # CHAT
@@ -187,12 +379,51 @@ async def chat(
     model: str = Form(...),
     prompt: str = Form(...),
     chat_id: Optional[str] = Form(None),
-    file: UploadFile = File(None)
+    file: UploadFile = File(None),
+    temperature: Optional[float] = Form(None),
+    seed: Optional[int] = Form(None)
 ):
-    user_config = load_user_settings()
+    received = time.perf_counter()
+    # Contre-pression : file de l'ordonnanceur pleine -> 429 avant tout traitement ;
+    # sinon place réservée dans la file jusqu'à generate(), rendue si la requête échoue avant
+    try:
+        admission = request_scheduler.check_admission()
+    except SchedulerFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    try:
+        return await _start_chat(admission, received, model, prompt, chat_id, file, temperature, seed)
+    except BaseException:
+        admission.release()
+        raise
+
+
+async def _start_chat(admission: Admission, received: float, model: str, prompt: str, chat_id: Optional[str],
+                      file: Optional[UploadFile], temperature: Optional[float], seed: Optional[int]):
+    """Préparation du chat (image, recherche web, contexte) puis réponse en streaming."""
+    # Ollama en cours de (re)lancement : attente brève plutôt qu'un échec
+    if ollama_supervisor.restarting:
+        with span("ollama.wait"):
+            if not await ollama_supervisor.wait_ready(settings.CHAT_OLLAMA_WAIT):
+                raise HTTPException(status_code=503, detail="Ollama redémarre, réessayez dans un instant",
+                                    headers={"Retry-After": "5"})
+
+    with span("settings"):
+        user_config = load_user_settings()
     current_chat_id = chat_id or f"chat_{int(time.time())}"
+    options = {k: v for k, v in (("temperature", temperature), ("seed", seed)) if v is not None} or None
 
-    save_to_history(current_chat_id, model, "user", prompt)
+    image = None
+    if file:
+        # Lecture par blocs, réduction et cache par hash : jamais l'image entière en mémoire
+        try:
+            with span("image") as step:
+                image = await image_pipeline.prepare(file.file)
+                step.set(bytes=image.size)
+        except ImageTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+
+    with span("history.save"):
+        save_to_history(current_chat_id, model, "user", prompt)
 
     lang = user_config.get("language", "en")
     instructions = {
@@ -201,39 +432,118 @@ async def chat(
     }
     system_instruction = instructions.get(lang, instructions["en"])
 
-    image_base64 = None
     web_context = None
 
-    if file:
-        contents = await file.read()
-        image_base64 = base64.b64encode(contents).decode("utf-8")
-
     if user_config.get("internetAccess"):
-        web_context = search_service.search_web(prompt)
+        # Hors de la boucle asyncio, avec budget de temps : None -> réponse sans contexte web
+        web_context = await search_service.get_context(prompt)
 
     final_prompt = "\n\n".join(
-        [system_instruction] +
         ([f"Contexte Web: {web_context}"] if web_context else []) +
         [f"Question: {prompt}"]
     )
 
+    # Contexte KV du tour précédent (invalidé si le modèle ou le prompt système change)
+    system_key = hashlib.sha1(system_instruction.encode("utf-8")).hexdigest()[:16]
+    with span("context_window"):
+        context = await asyncio.to_thread(chat_history_service.get_context, current_chat_id, model, system_key)
+        # Historique (résumé + derniers messages) dans le budget de tokens du modèle
+        final_prompt, context = await context_window.build(
+            current_chat_id, model, system_instruction, final_prompt, context
+        )
+
+    # Génération déterministe déjà faite (même digest, prompt, contexte, options) : rejouée sans Ollama
+    with span("response_cache") as step:
+        cache_key = await response_cache.key(model, final_prompt, system_instruction, context, image.key if image else None, options)
+        cached_lines = await response_cache.get(cache_key) if cache_key else None
+        step.set(hit=cached_lines is not None)
+
+    async def replay():
+        for line in cached_lines:
+            yield StreamChunk.from_line(line)
+
+    async def generate():
+        # Créneau de l'ordonnanceur (limites par modèle, regroupement, priorité)
+        queued = time.perf_counter()
+        async with request_scheduler.slot(model, admission=admission):
+            record("scheduler.wait", queued)
+            keep_alive = None
+            try:
+                # Place en VRAM (éviction LRU si besoin) et keep_alive propre au modèle
+                with span("residency"):
+                    keep_alive = await residency_manager.acquire(model)
+                async for chunk in ollama_service.chat_stream(
+                    model, final_prompt, current_chat_id, image=image,
+                    system=system_instruction, context=context, keep_alive=keep_alive, options=options
+                ):
+                    yield chunk
+            finally:
+                if keep_alive is not None:
+                    residency_manager.release(model)
+
     async def stream_and_save():
-        full_response = ""
-        async for chunk in ollama_service.chat_stream(
-            model, final_prompt, current_chat_id, image=image_base64
-        ):
-            yield chunk
-            if chunk.startswith("data: "):
-                try:
-                    parsed = json.loads(chunk.replace("data: ", "").strip())
-                    full_response += parsed.get("response", "")
-                except:
-                    pass
-
-        if full_response:
-            save_to_history(current_chat_id, model, "assistant", full_response)
-
-    return StreamingResponse(stream_and_save(), media_type="text/event-stream")
+        # Relais sans re-parsing : les octets d'Ollama partent tels quels, les tokens
+        # sont accumulés dans une liste et sauvegardés périodiquement (déconnexion,
+        # crash : au plus CHAT_CHECKPOINT_INTERVAL secondes de texte perdues)
+        parts = []
+        lines = [] if cache_key and cached_lines is None else None
+        draft = MessageDraft(current_chat_id, model, "assistant")
+        last_checkpoint = time.monotonic()
+        new_context = None
+        cache_label = "hit" if cached_lines is not None else "miss"
+        first_token = None
+        streaming = time.perf_counter()
+        CHAT_ACTIVE_STREAMS.inc()
+        try:
+            async with aclosing(replay() if cached_lines is not None else generate()) as chunks:
+                async for chunk in chunks:
+                    yield chunk.raw
+                    if lines is not None:
+                        lines.append(chunk.line)
+                    if chunk.data.get("error"):
+                        lines = None
+                    elif chunk.data.get("done"):
+                        new_context = chunk.data.get("context")
+                        stats = chunk.stats
+                        if cached_lines is None and stats.tokens:
+                            CHAT_TOKENS.labels(model).inc(stats.tokens)
+                            if stats.decode_rate:
+                                CHAT_TOKENS_PER_SECOND.labels(model).observe(stats.decode_rate)
+                        if cached_lines is None and first_token is not None:
+                            # Durées côté Ollama, placées juste avant le premier token
+                            prompt_start = first_token - stats.prompt_seconds
+                            record("ollama.load", prompt_start - stats.load_seconds, prompt_start)
+                            record("ollama.prompt_eval", prompt_start, first_token, tokens=stats.prompt_tokens)
+                        record("stream.tokens", first_token or streaming, tokens=stats.tokens)
+                    elif chunk.token:
+                        if first_token is None:
+                            first_token = time.perf_counter()
+                            record("stream.first_token", streaming, first_token, cache=cache_label)
+                            CHAT_TTFT_SECONDS.labels(model, cache_label).observe(first_token - received)
+                        parts.append(chunk.token)
+                        if time.monotonic() - last_checkpoint >= settings.CHAT_CHECKPOINT_INTERVAL:
+                            parts = ["".join(parts)]
+                            chat_history_service.save_draft(draft, parts[0])
+                            last_checkpoint = time.monotonic()
+            if lines and new_context is not None:
+                response_cache.store(cache_key, model, lines)
+        finally:
+            admission.release()  # Réponse rejouée depuis le cache : place jamais consommée
+            if image:
+                image.close()
+            CHAT_ACTIVE_STREAMS.dec()
+            CHAT_STREAM_SECONDS.labels(model, cache_label).observe(time.perf_counter() - received)
+            with span("history.save"):
+                if parts:
+                    chat_history_service.save_draft(draft, "".join(parts))
+                if new_context:
+                    chat_history_service.save_context(current_chat_id, model, system_key, new_context)
+                elif context:
+                    # Tour interrompu : le contexte mémorisé ne correspond plus à l'historique
+                    chat_history_service.clear_context(current_chat_id)
+
+    headers = {"X-Cache": "HIT" if cached_lines is not None else "MISS"} if cache_key else None
+    return StreamingResponse(stream_and_save(), media_type="text/event-stream", headers=headers)
 
 # ======================================================
 # MODELS
@@ -244,18 +554,146 @@ async def get_models():
     return await ollama_service.list_models()
 
 
-@app.post("/api/v1/models/pull")
+@app.post("/api/v1/models/pull", status_code=202)
 async def pull_model(model_name: str = Form(...)):
+    """Met le téléchargement en file ; la progression arrive sur /api/v1/models/pulls/{job_id}/events."""
     try:
-        subprocess.Popen(
-            ["ollama", "pull", model_name],
-            creationflags=subprocess.CREATE_NO_WINDOW
+        return pull_manager.submit(model_name).to_dict()
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+
+@app.get("/api/v1/models/pulls")
+async def list_pulls():
+    return pull_manager.list_jobs()
+
+
+@app.get("/api/v1/models/pulls/{job_id}")
+async def get_pull(job_id: str):
+    job = pull_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Téléchargement introuvable")
+    return job.to_dict()
+
+
+@app.delete("/api/v1/models/pulls/{job_id}")
+async def cancel_pull(job_id: str):
+    job = pull_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Téléchargement introuvable")
+    return job.to_dict()
+
+
+@app.get("/api/v1/models/pulls/{job_id}/events")
+async def pull_events(request: Request, job_id: str):
+    """Progression d'un téléchargement (SSE), jusqu'à son état final."""
+    job = pull_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Téléchargement introuvable")
+
+    async def stream():
+        yield EventBus.format_sse({"topic": "pull", "type": "snapshot", "data": job.to_dict()})
+        if job.status in PULL_FINISHED:
+            return
+        async for event in event_bus.subscribe(["pulls"]):
+            if await request.is_disconnected():
+                break
+            if event is None:
+                if job.status in PULL_FINISHED:
+                    # Fin survenue entre l'instantané et l'abonnement
+                    yield EventBus.format_sse({"topic": "pull", "type": "snapshot", "data": job.to_dict()})
+                    break
+                yield EventBus.format_sse(None)
+                continue
+            if event["data"].get("job_id") != job_id:
+                continue
+            yield EventBus.format_sse({"topic": "pull", "type": "event", "data": event["data"]})
+            if event["data"]["status"] in PULL_FINISHED:
+                break
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/v1/cache/responses")
+async def get_response_cache():
+    """Cache des réponses déterministes : entrées, taille, hits / misses."""
+    return await asyncio.to_thread(response_cache.info)
+
+
+@app.delete("/api/v1/cache/responses")
+async def clear_response_cache():
+    response_cache.purge()
+    return {"message": "Cache des réponses vidé"}
+
+
+@app.get("/api/v1/scheduler")
+async def get_scheduler_metrics():
+    """Profondeur de file, créneaux actifs par modèle, temps d'attente et refus."""
+    return request_scheduler.metrics()
+
+
+@app.get("/api/v1/models/residency")
+async def get_residency():
+    """Modèles chargés en mémoire, budget VRAM et compteurs hit / miss / évictions."""
+    return await residency_manager.state()
+
+
+@app.post("/api/v1/models/preload")
+async def preload_model(model_name: str = Form(...)):
+    """Charge et épingle un modèle (déchargement LRU d'autres modèles si la VRAM manque)."""
+    if not await residency_manager.preload(model_name):
+        raise HTTPException(status_code=503, detail=f"Impossible de précharger {model_name}")
+    return await residency_manager.state()
+
+
+@app.get("/api/v1/models/compatibility")
+async def get_models_compatibility(num_ctx: Optional[int] = Query(None, ge=256)):
+    """Empreinte VRAM / RAM (cache KV compris) et répartition des couches, modèles installés et catalogue."""
+    from app.services.compatibility_service import fit_estimator
+    return await fit_estimator.check_all(num_ctx)
+
+
+@app.post("/api/v1/benchmarks", status_code=202)
+async def start_benchmark(
+    model: str = Form(...),
+    prompts: str = Form("short,medium,long"),
+    concurrency: str = Form("1,2,4"),
+    repeat: Optional[int] = Form(None),
+    max_tokens: Optional[int] = Form(None),
+    cold_start: bool = Form(False)
+):
+    """Lance un benchmark (TTFT, tokens/s, évaluation du prompt, chargement) ; résultat sur /benchmarks/{id}."""
+    from app.services.benchmark_service import benchmark_runner, BenchmarkBusyError
+    try:
+        return benchmark_runner.start(
+            model,
+            prompts=[p.strip() for p in prompts.split(",") if p.strip()],
+            concurrency=[int(c) for c in concurrency.split(",") if c.strip()],
+            repeat=repeat, max_tokens=max_tokens, cold_start=cold_start
         )
-        logger.info(f"📥 Pull lancé : {model_name}")
-        return {"status": "downloading"}
-    except Exception as e:
-        logger.error(f"Erreur pull model: {e}")
-        raise HTTPException(status_code=500, detail="Impossible de lancer le pull")
+    except BenchmarkBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/v1/benchmarks")
+async def list_benchmarks(model: Optional[str] = None, limit: int = Query(50, ge=1, le=500)):
+    """Historique des runs, du plus récent au plus ancien."""
+    from app.services.benchmark_service import benchmark_runner
+    return await asyncio.to_thread(benchmark_runner.history, model, limit)
+
+
+@app.get("/api/v1/benchmarks/{run_id}")
+async def get_benchmark(run_id: str):
+    from app.services.benchmark_service import benchmark_runner
+    run = await asyncio.to_thread(benchmark_runner.get, run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Benchmark introuvable")
+    return run
 
 # 🔥🔥🔥 CORRECTION ICI 🔥🔥🔥
 @app.delete("/api/v1/models/{model_name}")
@@ -273,6 +711,10 @@ async def delete_model(model_name: str):
             raise HTTPException(status_code=500, detail=process.stderr)
 
         logger.info(f"🗑️ Modèle supprimé : {model_name}")
+        residency_manager.forget(model_name)
+        response_cache.purge(model_name)
+        ollama_service.invalidate()
+        health_monitor.refresh()
         return {"message": "Modèle supprimé avec succès"}
 
     except Exception as e:
@@ -285,8 +727,17 @@ async def delete_model(model_name: str):
 
 @app.get("/api/v1/monitoring")
 async def get_stats():
+    # Dernier instantané de l'échantillonneur : aucune mesure dans la requête
     return get_monitoring_info()
 
+
+@app.get("/api/v1/monitoring/history")
+async def get_stats_history(
+    window: float = Query(300, gt=0, le=settings.MONITORING_HISTORY_SECONDS),
+    points: int = Query(60, ge=1, le=1000)
+):
+    return telemetry_sampler.history(window, points)
+
 # ======================================================
 # MAIN
 # ======================================================
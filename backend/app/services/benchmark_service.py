@@ -0,0 +1,266 @@
+import asyncio
+import json
+import os
+import socket
+import statistics
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Sequence
+
+from app.core.config import DATA_DIR, settings
+from app.core.logger import logger
+from app.services.ollama_service import ollama_service
+
+BENCH_FILE = settings.BENCHMARK_PATH or os.path.join(DATA_DIR, "benchmarks.jsonl")
+
+# Jeux de prompts standard : longueur cible en tokens (estimée à ~4 caractères par token)
+PROMPT_SETS = {"short": 32, "medium": 512, "long": 2048}
+DEFAULT_CONCURRENCY = (1, 2, 4)
+
+_PASSAGE = (
+    "Le mode WAL de SQLite écrit les modifications dans un journal séparé avant de les "
+    "reporter dans la base : les lecteurs ne bloquent plus l'écrivain, et les transactions "
+    "regroupées réduisent le nombre de synchronisations disque. En contrepartie, le fichier "
+    "journal grandit jusqu'au prochain point de contrôle. "
+)
+
+
+class BenchmarkBusyError(Exception):
+    """Un benchmark est déjà en cours."""
+
+
+def build_prompt(target_tokens: int, nonce: str) -> str:
+    """
+    Prompt d'environ `target_tokens` tokens. Le préfixe unique empêche Ollama de
+    réutiliser le cache KV d'une requête précédente (évaluation du prompt faussée).
+    """
+    head = f"[{nonce}] Résume le texte suivant en une phrase.\n\n"
+    chars = max(0, target_tokens * 4 - len(head))
+    return head + (_PASSAGE * (chars // len(_PASSAGE) + 1))[:chars]
+
+
+def _check_suite(prompts: Sequence[str], concurrency: Sequence[int]):
+    unknown = [name for name in prompts if name not in PROMPT_SETS]
+    if unknown or not prompts or not concurrency or min(concurrency) < 1:
+        raise ValueError(f"Paramètres invalides (jeux de prompts : {', '.join(PROMPT_SETS)} ; concurrence >= 1)")
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def _median(values) -> Optional[float]:
+    values = [v for v in values if v is not None]
+    return round(statistics.median(values), 2) if values else None
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def compare(run: Dict, baseline: Dict, threshold: Optional[float] = None) -> Dict:
+    """Écart relatif par cellule (prompt x concurrence) et régressions au-delà du seuil."""
+    threshold = settings.BENCHMARK_REGRESSION_THRESHOLD if threshold is None else threshold
+    before = {(c["prompt"], c["concurrency"]): c for c in baseline["cells"]}
+    cells, regressions = [], []
+    for cell in run["cells"]:
+        old = before.get((cell["prompt"], cell["concurrency"]))
+        if old is None:
+            continue
+        deltas = {}
+        for metric, higher_is_better in (("decode_tps", True), ("prompt_tps", True),
+                                         ("throughput_tps", True), ("ttft_p50_ms", False)):
+            new_value, old_value = cell.get(metric), old.get(metric)
+            if not new_value or not old_value:
+                continue
+            change = new_value / old_value - 1
+            deltas[metric] = round(change, 3)
+            if (change < -threshold) if higher_is_better else (change > threshold):
+                regressions.append(f"{cell['prompt']} x{cell['concurrency']} {metric} {change:+.0%}")
+        cells.append({"prompt": cell["prompt"], "concurrency": cell["concurrency"], **deltas})
+    return {"baseline": baseline["id"], "threshold": threshold, "cells": cells, "regressions": regressions}
+
+
+class BenchmarkRunner:
+    """
+    Vitesse réelle d'un modèle sur la machine, mesurée via OllamaService :
+    jeux de prompts de plusieurs longueurs x niveaux de concurrence, `repeat`
+    vagues par cellule. Par requête : TTFT (côté client), débit de génération
+    et d'évaluation du prompt (compteurs du dernier chunk d'Ollama) ; temps de
+    chargement mesuré à part sur une requête de chauffe. Les runs sont ajoutés
+    à un historique JSON Lines et comparés au dernier run identique (même
+    modèle, machine et jeu de paramètres) pour repérer les régressions.
+    """
+
+    def __init__(self, path: str = BENCH_FILE, ollama=None):
+        self.path = path
+        self.ollama = ollama or ollama_service
+        self.current: Optional[Dict] = None     # Dernier run lancé via start()
+        self._task: Optional[asyncio.Task] = None
+
+    # --- Mesures ---
+
+    async def _sample(self, model: str, prompt: str, max_tokens: int) -> Dict:
+        options = {"num_predict": max_tokens, "temperature": 0, "seed": 42}
+        start = time.perf_counter()
+        ttft = stats = error = None
+        async for chunk in self.ollama.chat_stream(model, prompt, options=options):
+            if chunk.token and ttft is None:
+                ttft = time.perf_counter() - start
+            if "error" in chunk.data:
+                error = chunk.data["error"]
+            if chunk.stats:
+                stats = chunk.stats
+        return {"ttft": ttft, "latency": time.perf_counter() - start, "stats": stats, "error": error}
+
+    async def _cell(self, model: str, name: str, concurrency: int, repeat: int, max_tokens: int) -> Dict:
+        samples, wall = [], 0.0
+        for _ in range(repeat):
+            nonce = uuid.uuid4().hex[:8]
+            started = time.perf_counter()
+            samples += await asyncio.gather(*(
+                self._sample(model, build_prompt(PROMPT_SETS[name], f"{nonce}-{i}"), max_tokens)
+                for i in range(concurrency)
+            ))
+            wall += time.perf_counter() - started
+        ok = [s for s in samples if not s["error"] and s["stats"]]
+        stats = [s["stats"] for s in ok]
+        ttfts = [s["ttft"] for s in ok if s["ttft"] is not None]
+        return {
+            "prompt": name,
+            "concurrency": concurrency,
+            "requests": len(samples),
+            "errors": len(samples) - len(ok),
+            "prompt_tokens": _median(s.prompt_tokens for s in stats),
+            "ttft_p50_ms": _ms(_percentile(ttfts, 0.5)),
+            "ttft_p95_ms": _ms(_percentile(ttfts, 0.95)),
+            "latency_p50_ms": _ms(_percentile([s["latency"] for s in ok], 0.5)),
+            "decode_tps": _median(s.decode_rate for s in stats),
+            "prompt_tps": _median(s.prompt_rate for s in stats),
+            "throughput_tps": round(sum(s.tokens for s in stats) / wall, 2) if wall else None,
+        }
+
+    async def run(self, model: str, prompts: Sequence[str] = tuple(PROMPT_SETS),
+                  concurrency: Sequence[int] = DEFAULT_CONCURRENCY, repeat: Optional[int] = None,
+                  max_tokens: Optional[int] = None, cold_start: bool = False, run_id: Optional[str] = None,
+                  on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        _check_suite(prompts, concurrency)
+        suite = {
+            "prompts": list(prompts),
+            "concurrency": list(concurrency),
+            "repeat": repeat or settings.BENCHMARK_REPEAT,
+            "max_tokens": max_tokens or settings.BENCHMARK_MAX_TOKENS,
+        }
+        run = {
+            "id": run_id or uuid.uuid4().hex[:12],
+            "model": model,
+            "host": socket.gethostname(),
+            "suite": suite,
+            "status": "running",
+            "started_at": time.time(),
+            "duration": None,
+            "load_seconds": None,
+            "cells": [],
+            "comparison": None,
+            "error": None,
+        }
+        self.current = run
+        started = time.perf_counter()
+
+        if cold_start:
+            await self.ollama.unload_model(model)
+        # Chauffe : charge le modèle (temps de chargement mesuré à part), un seul token
+        warmup = await self._sample(model, build_prompt(8, uuid.uuid4().hex[:8]), 1)
+        if warmup["error"] or not warmup["stats"]:
+            run.update(status="failed", error=warmup["error"] or "Réponse incomplète d'Ollama")
+        else:
+            run["load_seconds"] = round(warmup["stats"].load_seconds, 3)
+            for name in suite["prompts"]:
+                for level in suite["concurrency"]:
+                    run["cells"].append(await self._cell(model, name, level, suite["repeat"], suite["max_tokens"]))
+                    if on_progress:
+                        on_progress(run)
+            baseline = self.baseline(run)
+            run.update(status="completed", comparison=compare(run, baseline) if baseline else None)
+
+        run["duration"] = round(time.perf_counter() - started, 2)
+        await asyncio.to_thread(self._append, run)
+        return run
+
+    # --- Historique ---
+
+    def _append(self, run: Dict):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(run, ensure_ascii=False) + "\n")
+
+    def _read(self) -> List[Dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        runs = []
+        for line in lines:
+            try:
+                runs.append(json.loads(line))
+            except ValueError:
+                continue  # Ligne tronquée (arrêt pendant l'écriture)
+        return runs
+
+    def history(self, model: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Runs enregistrés, du plus récent au plus ancien."""
+        runs = [r for r in self._read() if model is None or r.get("model") == model]
+        return runs[::-1][:limit]
+
+    def get(self, run_id: str) -> Optional[Dict]:
+        if self.current and self.current["id"] == run_id:
+            return self.current
+        return next((r for r in self._read() if r.get("id") == run_id), None)
+
+    def baseline(self, run: Dict) -> Optional[Dict]:
+        """Dernier run terminé comparable : même modèle, machine et paramètres."""
+        for previous in reversed(self._read()):
+            if (previous.get("status") == "completed" and previous["id"] != run["id"]
+                    and (previous["model"], previous["host"], previous["suite"])
+                    == (run["model"], run["host"], run["suite"])):
+                return previous
+        return None
+
+    # --- Exécution en tâche de fond (API) ---
+
+    def start(self, model: str, **options) -> Dict:
+        """Lance un run en arrière-plan ; un seul à la fois (les mesures se perturberaient)."""
+        if self._task and not self._task.done():
+            raise BenchmarkBusyError(f"Benchmark déjà en cours ({self.current['model']})")
+        _check_suite(options.get("prompts", tuple(PROMPT_SETS)), options.get("concurrency", DEFAULT_CONCURRENCY))
+        run_id = uuid.uuid4().hex[:12]
+        self.current = {"id": run_id, "model": model, "status": "running", "cells": []}
+        self._task = asyncio.create_task(self._run_job(model, run_id, options))
+        return self.current
+
+    async def _run_job(self, model: str, run_id: str, options: Dict):
+        logger.info(f"⏱️ Benchmark de {model} lancé")
+        try:
+            run = await self.run(model, run_id=run_id, **options)
+            logger.info(f"⏱️ Benchmark de {model} terminé ({run['status']}, {run['duration']} s)")
+            if run["comparison"] and run["comparison"]["regressions"]:
+                logger.warning(f"⚠️ Régressions {model} : {', '.join(run['comparison']['regressions'])}")
+        except Exception as e:
+            logger.error(f"Erreur benchmark {model}: {e}")
+            self.current.update(status="failed", error=str(e))
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+# Singleton
+benchmark_runner = BenchmarkRunner()
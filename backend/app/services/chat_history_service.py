@@ -1,95 +1,666 @@
+import base64
 import json
 import os
-from datetime import datetime
-from typing import List, Dict, Optional
+import queue
+import re
+import sqlite3
+import threading
+import time
 import uuid
+from array import array
+from concurrent.futures import Future
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.config import DATA_DIR, settings
+from app.core.logger import logger
+from app.core.metrics import HISTORY_WRITE_SECONDS
+
+DB_FILE = os.path.join(DATA_DIR, 'history.db')
+
+SORT_COLUMNS = ("updated_at", "created_at", "id")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id            TEXT PRIMARY KEY,
+    title         TEXT NOT NULL,
+    model         TEXT,
+    created_at    TEXT NOT NULL,
+    updated_at    TEXT NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    size          INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_conversations_updated ON conversations(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_conversations_created ON conversations(created_at, id);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id              INTEGER PRIMARY KEY,
+    conversation_id TEXT NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+    role            TEXT NOT NULL,
+    content         TEXT NOT NULL,
+    timestamp       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages(conversation_id, id);
+
+-- Contexte KV renvoyé par Ollama en fin de génération, réutilisé au tour suivant
+CREATE TABLE IF NOT EXISTS contexts (
+    conversation_id TEXT PRIMARY KEY REFERENCES conversations(id) ON DELETE CASCADE,
+    model           TEXT NOT NULL,
+    system_key      TEXT NOT NULL,
+    tokens          BLOB NOT NULL,
+    updated_at      TEXT NOT NULL
+);
+
+-- Résumé glissant des anciens tours (messages jusqu'à covered_message_id inclus)
+CREATE TABLE IF NOT EXISTS summaries (
+    conversation_id    TEXT PRIMARY KEY REFERENCES conversations(id) ON DELETE CASCADE,
+    summary            TEXT NOT NULL,
+    covered_message_id INTEGER NOT NULL,
+    updated_at         TEXT NOT NULL
+);
+"""
+
+# Index inversé plein texte (FTS5) sur le contenu des messages, tenu à jour
+# par triggers à chaque insertion : aucune reconstruction nécessaire.
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    content, content='messages', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+END;
+"""
+# Classement BM25 (colonne rank de FTS5) sur toutes les correspondances ; seule la
+# page demandée est jointe aux messages et conversations.
+_SQL_SEARCH = (
+    "WITH ranked AS ("
+    "  SELECT rowid, rank AS score FROM messages_fts"
+    "  WHERE messages_fts MATCH ? ORDER BY rank LIMIT ? OFFSET ?"
+    ") "
+    "SELECT m.id AS message_id, m.conversation_id, m.role, m.timestamp, c.title, c.model, k.score "
+    "FROM ranked k JOIN messages m ON m.id = k.rowid "
+    "JOIN conversations c ON c.id = m.conversation_id "
+    "ORDER BY k.score"
+)
+_SQL_SEARCH_SNIPPET = (
+    "SELECT snippet(messages_fts, 0, ?, ?, '…', ?) FROM messages_fts WHERE messages_fts MATCH ? AND rowid = ?"
+)
+_SQL_SEARCH_FALLBACK = (
+    "SELECT m.id AS message_id, m.conversation_id, m.role, m.timestamp, c.title, c.model, "
+    "0.0 AS score, substr(m.content, 1, 160) AS snippet "
+    "FROM messages m JOIN conversations c ON c.id = m.conversation_id "
+    "WHERE m.content LIKE ? ESCAPE '\\' ORDER BY m.id DESC LIMIT ? OFFSET ?"
+)
+_SEARCH_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Requêtes constantes : sqlite3 garde les statements préparés en cache par connexion
+_SQL_INSERT_CONVERSATION = (
+    "INSERT OR IGNORE INTO conversations (id, title, model, created_at, updated_at) VALUES (?, ?, ?, ?, ?)"
+)
+_SQL_INSERT_MESSAGE = (
+    "INSERT INTO messages (conversation_id, role, content, timestamp) "
+    "SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM conversations WHERE id = ?)"
+)
+_SQL_TOUCH_CONVERSATION = (
+    "UPDATE conversations SET updated_at = ?, message_count = message_count + 1, size = size + ? WHERE id = ?"
+)
+_SQL_UPDATE_MESSAGE = "UPDATE messages SET content = ?, timestamp = ? WHERE id = ?"
+_SQL_RESIZE_CONVERSATION = "UPDATE conversations SET updated_at = ?, size = size + ? WHERE id = ?"
+_SQL_DELETE_CONVERSATION = "DELETE FROM conversations WHERE id = ?"
+_SQL_SELECT_CONTEXT = "SELECT model, system_key, tokens FROM contexts WHERE conversation_id = ?"
+_SQL_UPSERT_CONTEXT = (
+    "INSERT OR REPLACE INTO contexts (conversation_id, model, system_key, tokens, updated_at) "
+    "SELECT ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM conversations WHERE id = ?)"
+)
+_SQL_DELETE_CONTEXT = "DELETE FROM contexts WHERE conversation_id = ?"
+_SQL_SELECT_SUMMARY = "SELECT summary, covered_message_id FROM summaries WHERE conversation_id = ?"
+_SQL_UPSERT_SUMMARY = (
+    "INSERT OR REPLACE INTO summaries (conversation_id, summary, covered_message_id, updated_at) "
+    "SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM conversations WHERE id = ?)"
+)
+_SQL_SELECT_MESSAGES_AFTER = (
+    "SELECT id, role, content FROM messages WHERE conversation_id = ? AND id > ? ORDER BY id"
+)
+_SQL_SELECT_CONVERSATION = "SELECT id, model FROM conversations WHERE id = ?"
+_SQL_SELECT_MESSAGES = "SELECT role, content FROM messages WHERE conversation_id = ? ORDER BY id"
+_SQL_SELECT_MESSAGES_TS = "SELECT role, content, timestamp FROM messages WHERE conversation_id = ? ORDER BY id"
+_SQL_MODEL_USAGE = (
+    "SELECT model, SUM(message_count) AS uses FROM conversations WHERE model IS NOT NULL "
+    "GROUP BY model ORDER BY uses DESC LIMIT ?"
+)
+_SQL_LIST_COLUMNS = "id, title, model, created_at, updated_at, message_count, size"
+
+_STOP = object()
+
+
+def make_title(content: Optional[str]) -> str:
+    """Titre affiché dans la sidebar pour les chats créés par /api/v1/chat."""
+    return (content if content is not None else "New chat")[:40] + "..."
+
+
+class MessageDraft:
+    """
+    Message écrit en plusieurs fois (réponse de l'assistant en cours de génération) :
+    inséré au premier point de sauvegarde, puis mis à jour en place.
+    Ses champs ne sont modifiés que par le thread d'écriture.
+    """
+
+    __slots__ = ("chat_id", "model", "role", "message_id", "size")
+
+    def __init__(self, chat_id: str, model: str, role: str = "assistant"):
+        self.chat_id = chat_id
+        self.model = model
+        self.role = role
+        self.message_id: Optional[int] = None
+        self.size = 0
 
-# Chemin vers le dossier data
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-DATA_DIR = os.path.join(BASE_DIR, 'data')
-CONVERSATIONS_FILE = os.path.join(DATA_DIR, 'conversations.json')
 
 class ChatHistoryService:
-    def __init__(self):
-        if not os.path.exists(DATA_DIR):
-            os.makedirs(DATA_DIR)
-        # Créer le fichier s'il n'existe pas
-        if not os.path.exists(CONVERSATIONS_FILE):
-            self._save_all([])
-
-    def _load_all(self) -> List[Dict]:
-        """Charge toutes les conversations."""
-        if not os.path.exists(CONVERSATIONS_FILE):
-            return []
+    """
+    Historique des conversations stocké dans SQLite (mode WAL).
+
+    Les écritures passent par un thread dédié qui regroupe les opérations en
+    transactions : les appels d'écriture rendent la main immédiatement (un
+    Future est renvoyé pour qui veut attendre) et ne bloquent pas la boucle
+    asyncio. Les lectures utilisent une connexion par thread ; celles d'une
+    conversation attendent les écritures déjà soumises pour cette conversation
+    (et elle seule). Les lectures sont bloquantes : depuis une route async,
+    passer par asyncio.to_thread.
+    """
+
+    def __init__(self, db_path: str = DB_FILE):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        self._local = threading.local()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._pending = 0
+        self._pending_chats: Dict[str, int] = {}  # Écritures en attente par conversation
+        self._pending_cond = threading.Condition()
+
+        # Schéma créé de façon synchrone pour que les lectures soient possibles de suite
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        self.fts_enabled = self._init_fts(conn)
+        conn.close()
+
+        self._writer = threading.Thread(target=self._writer_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def _init_fts(self, conn: sqlite3.Connection) -> bool:
+        """Crée l'index FTS5 ; le remplit une seule fois si la base existait déjà."""
+        existed = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'"
+        ).fetchone() is not None
         try:
-            with open(CONVERSATIONS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            conn.executescript(_FTS_SCHEMA)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"⚠️ FTS5 indisponible, recherche en mode dégradé (LIKE) : {e}")
+            return False
+        if not existed:
+            conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+        return True
+
+    # --- Connexions ---
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10.0, cached_statements=64, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={settings.HISTORY_DB_SYNCHRONOUS}")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # --- Écriture (thread dédié) ---
+
+    def _submit(self, op: Callable[[sqlite3.Connection], object], chat_id: Optional[str] = None) -> Future:
+        future: Future = Future()
+        with self._pending_cond:
+            self._pending += 1
+            if chat_id is not None:
+                self._pending_chats[chat_id] = self._pending_chats.get(chat_id, 0) + 1
+        self._queue.put((op, future, time.perf_counter(), chat_id))
+        return future
+
+    def _writer_loop(self):
+        conn = self._connect()
+        running = True
+        while running:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            # On regroupe ce qui attend déjà : une seule transaction (et un seul fsync)
+            while len(batch) < settings.HISTORY_WRITE_BATCH:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    running = False
+                    break
+                batch.append(item)
+            self._run_batch(conn, batch)
+        conn.close()
+
+    def _run_batch(self, conn: sqlite3.Connection, batch: List[Tuple[Callable, Future, float, Optional[str]]]):
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for op, _, _, _ in batch:
+                results.append(op(conn))
+            conn.execute("COMMIT")
+            committed = time.perf_counter()
+            for (_, future, submitted, _), result in zip(batch, results):
+                HISTORY_WRITE_SECONDS.observe(committed - submitted)
+                future.set_result(result)
         except Exception:
-            return []
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            # On rejoue une par une pour isoler l'opération fautive
+            for op, future, submitted, _ in batch:
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    result = op(conn)
+                    conn.execute("COMMIT")
+                    HISTORY_WRITE_SECONDS.observe(time.perf_counter() - submitted)
+                    future.set_result(result)
+                except Exception as e:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    logger.error(f"Erreur écriture historique: {e}")
+                    future.set_exception(e)
+        finally:
+            with self._pending_cond:
+                self._pending -= len(batch)
+                for *_, chat_id in batch:
+                    if chat_id is not None:
+                        left = self._pending_chats[chat_id] - 1
+                        if left:
+                            self._pending_chats[chat_id] = left
+                        else:
+                            del self._pending_chats[chat_id]
+                self._pending_cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Attend que toutes les écritures soumises soient validées (arrêt, benchmarks)."""
+        with self._pending_cond:
+            return self._pending_cond.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def _wait_chat(self, chat_id: str, timeout: float = 5.0):
+        """Lecture de ses propres écritures : attend celles déjà soumises pour `chat_id` seulement."""
+        with self._pending_cond:
+            if not self._pending_cond.wait_for(lambda: chat_id not in self._pending_chats, timeout=timeout):
+                logger.warning(f"⚠️ Historique : écritures de {chat_id} non validées après {timeout}s, lecture sans elles")
+
+    def close(self):
+        """Vide la file d'écriture puis arrête le thread (arrêt de FastAPI)."""
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join(timeout=10.0)
+
+    # --- Opérations d'écriture ---
+
+    @staticmethod
+    def _insert_message(conn: sqlite3.Connection, chat_id: str, role: str, content: str, timestamp: str):
+        cursor = conn.execute(_SQL_INSERT_MESSAGE, (chat_id, role, content, timestamp, chat_id))
+        if cursor.rowcount:
+            conn.execute(_SQL_TOUCH_CONVERSATION, (timestamp, len(content.encode("utf-8")), chat_id))
+        return cursor.lastrowid if cursor.rowcount else None
+
+    def create_conversation(self, first_prompt: str, model: str) -> str:
+        """
+        Crée une nouvelle conversation avec le premier message utilisateur.
+        Retourne l'ID de la nouvelle conversation.
+        """
+        chat_id = str(uuid.uuid4())
+        now = datetime.now().isoformat()
+        title = first_prompt[:30] + ("..." if len(first_prompt) > 30 else "")  # Titre = début du prompt
+
+        def op(conn):
+            conn.execute(_SQL_INSERT_CONVERSATION, (chat_id, title, model, now, now))
+            self._insert_message(conn, chat_id, "user", first_prompt, now)
+
+        self._submit(op, chat_id)
+        return chat_id
+
+    def add_message(self, chat_id: str, role: str, content: str) -> Future:
+        """
+        Ajoute une réponse (user ou assistant) à une conversation existante.
+        Met à jour la date de modification.
+        """
+        now = datetime.now().isoformat()
+        return self._submit(lambda conn: self._insert_message(conn, chat_id, role, content, now), chat_id)
 
-    def _save_all(self, data: List[Dict]):
-        """Sauvegarde toute la liste."""
-        with open(CONVERSATIONS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+    def append_message(self, chat_id: str, model: str, role: str, content: str) -> Future:
+        """Ajoute un message en créant la conversation si besoin (utilisé par save_to_history)."""
+        now = datetime.now().isoformat()
+
+        def op(conn):
+            conn.execute(_SQL_INSERT_CONVERSATION, (chat_id, make_title(content), model, now, now))
+            return self._insert_message(conn, chat_id, role, content, now)
+
+        return self._submit(op, chat_id)
+
+    def save_draft(self, draft: MessageDraft, content: str) -> Future:
+        """Point de sauvegarde d'un message partiel : insertion la première fois, mise à jour ensuite."""
+        now = datetime.now().isoformat()
+        size = len(content.encode("utf-8"))
+
+        def op(conn):
+            # Mise à jour si la ligne existe ; sinon (premier point, ou lot rejoué
+            # après un ROLLBACK qui a annulé l'insertion) on insère
+            if draft.message_id is not None and conn.execute(_SQL_UPDATE_MESSAGE, (content, now, draft.message_id)).rowcount:
+                conn.execute(_SQL_RESIZE_CONVERSATION, (now, size - draft.size, draft.chat_id))
+            else:
+                conn.execute(_SQL_INSERT_CONVERSATION, (draft.chat_id, make_title(content), draft.model, now, now))
+                draft.message_id = self._insert_message(conn, draft.chat_id, draft.role, content, now)
+            draft.size = size
+            return draft.message_id
+
+        return self._submit(op, draft.chat_id)
+
+    def save_context(self, chat_id: str, model: str, system_key: str, tokens: List[int]) -> Future:
+        """Mémorise le contexte Ollama d'une conversation (tableau d'entiers compacté en int32)."""
+        now = datetime.now().isoformat()
+        blob = array("i", tokens).tobytes()
+        return self._submit(
+            lambda conn: conn.execute(_SQL_UPSERT_CONTEXT, (chat_id, model, system_key, blob, now, chat_id)).rowcount > 0,
+            chat_id
+        )
+
+    def clear_context(self, chat_id: str) -> Future:
+        return self._submit(lambda conn: conn.execute(_SQL_DELETE_CONTEXT, (chat_id,)).rowcount > 0, chat_id)
+
+    def save_summary(self, chat_id: str, summary: str, covered_message_id: int) -> Future:
+        now = datetime.now().isoformat()
+        return self._submit(
+            lambda conn: conn.execute(
+                _SQL_UPSERT_SUMMARY, (chat_id, summary, covered_message_id, now, chat_id)
+            ).rowcount > 0,
+            chat_id
+        )
+
+    def delete_conversation(self, chat_id: str) -> Future:
+        """Supprime une conversation."""
+        return self._submit(lambda conn: conn.execute(_SQL_DELETE_CONVERSATION, (chat_id,)).rowcount > 0, chat_id)
+
+    # --- Lecture ---
 
     def get_all_conversations(self) -> List[Dict]:
         """
         Retourne la liste des conversations (ID, Titre, Date, Model).
         Pour l'affichage de la sidebar.
         """
-        chats = self._load_all()
-        # On trie par date décroissante (plus récent en haut)
-        return sorted(chats, key=lambda x: x.get('updated_at', ''), reverse=True)
+        conversations, _ = self.list_conversations(sort="updated_at", order="desc")
+        return conversations
 
     def get_conversation_messages(self, chat_id: str) -> Optional[List[Dict]]:
         """Récupère les messages d'une conversation spécifique."""
-        chats = self._load_all()
-        chat = next((c for c in chats if c['id'] == chat_id), None)
-        if chat:
-            return chat.get('messages', [])
-        return None
+        self._wait_chat(chat_id)
+        conn = self._reader()
+        if conn.execute(_SQL_SELECT_CONVERSATION, (chat_id,)).fetchone() is None:
+            return None
+        return [dict(row) for row in conn.execute(_SQL_SELECT_MESSAGES_TS, (chat_id,))]
 
-    def create_conversation(self, first_prompt: str, model: str) -> str:
+    def get_context(self, chat_id: str, model: str, system_key: str) -> Optional[List[int]]:
         """
-        Crée une nouvelle conversation avec le premier message utilisateur.
-        Retourne l'ID de la nouvelle conversation.
+        Contexte réutilisable pour le prochain tour, ou None. Un contexte produit
+        par un autre modèle ou avec un autre prompt système est invalidé.
         """
-        new_chat = {
-            "id": str(uuid.uuid4()),
-            "title": first_prompt[:30] + ("..." if len(first_prompt) > 30 else ""), # Titre = début du prompt
-            "model": model,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat(),
-            "messages": [
-                {"role": "user", "content": first_prompt, "timestamp": datetime.now().isoformat()}
-            ]
-        }
-        chats = self._load_all()
-        chats.append(new_chat)
-        self._save_all(chats)
-        return new_chat['id']
-
-    def add_message(self, chat_id: str, role: str, content: str):
+        self._wait_chat(chat_id)
+        row = self._reader().execute(_SQL_SELECT_CONTEXT, (chat_id,)).fetchone()
+        if row is None:
+            return None
+        if row["model"] != model or row["system_key"] != system_key:
+            self.clear_context(chat_id)
+            return None
+        tokens = array("i")
+        tokens.frombytes(row["tokens"])
+        return tokens.tolist()
+
+    def get_summary(self, chat_id: str) -> Tuple[str, int]:
+        """Résumé glissant et id du dernier message qu'il couvre ("", 0 si aucun)."""
+        self._wait_chat(chat_id)
+        row = self._reader().execute(_SQL_SELECT_SUMMARY, (chat_id,)).fetchone()
+        return (row["summary"], row["covered_message_id"]) if row else ("", 0)
+
+    def get_messages_after(self, chat_id: str, message_id: int = 0) -> List[Dict]:
+        """Messages {"id", "role", "content"} postérieurs à `message_id`, dans l'ordre."""
+        self._wait_chat(chat_id)
+        return [dict(row) for row in self._reader().execute(_SQL_SELECT_MESSAGES_AFTER, (chat_id, message_id))]
+
+    def most_used_models(self, limit: int = 3) -> List[str]:
+        """Modèles les plus utilisés (nombre de messages de leurs conversations)."""
+        return [row["model"] for row in self._reader().execute(_SQL_MODEL_USAGE, (limit,))]
+
+    def get_conversation(self, chat_id: str) -> Optional[Dict]:
+        """Conversation au format {"id", "model", "messages"} servi par /api/v1/conversations/{id}."""
+        self._wait_chat(chat_id)
+        conn = self._reader()
+        row = conn.execute(_SQL_SELECT_CONVERSATION, (chat_id,)).fetchone()
+        if row is None:
+            return None
+        messages = [dict(m) for m in conn.execute(_SQL_SELECT_MESSAGES, (chat_id,))]
+        return {"id": row["id"], "model": row["model"], "messages": messages}
+
+    @staticmethod
+    def encode_cursor(key: str, chat_id: str) -> str:
+        raw = json.dumps([key, chat_id], ensure_ascii=False).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[str, str]:
+        try:
+            key, chat_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            return str(key), str(chat_id)
+        except Exception:
+            raise ValueError("Curseur de pagination invalide")
+
+    def list_conversations(self, sort: str = "id", order: str = "desc", limit: Optional[int] = None,
+                           cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
         """
-        Ajoute une réponse (user ou assistant) à une conversation existante.
-        Met à jour la date de modification.
+        Pagination par clé (keyset) sur les index : O(log n + limit).
+        Renvoie (conversations, curseur suivant ou None).
         """
-        chats = self._load_all()
-        chat = next((c for c in chats if c['id'] == chat_id), None)
-        if chat:
-            chat['messages'].append({
-                "role": role, 
-                "content": content, 
-                "timestamp": datetime.now().isoformat()
-            })
-            chat['updated_at'] = datetime.now().isoformat()
-            self._save_all(chats)
-
-    def delete_conversation(self, chat_id: str):
-        """Supprime une conversation."""
-        chats = self._load_all()
-        chats = [c for c in chats if c['id'] != chat_id]
-        self._save_all(chats)
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Tri inconnu : {sort}")
+        if order not in ("asc", "desc"):
+            raise ValueError(f"Ordre inconnu : {order}")
+
+        op, direction = (">", "ASC") if order == "asc" else ("<", "DESC")
+        sql = f"SELECT {_SQL_LIST_COLUMNS} FROM conversations"
+        params: list = []
+        if cursor:
+            key, chat_id = self.decode_cursor(cursor)
+            sql += f" WHERE ({sort} {op} ? OR ({sort} = ? AND id {op} ?))"
+            params += [key, key, chat_id]
+        sql += f" ORDER BY {sort} {direction}, id {direction}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+
+        rows = [dict(r) for r in self._reader().execute(sql, params)]
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self.encode_cursor(rows[-1][sort], rows[-1]["id"])
+        return rows, next_cursor
+
+    @staticmethod
+    def build_match_query(query: str) -> Optional[str]:
+        """
+        Transforme la saisie utilisateur en requête FTS5 sûre : chaque mot est
+        cité (pas d'opérateurs injectés) et tous sont requis. Un '*' final active
+        la recherche par préfixe sur le dernier mot (plus coûteuse).
+        """
+        tokens = _SEARCH_TOKEN_RE.findall(query or "")
+        if not tokens:
+            return None
+        terms = [f'"{t}"' for t in tokens]
+        if query.rstrip().endswith("*"):
+            terms[-1] += "*"
+        return " ".join(terms)
+
+    def search(self, query: str, limit: int = 20, offset: int = 0,
+               highlight: Tuple[str, str] = ("<mark>", "</mark>")) -> Tuple[List[Dict], Optional[int]]:
+        """
+        Recherche plein texte dans tous les messages, classée par BM25.
+        Renvoie (résultats avec extrait surligné, offset de la page suivante ou None).
+        """
+        conn = self._reader()
+        if self.fts_enabled:
+            match = self.build_match_query(query)
+            if match is None:
+                return [], None
+            rows = conn.execute(_SQL_SEARCH, (match, limit + 1, offset))
+        else:
+            pattern = "%" + re.sub(r"([\\%_])", r"\\\1", query.strip()) + "%"
+            rows = conn.execute(_SQL_SEARCH_FALLBACK, (pattern, limit + 1, offset))
+
+        results = [dict(r) for r in rows]
+        next_offset = None
+        if len(results) > limit:
+            results = results[:limit]
+            next_offset = offset + limit
+        for r in results:
+            # bm25() renvoie un score négatif (plus petit = plus pertinent)
+            r["score"] = round(-r["score"], 4)
+            if self.fts_enabled:
+                # Extrait calculé uniquement pour la page renvoyée
+                r["snippet"] = conn.execute(
+                    _SQL_SEARCH_SNIPPET, (*highlight, settings.SEARCH_SNIPPET_TOKENS, match, r["message_id"])
+                ).fetchone()[0]
+        return results, next_offset
+
+    # --- Import des anciens formats ---
+
+    @staticmethod
+    def _read_legacy_transcript(path: Path) -> Optional[Dict]:
+        """Lit un chat_*.json (fichier complet) ou chat_*.jsonl (append-only : en-tête puis une ligne par message)."""
+        if path.suffix == ".json":
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        data = {"messages": []}
+        with open(path, "rb") as f:
+            for raw in f:
+                try:
+                    record = json.loads(raw)
+                except ValueError:
+                    continue  # Ligne tronquée par un crash
+                if record.get("type") == "header":
+                    data.setdefault("model", record.get("model"))
+                    data.setdefault("created_at", record.get("created_at"))
+                else:
+                    data["messages"].append(record)
+        return data
+
+    @staticmethod
+    def _read_legacy_index(path: Path) -> Dict[str, Dict]:
+        """Métadonnées de conversations_index.json (titre, dates) par id ; {} si absent ou illisible."""
+        if not path.exists():
+            return {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {entry["id"]: entry for entry in data.get("entries", []) if entry.get("id")}
+        except Exception as e:
+            logger.error(f"Erreur lecture {path.name}: {e}")
+            return {}
+
+    @staticmethod
+    def _import_conversation(conn: sqlite3.Connection, chat: Dict, title: str, fallback_ts: str) -> bool:
+        created_at = chat.get("created_at") or fallback_ts
+        updated_at = chat.get("updated_at") or fallback_ts
+        cursor = conn.execute(_SQL_INSERT_CONVERSATION, (chat["id"], title, chat.get("model"), created_at, created_at))
+        if not cursor.rowcount:
+            return False  # Déjà importée
+        for message in chat.get("messages", []):
+            ChatHistoryService._insert_message(
+                conn, chat["id"], message.get("role", "user"), message.get("content", ""),
+                message.get("timestamp") or created_at
+            )
+        conn.execute("UPDATE conversations SET updated_at = ? WHERE id = ?", (updated_at, chat["id"]))
+        return True
+
+    def import_legacy(self, data_dir: str = DATA_DIR) -> int:
+        """
+        Import unique de conversations.json et des chat_*.json / chat_*.jsonl écrits
+        par main.py. Les fichiers importés sont renommés en *.imported.
+        """
+        data_dir = Path(data_dir)
+        sources: List[Tuple[List[Path], List[Tuple[Dict, str, str]]]] = []
+
+        legacy_file = data_dir / "conversations.json"
+        if legacy_file.exists():
+            try:
+                with open(legacy_file, "r", encoding="utf-8") as f:
+                    chats = json.load(f)
+                fallback = datetime.fromtimestamp(legacy_file.stat().st_mtime).isoformat()
+                sources.append(([legacy_file], [
+                    (chat, chat.get("title") or make_title(None), fallback) for chat in chats if chat.get("id")
+                ]))
+            except Exception as e:
+                logger.error(f"Erreur lecture {legacy_file.name}: {e}")
+
+        # Index des métadonnées : dates de création / modification tenues à chaque message
+        index_file = data_dir / "conversations_index.json"
+        index = self._read_legacy_index(index_file)
+
+        # Un chat_<id>.json resté à côté de son .jsonl (migration append-only
+        # interrompue) est une copie plus ancienne : le .jsonl fait foi
+        transcripts: Dict[str, List[Path]] = {}
+        for path in sorted(data_dir.glob("chat_*.json")) + sorted(data_dir.glob("chat_*.jsonl")):
+            transcripts.setdefault(path.stem, []).append(path)
+        for chat_id, paths in transcripts.items():
+            path = paths[-1]
+            try:
+                chat = self._read_legacy_transcript(path)
+                chat["id"] = chat_id
+                entry = index.get(chat_id, {})
+                chat.setdefault("created_at", entry.get("created_at"))
+                chat.setdefault("updated_at", entry.get("updated_at"))
+                first = chat["messages"][0]["content"] if chat.get("messages") else None
+                fallback = datetime.fromtimestamp(path.stat().st_mtime).isoformat()
+                sources.append((paths, [(chat, entry.get("title") or make_title(first), fallback)]))
+            except Exception as e:
+                logger.error(f"Erreur lecture {path.name}: {e}")
+
+        # Restes d'une réécriture atomique interrompue : l'original est intact
+        for tmp in [*data_dir.glob("chat_*.jsonl.tmp"), data_dir / "conversations_index.json.tmp"]:
+            tmp.unlink(missing_ok=True)
+        if index_file.exists():
+            # Index dérivé des transcripts : ses métadonnées sont reprises ci-dessus
+            sources.append(([index_file], []))
+
+        if not sources:
+            return 0
+
+        def op(conn):
+            return sum(self._import_conversation(conn, *entry) for _, entries in sources for entry in entries)
+
+        imported = self._submit(op).result()
+        for paths, _ in sources:
+            for path in paths:
+                path.rename(path.with_name(path.name + ".imported"))
+        logger.info(f"📦 Historique : {imported} conversation(s) importée(s) dans SQLite")
+        return imported
 
 # Singleton
-chat_history_service = ChatHistoryService()
\ No newline at end of file
+chat_history_service = ChatHistoryService()
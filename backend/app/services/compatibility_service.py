@@ -1,38 +1,237 @@
-from app.services.gpu_service import get_gpu_info
-from app.services.system_service import get_system_info
+import asyncio
+import re
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from app.core.config import settings
 from app.data.models_db import MODELS
+from app.services.context_service import parse_num_ctx
+from app.services.gpu_service import gpu_service
+from app.services.ollama_service import ollama_service
+
+COMPATIBLE = "compatible"      # Entièrement en VRAM
+PARTIAL = "partial"            # Couches réparties GPU / CPU
+CPU_ONLY = "cpu_only"          # Pas de GPU : tient en RAM, exécution sur CPU
+INCOMPATIBLE = "incompatible"  # Ne tient pas en mémoire
+
+# Bits par poids moyens des quantifications GGUF (tenseurs non quantifiés compris)
+QUANT_BITS = {
+    "F32": 32.0, "F16": 16.0, "BF16": 16.0,
+    "Q8_0": 8.5, "Q6_K": 6.56, "Q5_1": 6.0, "Q5_K_M": 5.69, "Q5_K_S": 5.54, "Q5_0": 5.5,
+    "Q4_1": 5.0, "Q4_K_M": 4.85, "Q4_K_S": 4.58, "Q4_0": 4.55, "IQ4_XS": 4.25,
+    "Q3_K_L": 4.27, "Q3_K_M": 3.91, "Q3_K_S": 3.5, "Q2_K": 3.35,
+}
+DEFAULT_QUANT = "Q4_K_M"
+KV_BYTES = 2                    # Cache KV en f16 (défaut d'Ollama)
+GPU_OVERHEAD = 512 * 1024**2    # Contexte CUDA et buffers de calcul, hors poids et cache KV
+SLOW_CPU_THREADS = 8            # En dessous : génération sur CPU très lente
+
+_PARAMETER_SIZE_RE = re.compile(r"([\d.]+)\s*([KMBT])", re.IGNORECASE)
+_SCALE = {"K": 1e3, "M": 1e6, "B": 1e9, "T": 1e12}
+
+
+def parse_parameter_size(value: Optional[str]) -> int:
+    """'7B', '8.0B', '137M' (details.parameter_size d'Ollama) -> nombre de paramètres."""
+    match = _PARAMETER_SIZE_RE.search(value or "")
+    return int(float(match.group(1)) * _SCALE[match.group(2).upper()]) if match else 0
+
+
+class HardwareProfile(NamedTuple):
+    gpu_name: Optional[str]
+    vram: int      # Octets utilisables par les modèles (0 = pas de GPU)
+    ram: int       # Octets utilisables pour les couches déchargées sur CPU
+    threads: int
+
+
+class ModelSpec(NamedTuple):
+    name: str
+    installed: bool
+    parameters: int
+    quantization: str
+    layers: int
+    embedding: int
+    kv_heads: int
+    head_dim: int
+    context_length: int    # Contexte natif (0 = inconnu)
+    num_ctx: int           # num_ctx effectif par défaut (Modelfile ou défaut d'Ollama)
+    weights: int           # Octets des poids (taille du fichier si installé)
+
+    @classmethod
+    def from_catalog(cls, entry: Dict) -> "ModelSpec":
+        quantization = entry.get("quantization", DEFAULT_QUANT)
+        bits = QUANT_BITS.get(quantization.upper(), QUANT_BITS[DEFAULT_QUANT])
+        context_length = entry.get("context_length", 0)
+        return cls(
+            name=entry["name"],
+            installed=False,
+            parameters=entry["parameters"],
+            quantization=quantization,
+            layers=entry["layers"],
+            embedding=entry["embedding"],
+            kv_heads=entry.get("kv_heads", entry["heads"]),
+            head_dim=entry.get("head_dim") or entry["embedding"] // entry["heads"],
+            context_length=context_length,
+            num_ctx=min(context_length or settings.CONTEXT_DEFAULT_NUM_CTX, settings.CONTEXT_DEFAULT_NUM_CTX),
+            weights=int(entry["parameters"] * bits / 8),
+        )
+
+    @classmethod
+    def from_show(cls, name: str, size: int, show: Dict) -> "ModelSpec":
+        """Modèle installé : architecture lue dans model_info (clés '<architecture>.<champ>')."""
+        info = show.get("model_info") or {}
+        details = show.get("details") or {}
+        arch = info.get("general.architecture", "")
+
+        def field(key: str) -> int:
+            value = info.get(f"{arch}.{key}")
+            return value if isinstance(value, int) else 0
+
+        parameters = info.get("general.parameter_count") or parse_parameter_size(details.get("parameter_size"))
+        quantization = details.get("quantization_level") or DEFAULT_QUANT
+        embedding = field("embedding_length")
+        heads = field("attention.head_count")
+        if not size:
+            size = int(parameters * QUANT_BITS.get(quantization.upper(), QUANT_BITS[DEFAULT_QUANT]) / 8)
+        return cls(
+            name=name,
+            installed=True,
+            parameters=parameters,
+            quantization=quantization,
+            layers=field("block_count"),
+            embedding=embedding,
+            kv_heads=field("attention.head_count_kv") or heads,
+            head_dim=field("attention.key_length") or (embedding // heads if heads else 0),
+            context_length=field("context_length"),
+            num_ctx=parse_num_ctx(show) or settings.CONTEXT_DEFAULT_NUM_CTX,
+            weights=size,
+        )
+
+
+def estimate_fit(spec: ModelSpec, hardware: HardwareProfile, num_ctx: Optional[int] = None) -> Dict:
+    """
+    Empreinte mémoire de `spec` à `num_ctx` (défaut : num_ctx effectif du modèle)
+    et répartition des couches comme le fait Ollama : tout en VRAM si possible,
+    sinon autant de couches que la VRAM en accepte, le reste en RAM. Sans GPU,
+    le modèle entier est en RAM (pas de buffers GPU).
+    """
+    ctx = num_ctx or spec.num_ctx
+    if spec.context_length:
+        ctx = min(ctx, spec.context_length)
+    kv_cache = 2 * spec.layers * ctx * spec.kv_heads * spec.head_dim * KV_BYTES
+    total = spec.weights + kv_cache + GPU_OVERHEAD
+    reasons = []
+
+    if not hardware.vram:
+        total, gpu_layers = spec.weights + kv_cache, 0
+        reasons.append("Aucun GPU détecté : exécution sur CPU")
+        if total <= hardware.ram:
+            status = CPU_ONLY
+            if hardware.threads < SLOW_CPU_THREADS:
+                reasons.append("Peu de threads CPU : génération lente")
+        else:
+            status = INCOMPATIBLE
+            reasons.append("RAM insuffisante")
+    elif total <= hardware.vram:
+        status, gpu_layers = COMPATIBLE, spec.layers
+    else:
+        per_layer = (spec.weights + kv_cache) / spec.layers if spec.layers else 0
+        gpu_layers = 0
+        if per_layer and hardware.vram > GPU_OVERHEAD:
+            gpu_layers = min(spec.layers, int((hardware.vram - GPU_OVERHEAD) // per_layer))
+        reasons.append(f"VRAM insuffisante : {gpu_layers}/{spec.layers} couches sur GPU")
+        if spec.weights + kv_cache - gpu_layers * per_layer <= hardware.ram:
+            status = PARTIAL
+            if hardware.threads < SLOW_CPU_THREADS:
+                reasons.append("Peu de threads CPU : génération lente")
+        else:
+            status = INCOMPATIBLE
+            reasons.append("RAM insuffisante")
+
+    return {
+        "model": spec.name,
+        "installed": spec.installed,
+        "status": status,
+        "reasons": reasons,
+        "num_ctx": ctx,
+        "parameters": spec.parameters,
+        "quantization": spec.quantization,
+        "layers": spec.layers,
+        "gpu_layers": gpu_layers,
+        "weights_bytes": spec.weights,
+        "kv_cache_bytes": kv_cache,
+        "total_bytes": total,
+    }
+
+
+class FitEstimator:
+    """
+    Compatibilité matériel / modèles : modèles installés (métadonnées de /api/show,
+    mises en cache par digest) et catalogue (app/data/models_db.py), comparés au
+    profil matériel (mis en cache COMPAT_HARDWARE_TTL). Seules les métadonnées
+    des modèles nouveaux ou re-téléchargés sont lues : le calcul lui-même est
+    une boucle Python de quelques multiplications par modèle.
+    """
 
+    def __init__(self, ollama=None, gpu=None, catalog: Optional[List[Dict]] = None):
+        self.ollama = ollama or ollama_service
+        self.gpu = gpu or gpu_service
+        self.catalog = [ModelSpec.from_catalog(entry) for entry in (MODELS if catalog is None else catalog)]
+        self._specs: Dict[str, ModelSpec] = {}   # digest -> spec (modèles installés)
+        self._hardware: Optional[HardwareProfile] = None
+        self._hardware_at = 0.0
 
-def check_models_compatibility():
-    gpu = get_gpu_info()
-    system = get_system_info()
+    # --- Matériel ---
 
-    results = []
+    def _probe_hardware(self) -> HardwareProfile:
+        import psutil
+        stats = self.gpu.get_gpu_stats()
+        total_mb = settings.RESIDENCY_VRAM_MB or (stats.get("total_mb", 0) if stats.get("available") else 0)
+        return HardwareProfile(
+            gpu_name=stats.get("name") if stats.get("available") else None,
+            vram=int(total_mb * 1024**2 * settings.RESIDENCY_VRAM_RATIO),
+            ram=int(psutil.virtual_memory().total * settings.COMPAT_RAM_RATIO),
+            threads=psutil.cpu_count(logical=True) or 1,
+        )
 
-    for model in MODELS:
-        status = "compatible"
-        reasons = []
+    async def hardware(self) -> HardwareProfile:
+        if self._hardware is None or time.monotonic() - self._hardware_at > settings.COMPAT_HARDWARE_TTL:
+            self._hardware = await asyncio.to_thread(self._probe_hardware)
+            self._hardware_at = time.monotonic()
+        return self._hardware
 
-        if not gpu.get("gpu_available"):
-            status = "incompatible"
-            reasons.append("No GPU detected")
+    # --- Modèles ---
 
-        if gpu.get("vram_total_mb", 0) / 1024 < model["min_vram"]:
-            status = "incompatible"
-            reasons.append("Not enough VRAM")
+    async def _installed_spec(self, model: Dict) -> Optional[ModelSpec]:
+        name, digest = model.get("name"), model.get("digest")
+        if digest in self._specs:
+            return self._specs[digest]._replace(name=name)
+        show = await self.ollama.show_model(name)
+        if not show:
+            return None
+        spec = ModelSpec.from_show(name, model.get("size", 0), show)
+        if digest:
+            self._specs[digest] = spec
+        return spec
 
-        if system["ram"]["total_gb"] < model["min_ram"]:
-            status = "incompatible"
-            reasons.append("Not enough RAM")
+    async def specs(self) -> List[ModelSpec]:
+        """Modèles installés puis modèles du catalogue non installés."""
+        tags = await self.ollama.tags()
+        installed = (tags or {}).get("models", [])
+        specs = [s for s in await asyncio.gather(*(self._installed_spec(m) for m in installed)) if s]
+        if tags is not None:
+            # Digests disparus (modèle supprimé ou re-téléchargé) : plus de raison de les garder
+            digests = {m.get("digest") for m in installed}
+            self._specs = {d: s for d, s in self._specs.items() if d in digests}
+        names = {s.name for s in specs}
+        return specs + [s for s in self.catalog if s.name not in names]
 
-        if system["cpu"]["threads"] < model["min_threads"]:
-            status = "incompatible"
-            reasons.append("Not enough CPU threads")
+    async def check_all(self, num_ctx: Optional[int] = None) -> Dict:
+        hardware, specs = await asyncio.gather(self.hardware(), self.specs())
+        return {
+            "hardware": hardware._asdict(),
+            "models": [estimate_fit(spec, hardware, num_ctx) for spec in specs],
+        }
 
-        results.append({
-            "model": model["name"],
-            "status": status,
-            "reasons": reasons,
-        })
 
-    return results
+# Singleton
+fit_estimator = FitEstimator()
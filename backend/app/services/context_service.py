@@ -0,0 +1,215 @@
+import asyncio
+import math
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.services.chat_history_service import chat_history_service
+from app.services.ollama_service import ollama_service
+from app.services.scheduler_service import BACKGROUND, request_scheduler
+
+SUMMARY_SYSTEM = (
+    "Tu résumes des conversations entre un utilisateur et un assistant. "
+    "Conserve les faits, décisions, préférences et questions en suspens. "
+    "Réponds uniquement par le résumé, dans la langue de la conversation."
+)
+# Début de phrase ou de ligne : point de coupe d'un résumé trop long
+_SENTENCE_START_RE = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation sans tokenizer : ~4 caractères par token (volontairement pessimiste)."""
+    return math.ceil(len(text) / 4) if text else 0
+
+
+def trim_tokens(text: str, max_tokens: int) -> str:
+    """
+    Fin de `text` dans `max_tokens` (estimation), coupée au début d'une phrase
+    ou d'une ligne ; à défaut à un espace : jamais en plein mot.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    tail = text[-max_tokens * 4:] if max_tokens > 0 else ""
+    boundary = _SENTENCE_START_RE.search(tail)
+    if boundary is not None:
+        return tail[boundary.end():]
+    space = tail.find(" ")
+    return tail[space + 1:] if space != -1 else ""
+
+
+def parse_num_ctx(show: dict) -> Optional[int]:
+    """num_ctx effectif : paramètre du Modelfile, sinon longueur native plafonnée au défaut d'Ollama."""
+    for line in (show.get("parameters") or "").splitlines():
+        parts = line.split()
+        if len(parts) == 2 and parts[0] == "num_ctx" and parts[1].isdigit():
+            return int(parts[1])
+    for key, value in (show.get("model_info") or {}).items():
+        if key.endswith(".context_length") and isinstance(value, int):
+            return min(value, settings.CONTEXT_DEFAULT_NUM_CTX)
+    return None
+
+
+class ModelInfoCache:
+    """num_ctx par modèle, mis en cache par digest : un modèle re-téléchargé est relu."""
+
+    def __init__(self, ollama=None):
+        self.ollama = ollama or ollama_service
+        self._num_ctx: Dict[str, int] = {}       # digest -> num_ctx
+        self._digests: Dict[str, str] = {}       # nom -> digest
+        self._digests_at = 0.0
+
+    async def _digest(self, model: str) -> Optional[str]:
+        if model not in self._digests or time.monotonic() - self._digests_at > settings.CONTEXT_DIGEST_TTL:
+            tags = await self.ollama.tags()
+            if tags is not None:
+                self._digests = {m.get("name"): m.get("digest") for m in tags.get("models", [])}
+                self._digests_at = time.monotonic()
+        return self._digests.get(model)
+
+    async def num_ctx(self, model: str) -> int:
+        digest = await self._digest(model)
+        if digest and digest in self._num_ctx:
+            return self._num_ctx[digest]
+        show = await self.ollama.show_model(model)
+        value = (parse_num_ctx(show) if show else None) or settings.CONTEXT_DEFAULT_NUM_CTX
+        if digest and show:
+            self._num_ctx[digest] = value
+        return value
+
+
+class ContextWindowManager:
+    """
+    Construit le prompt de chaque tour dans un budget de tokens :
+    - contexte KV du tour précédent tant qu'il tient dans le budget ;
+    - sinon résumé glissant + derniers messages qui tiennent + question.
+    Le résumé des anciens tours est produit par une tâche de fond, jamais
+    pendant la requête : la taille du prompt reste à peu près constante.
+    """
+
+    def __init__(self, history=None, ollama=None, scheduler=None):
+        self.history = history or chat_history_service
+        self.ollama = ollama or ollama_service
+        self.scheduler = scheduler or request_scheduler
+        self.models = ModelInfoCache(self.ollama)
+        self._jobs: Dict[str, asyncio.Task] = {}
+
+    async def budget(self, model: str) -> int:
+        return int(await self.models.num_ctx(model) * settings.CONTEXT_PROMPT_RATIO)
+
+    @staticmethod
+    def _message_tokens(message: Dict) -> int:
+        return estimate_tokens(message["content"]) + 4  # rôle + séparateurs
+
+    @staticmethod
+    def compose(summary: str, messages: List[Dict], question: str) -> str:
+        sections = []
+        if summary:
+            sections.append(f"Résumé de la conversation: {summary}")
+        if messages:
+            sections.append("Historique récent:\n" + "\n".join(f"{m['role']}: {m['content']}" for m in messages))
+        sections.append(question)
+        return "\n\n".join(sections)
+
+    async def build(self, chat_id: str, model: str, system: str, question: str,
+                    context: Optional[List[int]] = None) -> Tuple[str, Optional[List[int]]]:
+        """
+        Renvoie (prompt, context) pour ce tour. `question` est le bloc du message
+        courant (contexte web inclus), déjà enregistré dans l'historique.
+        """
+        budget = await self.budget(model)
+        fixed = estimate_tokens(system) + estimate_tokens(question)
+
+        if context is not None and len(context) + fixed <= budget:
+            # Le résumé est préparé avant que le contexte ne déborde
+            if len(context) > budget * settings.CONTEXT_SUMMARY_TRIGGER:
+                self.schedule_summary(chat_id, model, budget)
+            return question, context
+
+        # Lectures SQLite bloquantes : hors de la boucle asyncio, comme dans _summarise
+        summary, covered = await asyncio.to_thread(self.history.get_summary, chat_id)
+        messages = await asyncio.to_thread(self.history.get_messages_after, chat_id, covered)
+        if messages and messages[-1]["role"] == "user":
+            messages = messages[:-1]  # Message courant : déjà dans `question`
+
+        # Résumé plafonné (coupé entre deux phrases), puis les messages les plus récents qui tiennent
+        summary = trim_tokens(summary, budget // 4)
+        remaining = budget - fixed - estimate_tokens(summary)
+        recent: List[Dict] = []
+        for message in reversed(messages):
+            cost = self._message_tokens(message)
+            if cost > remaining:
+                break
+            recent.append(message)
+            remaining -= cost
+        recent.reverse()
+
+        unsummarised = sum(self._message_tokens(m) for m in messages)
+        if len(recent) < len(messages) or unsummarised > budget * settings.CONTEXT_SUMMARY_TRIGGER:
+            self.schedule_summary(chat_id, model, budget)
+
+        return self.compose(summary, recent, question), None
+
+    # --- Résumé en arrière-plan ---
+
+    def schedule_summary(self, chat_id: str, model: str, budget: int):
+        if chat_id in self._jobs:
+            return
+        task = asyncio.get_running_loop().create_task(self._summarise(chat_id, model, budget))
+        self._jobs[chat_id] = task
+        task.add_done_callback(lambda _: self._jobs.pop(chat_id, None))
+
+    async def _summarise(self, chat_id: str, model: str, budget: int):
+        try:
+            summary, covered = await asyncio.to_thread(self.history.get_summary, chat_id)
+            messages = await asyncio.to_thread(self.history.get_messages_after, chat_id, covered)
+            to_compact = messages[:-settings.CONTEXT_KEEP_RECENT_MESSAGES] if settings.CONTEXT_KEEP_RECENT_MESSAGES else messages
+            # Pas d'appel au modèle pour deux messages : on attend un lot significatif
+            if sum(self._message_tokens(m) for m in to_compact) < budget // 4:
+                return
+            summary_words = max(50, budget // 8)
+            started = time.perf_counter()
+
+            # Par lots qui tiennent dans le contexte du modèle de résumé
+            batch: List[Dict] = []
+            batch_tokens = 0
+            for index, message in enumerate(to_compact):
+                batch.append(message)
+                batch_tokens += self._message_tokens(message)
+                if batch_tokens < budget // 2 and index < len(to_compact) - 1:
+                    continue
+                transcript = "\n".join(f"{m['role']}: {m['content']}" for m in batch)
+                prompt = (
+                    (f"Résumé actuel :\n{summary}\n\n" if summary else "")
+                    + f"Nouveaux échanges :\n{transcript}\n\n"
+                    + f"Rédige le résumé mis à jour de toute la conversation, en {summary_words} mots au plus."
+                )
+                summary_model = settings.CONTEXT_SUMMARY_MODEL or model
+                # Tâche de fond : passe après les requêtes de chat en attente
+                async with self.scheduler.slot(summary_model, BACKGROUND):
+                    result = await self.ollama.generate(summary_model, prompt, system=SUMMARY_SYSTEM)
+                if not result:
+                    return
+                summary, covered = result.strip(), batch[-1]["id"]
+                self.history.save_summary(chat_id, summary, covered)
+                batch, batch_tokens = [], 0
+
+            if to_compact:
+                logger.info(
+                    f"🧾 Résumé de {chat_id} mis à jour ({len(to_compact)} messages, "
+                    f"{time.perf_counter() - started:.1f}s)"
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Erreur résumé de conversation: {e}")
+
+    async def stop(self):
+        for task in list(self._jobs.values()):
+            task.cancel()
+        await asyncio.gather(*self._jobs.values(), return_exceptions=True)
+
+
+# Singleton
+context_window = ContextWindowManager()
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import logging
+import threading
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+
+# Topics d'état : le serveur garde la dernière valeur, envoie un instantané à la
+# connexion puis uniquement les champs modifiés (delta).
+STATE_TOPICS = ("telemetry", "health", "models")
+# Topics de flux : chaque événement est transmis tel quel.
+STREAM_TOPICS = ("logs", "pulls")
+TOPICS = STATE_TOPICS + STREAM_TOPICS
+
+
+def diff_state(old: Optional[dict], new: dict, path: tuple = ()) -> Tuple[dict, List[list]]:
+    """
+    Delta récursif entre deux dicts : (champs ajoutés/modifiés, chemins des
+    champs supprimés). Un champ qui vaut None reste une valeur, pas une suppression.
+    """
+    if not isinstance(old, dict):
+        return dict(new), []
+    delta, deleted = {}, []
+    for key, value in new.items():
+        previous = old.get(key)
+        if isinstance(value, dict) and isinstance(previous, dict):
+            sub, sub_deleted = diff_state(previous, value, path + (key,))
+            if sub:
+                delta[key] = sub
+            deleted += sub_deleted
+        elif key not in old or previous != value:
+            delta[key] = value
+    deleted += [[*path, key] for key in old.keys() - new.keys()]
+    return delta, deleted
+
+
+class _Subscriber:
+    def __init__(self, topics: Set[str]):
+        self.topics = topics
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+
+
+class EventBus:
+    """
+    Canal d'événements multiplexé (consommé par /api/v1/events en SSE).
+    publish_* peut être appelé depuis n'importe quel thread : la diffusion
+    a toujours lieu sur la boucle asyncio.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Set[_Subscriber] = set()
+        self._state: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def has_subscribers(self, topic: str) -> bool:
+        return any(topic in s.topics for s in tuple(self._subscribers))
+
+    # --- Publication ---
+
+    def _schedule(self, event: dict):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._dispatch(event)
+        else:
+            loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _dispatch(self, event: dict):
+        for sub in tuple(self._subscribers):
+            if event["topic"] not in sub.topics:
+                continue
+            try:
+                sub.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Client trop lent : on vide sa file et on lui renverra des instantanés
+                sub.overflowed = True
+
+    def publish_state(self, topic: str, state: dict):
+        """Met à jour l'état d'un topic ; ne diffuse que s'il a réellement changé."""
+        with self._lock:
+            delta, deleted = diff_state(self._state.get(topic), state)
+            if not delta and not deleted:
+                return
+            self._state[topic] = state
+        event = {"topic": topic, "type": "delta", "data": delta}
+        if deleted:
+            event["deleted"] = deleted
+        self._schedule(event)
+
+    def publish_event(self, topic: str, data: dict):
+        self._schedule({"topic": topic, "type": "event", "data": data})
+
+    def snapshot(self, topic: str) -> Optional[dict]:
+        return self._state.get(topic)
+
+    # --- Abonnement ---
+
+    def _snapshots(self, topics: Iterable[str]):
+        for topic in topics:
+            state = self._state.get(topic)
+            if topic in STATE_TOPICS and state is not None:
+                yield {"topic": topic, "type": "snapshot", "data": state}
+
+    async def subscribe(self, topics: Iterable[str]) -> AsyncIterator[Optional[dict]]:
+        """
+        Générateur d'événements pour un client. Renvoie None à chaque
+        EVENTS_KEEPALIVE secondes sans événement (commentaire keep-alive SSE).
+        """
+        sub = _Subscriber(set(topics))
+        self._subscribers.add(sub)
+        try:
+            for event in self._snapshots(sub.topics):
+                yield event
+            while True:
+                if sub.overflowed:
+                    sub.overflowed = False
+                    while not sub.queue.empty():
+                        sub.queue.get_nowait()
+                    for event in self._snapshots(sub.topics):
+                        yield event
+                try:
+                    yield await asyncio.wait_for(sub.queue.get(), timeout=settings.EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self._subscribers.discard(sub)
+
+    @staticmethod
+    def format_sse(event: Optional[dict]) -> str:
+        if event is None:
+            return ": keep-alive\n\n"
+        message = {"type": event["type"], "data": event["data"]}
+        if event.get("deleted"):
+            message["deleted"] = event["deleted"]  # Chemins des champs supprimés (delta)
+        payload = json.dumps(message, ensure_ascii=False)
+        return f"event: {event['topic']}\ndata: {payload}\n\n"
+
+
+class EventBusLogHandler(logging.Handler):
+    """Pousse chaque ligne de log sur le topic 'logs' (seulement s'il y a des abonnés)."""
+
+    def __init__(self, bus: EventBus):
+        super().__init__(level=logging.INFO)
+        self.bus = bus
+
+    def emit(self, record: logging.LogRecord):
+        if not self.bus.has_subscribers("logs"):
+            return
+        try:
+            self.bus.publish_event("logs", {"line": self.format(record), "level": record.levelname})
+        except Exception:
+            self.handleError(record)
+
+
+# Singleton
+event_bus = EventBus()
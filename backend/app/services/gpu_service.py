@@ -1,18 +1,33 @@
-import pynvml as nvml
+import threading
 from typing import Dict, Any
 
 class GPUService:
     def __init__(self):
-        self.available = False
+        # NVML importé et initialisé à la première lecture : rien au démarrage du serveur
+        self._available = None
+        self._nvml = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        if self._available is None:
+            with self._lock:
+                if self._available is None:
+                    self._available = self._init_nvml()
+        return self._available
+
+    def _init_nvml(self) -> bool:
         try:
             # On essaie d'initialiser NVML
+            import pynvml as nvml
             nvml.nvmlInit()
             self.device_count = nvml.nvmlDeviceGetCount()
-            self.available = True
+            self._nvml = nvml
+            return True
         except Exception as e:
             # On capture l'erreur ici pour empêcher le crash
             print(f"[DEBUG] Service GPU non disponible (Pas de carte ou driver manquant) : {e}")
-            self.available = False
+            return False
 
     def get_gpu_stats(self) -> Dict[str, Any]:
         if not self.available:
@@ -25,18 +40,18 @@ class GPUService:
             }
 
         try:
-            handle = nvml.nvmlDeviceGetHandleByIndex(0) # On prend la carte 0
+            handle = self._nvml.nvmlDeviceGetHandleByIndex(0) # On prend la carte 0
             
             # Nom de la carte
-            name_raw = nvml.nvmlDeviceGetName(handle)
+            name_raw = self._nvml.nvmlDeviceGetName(handle)
             name = name_raw.decode("utf-8") if isinstance(name_raw, bytes) else name_raw
             
             # Utilisation (%)
-            utilization = nvml.nvmlDeviceGetUtilizationRates(handle)
+            utilization = self._nvml.nvmlDeviceGetUtilizationRates(handle)
             gpu_usage = utilization.gpu
             
             # Mémoire VRAM
-            mem_info = nvml.nvmlDeviceGetMemoryInfo(handle)
+            mem_info = self._nvml.nvmlDeviceGetMemoryInfo(handle)
             used_mb = mem_info.used // 1024**2
             total_mb = mem_info.total // 1024**2
 
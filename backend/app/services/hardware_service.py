@@ -2,6 +2,7 @@ import shutil
 import psutil
 import os
 from typing import Dict, Any
+from app.services.monitoring_service import telemetry_sampler
 
 class HardwareService:
 
@@ -10,8 +11,8 @@ class HardwareService:
         Récupère l'état actuel du système.
         Renvoie des valeurs simples (nombres), pas d'objets imbriqués.
         """
-        # 1. CPU
-        cpu_usage = psutil.cpu_percent(interval=0.1)
+        # 1. CPU (dernier relevé de l'échantillonneur : pas d'attente bloquante)
+        cpu_usage = telemetry_sampler.latest()["cpu"]["usage_percent"]
         
         # 2. RAM
         mem = psutil.virtual_memory()
@@ -0,0 +1,85 @@
+import asyncio
+from typing import Dict, Optional, Set
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.startup import startup_report
+from app.services.event_service import event_bus
+from app.services.ollama_service import ollama_service
+from app.services.supervisor_service import ollama_supervisor
+
+
+class HealthMonitor:
+    """
+    Sonde Ollama en arrière-plan à intervalle fixe, quel que soit le nombre
+    de clients connectés, et publie l'état de santé et la liste des modèles
+    sur le canal d'événements (uniquement quand ils changent).
+    """
+
+    def __init__(self, interval: float = None):
+        self.interval = interval or settings.HEALTH_PROBE_INTERVAL
+        self.latest: Optional[Dict] = None
+        self._task: Optional[asyncio.Task] = None
+        self._probes: Set[asyncio.Task] = set()  # Sondes immédiates (refresh) en cours
+
+    async def probe_once(self) -> Dict:
+        tags = await ollama_service.probe()
+        alive = tags is not None
+        if alive and self.latest is not None and self.latest["checks"]["ollama"] != "ok":
+            # Ollama (re)démarré : détails de modèles en cache à relire
+            ollama_service.invalidate()
+        state = {
+            "status": "healthy" if alive else "degraded",
+            "checks": {
+                "backend": "ok",
+                "ollama": "ok" if alive else "unreachable"
+            },
+            "ollama_process": ollama_supervisor.state
+        }
+        self.latest = state
+        event_bus.publish_state("health", state)
+        if alive:
+            startup_report.mark("ollama_ready")
+            names = sorted(m.get("name") for m in tags.get("models", []))
+            event_bus.publish_state("models", {"models": names})
+        return state
+
+    async def current(self) -> Dict:
+        """Dernier état de la sonde (sonde immédiate si elle n'a pas encore tourné)."""
+        return self.latest or await self.probe_once()
+
+    def refresh(self):
+        """Sonde immédiate, sans attendre le prochain tick (après un pull / une suppression)."""
+        if self._task is None:
+            return  # Moniteur arrêté (ou pas encore démarré : sa première sonde suit)
+        task = asyncio.get_running_loop().create_task(self.probe_once())
+        self._probes.add(task)
+        task.add_done_callback(self._probes.discard)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.probe_once()
+            except Exception as e:
+                logger.error(f"Erreur sonde santé: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._probes):
+            task.cancel()
+        await asyncio.gather(*self._probes, return_exceptions=True)
+
+
+# Singleton
+health_monitor = HealthMonitor()
@@ -0,0 +1,210 @@
+import asyncio
+import base64
+import hashlib
+import io
+import os
+import threading
+import uuid
+from typing import BinaryIO, Dict, Iterator, NamedTuple, Optional
+
+from app.core.config import DATA_DIR, settings
+from app.core.logger import logger
+
+IMAGE_CACHE_DIR = settings.IMAGE_CACHE_PATH or os.path.join(DATA_DIR, "image_cache")
+
+# Lecture par blocs, multiple de 3 : l'encodage base64 bloc par bloc reste contigu
+CHUNK_SIZE = 3 * 256 * 1024
+
+
+def _pillow_available() -> bool:
+    """La réduction des images dépend du paquet optionnel 'Pillow'."""
+    try:
+        import PIL  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class ImageTooLargeError(Exception):
+    """Image jointe au-delà de IMAGE_MAX_UPLOAD_MB."""
+
+
+class PreparedImage(NamedTuple):
+    """
+    Payload base64 prêt à envoyer, sur disque : relu par blocs à l'envoi. Le fichier
+    est ouvert dès la préparation : une éviction du cache pendant la requête ne le
+    rend pas illisible (POSIX : données conservées ; Windows : suppression refusée).
+    """
+    key: str        # Hash du contenu + réglages de réduction
+    path: str
+    size: int       # Octets du payload base64
+    file: BinaryIO
+
+    def chunks(self) -> Iterator[bytes]:
+        self.file.seek(0)
+        yield from iter(lambda: self.file.read(CHUNK_SIZE), b"")
+
+    def close(self):
+        self.file.close()
+
+
+class ImagePipeline:
+    """
+    Prépare les images jointes au chat sans jamais les charger entières en mémoire :
+    - lecture par blocs du fichier d'upload (déjà mis sur disque par Starlette au-delà
+      de 1 Mo) avec calcul du hash du contenu ;
+    - réduction à IMAGE_MAX_SIDE pixels (côté le plus long) si Pillow est installé,
+      sinon encodage base64 en flux ;
+    - cache disque hash -> payload base64 (LRU par date d'accès, IMAGE_CACHE_MAX_MB) :
+      une image renvoyée ne coûte rien ; le payload est relu par blocs pendant
+      l'envoi de la requête à Ollama (voir OllamaService.chat_stream).
+    """
+
+    def __init__(self, cache_dir: str = IMAGE_CACHE_DIR, max_side: Optional[int] = None,
+                 max_upload_mb: Optional[int] = None, cache_max_mb: Optional[int] = None):
+        self.cache_dir = cache_dir
+        self.max_side = settings.IMAGE_MAX_SIDE if max_side is None else max_side
+        self.max_upload = (settings.IMAGE_MAX_UPLOAD_MB if max_upload_mb is None else max_upload_mb) * 1024**2
+        self.cache_max = (settings.IMAGE_CACHE_MAX_MB if cache_max_mb is None else cache_max_mb) * 1024**2
+        self.downscale = bool(self.max_side) and _pillow_available()
+        if self.max_side and not self.downscale:
+            logger.info("📷 Paquet 'Pillow' absent : images jointes envoyées sans réduction")
+        self.stats = {"hits": 0, "misses": 0, "bytes_in": 0, "bytes_out": 0}
+        self._pinned: Dict[str, int] = {}   # Chemin -> préparations en cours (jamais évincé)
+        self._lock = threading.Lock()
+
+    @property
+    def variant(self) -> str:
+        """Réglages qui changent le payload produit (partie de la clé du cache)."""
+        return f"s{self.max_side}q{settings.IMAGE_JPEG_QUALITY}" if self.downscale else "raw"
+
+    # --- Étapes (thread) ---
+
+    def _hash(self, src: BinaryIO) -> str:
+        digest = hashlib.sha256()
+        size = 0
+        src.seek(0)
+        for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+            size += len(chunk)
+            if size > self.max_upload:
+                raise ImageTooLargeError(f"Image trop volumineuse (max {self.max_upload // 1024**2} Mo)")
+            digest.update(chunk)
+        self.stats["bytes_in"] += size
+        return digest.hexdigest()
+
+    @staticmethod
+    def _encode(src: BinaryIO, out: BinaryIO):
+        src.seek(0)
+        for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+            out.write(base64.b64encode(chunk))
+
+    def _reduce(self, src: BinaryIO, out: BinaryIO):
+        from PIL import Image, ImageOps
+
+        src.seek(0)
+        with Image.open(src) as img:
+            if max(img.size) <= self.max_side and img.format in ("JPEG", "PNG"):
+                self._encode(src, out)  # Déjà à la bonne taille : pas de ré-encodage
+                return
+            # JPEG : décodage directement à une échelle réduite (1/2, 1/4, 1/8)
+            img.draft("RGB", (self.max_side, self.max_side))
+            reduced = ImageOps.exif_transpose(img)
+            reduced.thumbnail((self.max_side, self.max_side))
+            if reduced.mode not in ("RGB", "L"):
+                reduced = reduced.convert("RGB")
+            buffer = io.BytesIO()
+            reduced.save(buffer, "JPEG", quality=settings.IMAGE_JPEG_QUALITY)
+        out.write(base64.b64encode(buffer.getbuffer()))
+
+    def _pin(self, path: str, delta: int):
+        with self._lock:
+            count = self._pinned.get(path, 0) + delta
+            if count > 0:
+                self._pinned[path] = count
+            else:
+                self._pinned.pop(path, None)
+
+    def _evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".b64"):
+                    stat = entry.stat()
+                    entries.append((stat.st_atime, stat.st_size, entry.path))
+                    total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.cache_max:
+                break
+            with self._lock:
+                # Entrée en cours de préparation (dont celle qui vient d'être écrite) : gardée
+                if path in self._pinned:
+                    continue
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass  # Windows : fichier ouvert par une requête en cours
+
+    def _open(self, key: str, path: str) -> PreparedImage:
+        f = open(path, "rb")
+        return PreparedImage(key, path, os.fstat(f.fileno()).st_size, f)
+
+    def prepare_file(self, src: BinaryIO) -> PreparedImage:
+        """
+        Payload base64 de l'image `src` (fichier binaire), depuis le cache si possible.
+        L'image renvoyée garde son fichier ouvert : appeler close() après l'envoi.
+        """
+        key = f"{self._hash(src)}-{self.variant}"
+        path = os.path.join(self.cache_dir, f"{key}.b64")
+        self._pin(path, 1)
+        try:
+            return self._prepare(src, key, path)
+        finally:
+            self._pin(path, -1)
+
+    def _prepare(self, src: BinaryIO, key: str, path: str) -> PreparedImage:
+        try:
+            image = self._open(key, path)
+            self.stats["hits"] += 1
+            try:
+                os.utime(path)  # Date d'accès explicite : pas de dépendance à noatime
+            except OSError:
+                pass
+            return image
+        except FileNotFoundError:
+            pass
+
+        self.stats["misses"] += 1
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with open(tmp, "wb") as out:
+                if self.downscale:
+                    try:
+                        self._reduce(src, out)
+                    except Exception as e:
+                        logger.warning(f"⚠️ Image non réduite ({e}), envoyée telle quelle")
+                        out.seek(0)
+                        out.truncate()
+                        self._encode(src, out)
+                else:
+                    self._encode(src, out)
+            try:
+                os.replace(tmp, path)
+            except PermissionError:
+                pass  # Windows : même image préparée et ouverte entre-temps par une autre requête
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        image = self._open(key, path)
+        self.stats["bytes_out"] += image.size
+        self._evict()
+        return image
+
+    async def prepare(self, src: BinaryIO) -> PreparedImage:
+        return await asyncio.to_thread(self.prepare_file, src)
+
+
+# Singleton
+image_pipeline = ImagePipeline()
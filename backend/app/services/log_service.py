@@ -0,0 +1,280 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logger import LOG_FILE
+
+BLOCK_SIZE = 8192
+# Nombre de fichiers de rotation conservés par le RotatingFileHandler (app.log.1 ... app.log.5)
+BACKUP_COUNT = 5
+
+
+class LogFilter:
+    """
+    Filtre côté serveur : niveau minimum et sous-chaîne (insensible à la casse).
+    Les lignes de continuation (traceback...) héritent du niveau de l'entrée précédente.
+    """
+
+    def __init__(self, level: Optional[str] = None, contains: Optional[str] = None):
+        self.min_level = None
+        if level:
+            value = logging.getLevelName(level.upper())
+            if not isinstance(value, int):
+                raise ValueError(f"Niveau de log inconnu : {level}")
+            self.min_level = value
+        self.contains = contains.lower() if contains else None
+
+    @property
+    def active(self) -> bool:
+        return self.min_level is not None or self.contains is not None
+
+    @staticmethod
+    def parse_level(line: str) -> Optional[int]:
+        # Format : "date | LEVEL    | nom | message"
+        parts = line.split(" | ", 2)
+        if len(parts) < 3:
+            return None
+        value = logging.getLevelName(parts[1].strip())
+        return value if isinstance(value, int) else None
+
+    def matches(self, line: str, level: Optional[int]) -> bool:
+        if self.min_level is not None and (level is None or level < self.min_level):
+            return False
+        if self.contains is not None and self.contains not in line.lower():
+            return False
+        return True
+
+    def apply(self, lines: List[str]) -> List[str]:
+        if not self.active:
+            return lines
+        kept, level = [], None
+        for line in lines:
+            level = self.parse_level(line) or level
+            if self.matches(line, level):
+                kept.append(line)
+        return kept
+
+
+class LogReader:
+    """
+    Lecture du fichier de log sans jamais le charger en entier :
+    - tail() remonte depuis la fin par blocs jusqu'à obtenir N lignes ;
+    - read_since() ne lit que ce qui a été écrit après un curseur "inode:offset",
+      en suivant la rotation (app.log -> app.log.1) du RotatingFileHandler.
+    """
+
+    def __init__(self, path: str = LOG_FILE, backup_count: int = BACKUP_COUNT):
+        self.path = path
+        self.backup_count = backup_count
+
+    # --- Curseur ---
+
+    @staticmethod
+    def _file_id(st: os.stat_result) -> int:
+        return st.st_ino
+
+    @staticmethod
+    def make_cursor(file_id: int, offset: int) -> str:
+        return f"{file_id}:{offset}"
+
+    @staticmethod
+    def parse_cursor(cursor: str) -> Tuple[int, int]:
+        try:
+            file_id, offset = cursor.split(":", 1)
+            return int(file_id), int(offset)
+        except ValueError:
+            raise ValueError(f"Curseur invalide : {cursor}")
+
+    def current_cursor(self) -> Optional[str]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return self.make_cursor(self._file_id(st), st.st_size)
+
+    def _rotated_paths(self) -> List[str]:
+        return [f"{self.path}.{i}" for i in range(1, self.backup_count + 1)]
+
+    # --- Lecture arrière (tail) ---
+
+    @staticmethod
+    def _iter_lines_backwards(f, end: int) -> Iterator[bytes]:
+        """Lignes complètes de [0, end), de la dernière à la première."""
+        position = end
+        remainder = b""
+        while position > 0:
+            size = min(BLOCK_SIZE, position)
+            position -= size
+            f.seek(position)
+            chunk = f.read(size) + remainder
+            lines = chunk.split(b"\n")
+            remainder = lines[0]
+            for line in reversed(lines[1:]):
+                yield line
+        if remainder:
+            yield remainder
+
+    def _tail_file(self, path: str, limit: int, log_filter: LogFilter, end: Optional[int] = None) -> List[str]:
+        with open(path, "rb") as f:
+            if end is None:
+                end = f.seek(0, os.SEEK_END)
+            collected: List[str] = []
+            pending: List[str] = []  # lignes de continuation en attente de leur entrée
+            for raw in self._iter_lines_backwards(f, end):
+                line = raw.decode("utf-8", errors="replace").rstrip("\r")
+                if not line:
+                    continue
+                if not log_filter.active:
+                    collected.append(line)
+                else:
+                    pending.append(line)
+                    level = log_filter.parse_level(line)
+                    if level is None:
+                        continue
+                    # Une entrée complète (en-tête + continuations) : on filtre le bloc entier
+                    if log_filter.min_level is None or level >= log_filter.min_level:
+                        collected.extend(
+                            l for l in pending if log_filter.contains is None or log_filter.contains in l.lower()
+                        )
+                    pending = []
+                if len(collected) >= limit:
+                    break
+            collected.reverse()
+            return collected[-limit:]
+
+    def tail(self, limit: int = 100, level: Optional[str] = None, contains: Optional[str] = None) -> Tuple[List[str], Optional[str]]:
+        """
+        Les `limit` dernières lignes (filtrées) et le curseur de fin de fichier.
+        Complète avec les fichiers de rotation si le fichier courant est trop court.
+        """
+        log_filter = LogFilter(level, contains)
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return [], None
+        # Curseur pris sur une fin de ligne : une ligne en cours d'écriture sera relue ensuite
+        end = self._line_boundary(self.path, st.st_size)
+        lines = self._tail_file(self.path, limit, log_filter, end)
+        for rotated in self._rotated_paths():
+            if len(lines) >= limit or not os.path.exists(rotated):
+                break
+            lines = self._tail_file(rotated, limit - len(lines), log_filter) + lines
+        return lines, self.make_cursor(self._file_id(st), end)
+
+    @staticmethod
+    def _line_boundary(path: str, size: int) -> int:
+        """Position juste après le dernier saut de ligne avant `size`."""
+        with open(path, "rb") as f:
+            position = size
+            while position > 0:
+                step = min(BLOCK_SIZE, position)
+                f.seek(position - step)
+                chunk = f.read(step)
+                index = chunk.rfind(b"\n")
+                if index != -1:
+                    return position - step + index + 1
+                position -= step
+        return 0
+
+    # --- Lecture avant (depuis un curseur) ---
+
+    def _read_forward(self, path: str, offset: int, max_bytes: int) -> Tuple[List[str], int]:
+        """Lignes complètes à partir de `offset` ; renvoie le nouvel offset (fin de ligne)."""
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read(max_bytes)
+        end = data.rfind(b"\n")
+        if end == -1:
+            return [], offset
+        lines = [
+            l.decode("utf-8", errors="replace").rstrip("\r")
+            for l in data[:end].split(b"\n")
+        ]
+        return [l for l in lines if l], offset + end + 1
+
+    def read_since(self, cursor: str, level: Optional[str] = None, contains: Optional[str] = None,
+                   max_bytes: int = 1024 * 1024) -> Tuple[List[str], str, bool, bool]:
+        """
+        Lignes écrites après `cursor`. Renvoie (lignes, nouveau curseur, reset, truncated) ;
+        reset vaut True si le fichier du curseur a disparu (rotation trop ancienne)
+        et que la lecture a repris au début du fichier courant ; truncated vaut True
+        si des lignes d'un fichier de rotation ont été sautées (plus de `max_bytes`).
+        Dans le fichier courant, le curseur s'arrête à la dernière ligne lue : rien n'est sauté.
+        """
+        log_filter = LogFilter(level, contains)
+        file_id, offset = self.parse_cursor(cursor)
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return [], cursor, False, False
+
+        lines: List[str] = []
+        current_id = self._file_id(st)
+        if file_id == current_id and offset <= st.st_size:
+            new_lines, offset = self._read_forward(self.path, offset, max_bytes)
+            return log_filter.apply(new_lines), self.make_cursor(current_id, offset), False, False
+
+        # Rotation : on termine le fichier du curseur (devenu app.log.N), puis les
+        # fichiers plus récents app.log.N-1 ... app.log.1, puis le fichier courant
+        reset, truncated = True, False
+        rotated_paths = self._rotated_paths()
+        for index, rotated in enumerate(rotated_paths):
+            try:
+                rst = os.stat(rotated)
+            except FileNotFoundError:
+                break
+            if self._file_id(rst) == file_id and offset <= rst.st_size:
+                lines, end = self._read_forward(rotated, offset, max_bytes)
+                truncated = end < rst.st_size
+                for newer in reversed(rotated_paths[:index]):
+                    newer_lines, end = self._read_forward(newer, 0, max_bytes)
+                    lines += newer_lines
+                    truncated = truncated or end < os.path.getsize(newer)
+                reset = False
+                break
+
+        new_lines, offset = self._read_forward(self.path, 0, max_bytes)
+        return log_filter.apply(lines + new_lines), self.make_cursor(current_id, offset), reset, truncated
+
+    def _changed(self, cursor: str) -> bool:
+        """Simple stat() : évite d'ouvrir le fichier tant que rien n'a été écrit."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        file_id, offset = self.parse_cursor(cursor)
+        return self._file_id(st) != file_id or st.st_size != offset
+
+    async def follow(self, cursor: Optional[str] = None, level: Optional[str] = None,
+                     contains: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Mode suivi (SSE) : un événement par lot de nouvelles lignes, avec le
+        curseur en `id:` pour que EventSource reprenne via Last-Event-ID.
+        """
+        LogFilter(level, contains)  # Valide le filtre avant d'ouvrir le flux
+        if cursor is None:
+            cursor = self.current_cursor() or self.make_cursor(0, 0)
+        else:
+            self.parse_cursor(cursor)
+        last_sent = time.monotonic()
+        while True:
+            if self._changed(cursor):
+                lines, new_cursor, reset, truncated = await asyncio.to_thread(self.read_since, cursor, level, contains)
+                if new_cursor != cursor:
+                    cursor = new_cursor
+                    if lines or reset or truncated:
+                        payload = json.dumps({"logs": lines, "reset": reset, "truncated": truncated}, ensure_ascii=False)
+                        yield f"id: {cursor}\ndata: {payload}\n\n"
+                        last_sent = time.monotonic()
+            if time.monotonic() - last_sent >= settings.EVENTS_KEEPALIVE:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            await asyncio.sleep(settings.LOGS_FOLLOW_INTERVAL)
+
+
+# Singleton
+log_reader = LogReader()
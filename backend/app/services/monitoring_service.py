@@ -1,62 +1,203 @@
-import psutil
-import subprocess
+import os
 import shutil
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
 
-# Tentative d'import de NVML (Nvidia)
-try:
-    from pynvml import (
-        nvmlInit, nvmlShutdown, nvmlDeviceGetHandleByIndex,
-        nvmlDeviceGetUtilizationRates, nvmlDeviceGetMemoryInfo
-    )
-    NVML_AVAILABLE = True
-except Exception:
-    NVML_AVAILABLE = False
+from app.core.config import settings
+from app.core.logger import logger
 
-def get_monitoring_info():
-    # 1. Stats CPU & RAM
-    cpu_percent = psutil.cpu_percent(interval=None)
-    ram = psutil.virtual_memory()
-
-    # Valeurs par défaut
-    gpu_data = {
-        "available": False,
-        "usage_percent": 0,
-        "vram_used": 0,
-        "vram_total": 0,
-        "name": "Non détecté"
-    }
-
-    # 2. Tentative NVIDIA (via NVML)
-    if NVML_AVAILABLE:
+# psutil et NVML (Nvidia) sont importés dans le thread d'échantillonnage : ni
+# l'import ni nvmlInit ne retardent le démarrage du serveur
+
+# Ordre des valeurs dans un échantillon du ring buffer
+METRICS = ("cpu", "ram", "disk", "gpu", "vram_used")
+DISK_PATH = (os.getenv("SystemDrive", "C:") + "\\") if os.name == "nt" else "/"
+
+
+class TelemetrySampler:
+    """
+    Échantillonneur en arrière-plan : NVML est initialisé une seule fois, CPU,
+    RAM, disque et GPU sont relevés à intervalle fixe dans un ring buffer.
+    Les routes lisent le dernier instantané sans jamais bloquer.
+    """
+
+    def __init__(self, interval: float = None, history_seconds: int = None):
+        self.interval = interval or settings.MONITORING_SAMPLE_INTERVAL
+        capacity = max(1, int((history_seconds or settings.MONITORING_HISTORY_SECONDS) / self.interval))
+        self._samples: deque = deque(maxlen=capacity)  # (timestamp, cpu, ram, disk, gpu, vram_used)
+        self._latest: Optional[Dict] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._nvml = None
+        self._gpu_handle = None
+        self._gpu_name = None
+        self._vram_total = 0
+        self._listeners: List[Callable[[Dict], None]] = []
+
+    def add_listener(self, listener: Callable[[Dict], None]):
+        """Appelé (dans le thread d'échantillonnage) après chaque nouvel instantané."""
+        self._listeners.append(listener)
+
+    # --- Cycle de vie ---
+
+    def _init_gpu(self):
         try:
-            nvmlInit()
-            handle = nvmlDeviceGetHandleByIndex(0)
-            utilization = nvmlDeviceGetUtilizationRates(handle)
-            mem_info = nvmlDeviceGetMemoryInfo(handle)
-            gpu_data = {
-                "available": True,
-                "usage_percent": utilization.gpu,
-                "vram_used": mem_info.used // (1024**2),
-                "vram_total": mem_info.total // (1024**2),
-                "name": "NVIDIA GPU"
-            }
-            nvmlShutdown()
+            import pynvml as nvml
+            nvml.nvmlInit()
+            self._nvml = nvml
+            self._gpu_handle = nvml.nvmlDeviceGetHandleByIndex(0)
+            name = nvml.nvmlDeviceGetName(self._gpu_handle)
+            self._gpu_name = name.decode("utf-8") if isinstance(name, bytes) else name
+            self._vram_total = nvml.nvmlDeviceGetMemoryInfo(self._gpu_handle).total // (1024**2)
+            return
         except Exception:
-            pass
-
-    # 3. Fallback AMD (via commande système si NVIDIA échoue)
-    if not gpu_data["available"]:
-        # On vérifie si l'outil AMD est présent (Linux/ROCm)
-        if shutil.which("rocm-smi"):
-            gpu_data["name"] = "AMD GPU (ROCm)"
-            # Note: Ici on pourrait ajouter la lecture rocm-smi si besoin
-        else:
-            gpu_data["name"] = "Générique / Intégré"
-
-    return {
-        "cpu": { "usage_percent": cpu_percent },
-        "ram": { "usage_percent": ram.percent },
-        "gpu": gpu_data,
-        "vramUsed": gpu_data["vram_used"],
-        "vramTotal": gpu_data["vram_total"]
-    }
\ No newline at end of file
+            self._gpu_handle = None
+
+        # Fallback AMD (via commande système si NVIDIA échoue)
+        # Note: Ici on pourrait ajouter la lecture rocm-smi si besoin
+        self._gpu_name = "AMD GPU (ROCm)" if shutil.which("rocm-smi") else "Générique / Intégré"
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="telemetry-sampler", daemon=True)
+        self._thread.start()
+        logger.info(f"📈 Échantillonnage système toutes les {self.interval}s")
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=5.0)
+        self._thread = None
+        if self._gpu_handle is not None:
+            try:
+                self._nvml.nvmlShutdown()
+            except Exception:
+                pass
+            self._gpu_handle = None
+
+    def _run(self):
+        import psutil
+        self._init_gpu()
+        psutil.cpu_percent(interval=None)  # Amorce : la première mesure sert de référence
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Erreur échantillonnage système: {e}")
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    # --- Mesure ---
+
+    def sample(self) -> Dict:
+        import psutil
+        cpu = psutil.cpu_percent(interval=None)
+        ram = psutil.virtual_memory().percent
+        try:
+            disk = psutil.disk_usage(DISK_PATH).percent
+        except Exception:
+            disk = 0.0
+
+        gpu = {
+            "available": False,
+            "usage_percent": 0,
+            "vram_used": 0,
+            "vram_total": 0,
+            "name": self._gpu_name or "Non détecté"
+        }
+        if self._gpu_handle is not None:
+            try:
+                utilization = self._nvml.nvmlDeviceGetUtilizationRates(self._gpu_handle)
+                mem_info = self._nvml.nvmlDeviceGetMemoryInfo(self._gpu_handle)
+                gpu.update({
+                    "available": True,
+                    "usage_percent": utilization.gpu,
+                    "vram_used": mem_info.used // (1024**2),
+                    "vram_total": self._vram_total,
+                })
+            except Exception:
+                pass
+
+        snapshot = {
+            "cpu": {"usage_percent": cpu},
+            "ram": {"usage_percent": ram},
+            "disk": {"usage_percent": disk},
+            "gpu": gpu,
+            "vramUsed": gpu["vram_used"],
+            "vramTotal": gpu["vram_total"],
+            "timestamp": time.time(),
+        }
+        with self._lock:
+            self._latest = snapshot
+            self._samples.append((snapshot["timestamp"], cpu, ram, disk, gpu["usage_percent"], gpu["vram_used"]))
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error(f"Erreur listener monitoring: {e}")
+        return snapshot
+
+    # --- Lecture ---
+
+    def latest(self) -> Dict:
+        """
+        Dernier instantané. Avant le premier relevé du thread : même forme, valeurs
+        à zéro et "pending": True (aucune mesure dans l'appelant, donc jamais sur
+        la boucle asyncio).
+        """
+        snapshot = self._latest
+        if snapshot is None:
+            return {
+                "cpu": {"usage_percent": 0.0},
+                "ram": {"usage_percent": 0.0},
+                "disk": {"usage_percent": 0.0},
+                "gpu": {"available": False, "usage_percent": 0, "vram_used": 0, "vram_total": 0,
+                        "name": "Non détecté"},
+                "vramUsed": 0,
+                "vramTotal": 0,
+                "timestamp": None,
+                "pending": True,
+            }
+        return snapshot
+
+    def history(self, window: float, points: int = 60) -> Dict:
+        """
+        Séries sous-échantillonnées sur les `window` dernières secondes :
+        `points` intervalles avec min / moyenne / max par métrique.
+        """
+        points = max(1, points)
+        now = time.time()
+        start = now - window
+        with self._lock:
+            samples = [s for s in self._samples if s[0] >= start]
+
+        step = window / points
+        buckets: List[List[tuple]] = [[] for _ in range(points)]
+        for s in samples:
+            buckets[min(points - 1, int((s[0] - start) / step))].append(s)
+
+        series = {m: {"min": [], "avg": [], "max": []} for m in METRICS}
+        timestamps = []
+        for i, bucket in enumerate(buckets):
+            timestamps.append(round(start + (i + 1) * step, 3))
+            for idx, metric in enumerate(METRICS, start=1):
+                values = [s[idx] for s in bucket]
+                series[metric]["min"].append(min(values) if values else None)
+                series[metric]["avg"].append(round(sum(values) / len(values), 2) if values else None)
+                series[metric]["max"].append(max(values) if values else None)
+
+        return {"window": window, "interval": self.interval, "timestamps": timestamps, "series": series}
+
+
+# Singleton
+telemetry_sampler = TelemetrySampler()
+
+
+def get_monitoring_info():
+    return telemetry_sampler.latest()
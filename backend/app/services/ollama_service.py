@@ -1,90 +1,366 @@
 import httpx
+import asyncio
 import json
 import base64
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+from app.core.config import settings
 from app.core.logger import logger
+from app.core.metrics import UPSTREAM_ERRORS
+from app.core.tracing import record
+
+def _http2_available() -> bool:
+    """Le support HTTP/2 de httpx dépend du paquet optionnel 'h2'."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class GenerationStats(NamedTuple):
+    """Compteurs du dernier chunk de /api/generate (durées converties en secondes)."""
+    prompt_tokens: int
+    prompt_seconds: float
+    tokens: int
+    eval_seconds: float
+    load_seconds: float
+    total_seconds: float
+
+    @classmethod
+    def from_data(cls, data: dict) -> "GenerationStats":
+        return cls(
+            prompt_tokens=data.get("prompt_eval_count") or 0,
+            prompt_seconds=(data.get("prompt_eval_duration") or 0) / 1e9,
+            tokens=data.get("eval_count") or 0,
+            eval_seconds=(data.get("eval_duration") or 0) / 1e9,
+            load_seconds=(data.get("load_duration") or 0) / 1e9,
+            total_seconds=(data.get("total_duration") or 0) / 1e9,
+        )
+
+    @property
+    def prompt_rate(self) -> Optional[float]:
+        """Évaluation du prompt (tokens/s), None si non mesurée (prompt en cache...)."""
+        return self.prompt_tokens / self.prompt_seconds if self.prompt_tokens and self.prompt_seconds else None
+
+    @property
+    def decode_rate(self) -> Optional[float]:
+        """Génération (tokens/s)."""
+        return self.tokens / self.eval_seconds if self.tokens and self.eval_seconds else None
+
+class StreamChunk(NamedTuple):
+    """Une ligne NDJSON d'Ollama, décodée une seule fois."""
+    raw: bytes    # Événement SSE prêt à relayer tel quel au client
+    token: str    # Texte généré ("" pour les lignes de statut / fin)
+    data: dict    # Objet JSON complet (done, eval_count, error...)
+
+    @property
+    def line(self) -> bytes:
+        """Ligne NDJSON d'origine (sans l'enrobage SSE)."""
+        return self.raw[6:-2]
+
+    @property
+    def stats(self) -> Optional[GenerationStats]:
+        """Compteurs de performance, sur le dernier chunk seulement."""
+        return GenerationStats.from_data(self.data) if self.data.get("done") else None
+
+    @classmethod
+    def from_line(cls, line: bytes) -> "StreamChunk":
+        try:
+            data = json.loads(line)
+        except ValueError:
+            data = {}
+        return cls(b"data: " + line + b"\n\n", data.get("response") or "", data)
+
+    @classmethod
+    def error(cls, message: str) -> "StreamChunk":
+        data = {"error": message}
+        return cls(f"data: {json.dumps(data)}\n\n".encode("utf-8"), "", data)
 
 class OllamaService:
-    def __init__(self):
-        self.base_url = "http://127.0.0.1:11434" 
-        self.timeout = httpx.Timeout(60.0)
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = (base_url or settings.OLLAMA_BASE_URL).rstrip("/")
+        self.timeout = httpx.Timeout(settings.OLLAMA_REQUEST_TIMEOUT, connect=settings.OLLAMA_CONNECT_TIMEOUT)
+        self.health_timeout = httpx.Timeout(settings.OLLAMA_HEALTH_TIMEOUT)
+        # Streaming : pas de limite de lecture (génération / téléchargement longs)
+        self.stream_timeout = httpx.Timeout(None, connect=settings.OLLAMA_CONNECT_TIMEOUT)
+        self._client: Optional[httpx.AsyncClient] = None
+        # Métadonnées (/api/tags, /api/show) : appels identiques simultanés regroupés
+        # en une seule requête, résultat gardé quelques secondes (voir _cached)
+        self._cache: Dict[str, Tuple[float, object]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._generation = 0
+        self.cache_stats = {"hits": 0, "misses": 0, "shared": 0}
 
-    async def check_connection(self):
+    # --- Cycle de vie du client partagé ---
+
+    def _build_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.OLLAMA_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OLLAMA_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.OLLAMA_KEEPALIVE_EXPIRY,
+        )
+        http2 = settings.OLLAMA_HTTP2 and _http2_available()
+        if settings.OLLAMA_HTTP2 and not http2:
+            logger.warning("⚠️ OLLAMA_HTTP2 activé mais le paquet 'h2' est absent, HTTP/1.1 utilisé")
+        return httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=self.timeout, http2=http2)
+
+    async def start(self):
+        """Ouvre le client HTTP partagé (appelé au démarrage de FastAPI)."""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+
+    async def close(self):
+        """Ferme le client et ses connexions keep-alive (arrêt de FastAPI)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Création paresseuse si le service est utilisé hors du cycle FastAPI (scripts, benchmarks)
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    # --- Cache des métadonnées ---
+
+    async def _cached(self, key: str, ttl: float, fetch: Callable[[], Awaitable], fresh: bool = False):
+        """
+        Single-flight + TTL : un seul appel en vol par clé, partagé par tous les
+        appelants. `fresh` ignore le cache (sonde de santé) mais le réalimente.
+        Les échecs (None) ne sont pas mis en cache.
+        """
+        if not fresh:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.cache_stats["hits"] += 1
+                return entry[1]
+        started = time.perf_counter()
+        future = self._inflight.get(key)
+        if future is not None:
+            outcome = "shared"
+            self.cache_stats["shared"] += 1
+        else:
+            outcome = "miss"
+            self.cache_stats["misses"] += 1
+            generation = self._generation
+            future = asyncio.ensure_future(fetch())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._on_fetched(key, ttl, generation, f))
+        try:
+            return await asyncio.shield(future)
+        finally:
+            record(f"ollama.{key.split(':', 1)[0]}", started, cache=outcome)
+
+    def _on_fetched(self, key: str, ttl: float, generation: int, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # Résultat obtenu avant une invalidation : rendu aux appelants, pas mis en cache
+        if generation == self._generation and not future.cancelled() and future.exception() is None \
+                and future.result() is not None:
+            self._cache[key] = (time.monotonic() + ttl, future.result())
+
+    def invalidate(self):
+        """Pull, suppression ou redémarrage d'Ollama : les métadonnées en cache sont périmées."""
+        self._generation += 1
+        self._cache.clear()
+        self._inflight.clear()
+
+    async def _fetch_tags(self) -> Optional[dict]:
         try:
-            async with httpx.AsyncClient(timeout=2.0) as client:
-                response = await client.get(f"{self.base_url}/api/tags")
-                if response.status_code == 200:
-                    return True
+            response = await self.client.get("/api/tags", timeout=self.health_timeout)
+            if response.status_code == 200:
+                return response.json()
         except Exception as e:
+            UPSTREAM_ERRORS.labels("tags").inc()
             logger.warning(f"Ollama non joignable : {e}")
-            return False
-        return False
+        return None
+
+    # --- API Ollama ---
+
+    async def tags(self, fresh: bool = False) -> Optional[dict]:
+        """Réponse de /api/tags (partagée : ne pas modifier), None si Ollama est injoignable."""
+        return await self._cached("tags", settings.OLLAMA_TAGS_TTL, self._fetch_tags, fresh)
+
+    async def probe(self) -> Optional[dict]:
+        """Sonde de santé : /api/tags sans cache (le résultat alimente le cache)."""
+        return await self.tags(fresh=True)
+
+    async def check_connection(self):
+        return await self.tags() is not None
 
     async def list_models(self):
-        url = f"{self.base_url}/api/tags"
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(url)
-                return response.json()
-            except Exception as e:
-                logger.error(f"Erreur connexion Ollama (list): {e}")
-                return {"models": []}
+        tags = await self.tags()
+        return {"models": [dict(m) for m in tags.get("models", [])]} if tags is not None else {"models": []}
 
     async def get_detailed_models(self):
-        url = f"{self.base_url}/api/tags"
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(url)
-                if response.status_code == 200:
-                    models = response.json().get("models", [])
-                    for m in models:
-                        m["size_gb"] = round(m.get("size", 0) / (1024**3), 2)
-                    return models
-            except Exception as e:
-                logger.error(f"Erreur connexion Ollama (detailed): {e}")
+        tags = await self.tags()
+        if tags is None:
             return []
+        models = [dict(m) for m in tags.get("models", [])]
+        for m in models:
+            m["size_gb"] = round(m.get("size", 0) / (1024**3), 2)
+        return models
+
+    async def _fetch_show(self, model_name: str) -> Optional[dict]:
+        try:
+            response = await self.client.post("/api/show", json={"model": model_name})
+            if response.status_code == 200:
+                return response.json()
+        except Exception as e:
+            UPSTREAM_ERRORS.labels("show").inc()
+            logger.error(f"Erreur show model: {e}")
+        return None
+
+    async def show_model(self, model_name: str) -> Optional[dict]:
+        """Détails d'un modèle (/api/show) : paramètres du Modelfile, model_info..."""
+        return await self._cached(
+            f"show:{model_name}", settings.OLLAMA_SHOW_TTL, lambda: self._fetch_show(model_name)
+        )
+
+    async def list_running(self) -> Optional[list]:
+        """Modèles chargés en mémoire (/api/ps : size, size_vram, expires_at), None si injoignable."""
+        try:
+            response = await self.client.get("/api/ps", timeout=self.health_timeout)
+            if response.status_code == 200:
+                return response.json().get("models", [])
+        except Exception as e:
+            UPSTREAM_ERRORS.labels("ps").inc()
+            logger.warning(f"Erreur lecture des modèles chargés : {e}")
+        return None
+
+    async def load_model(self, model: str, keep_alive=None) -> bool:
+        """Charge un modèle sans rien générer (prompt vide) ; keep_alive=0 le décharge."""
+        payload = {"model": model, "keep_alive": settings.OLLAMA_KEEP_ALIVE if keep_alive is None else keep_alive}
+        try:
+            response = await self.client.post("/api/generate", json=payload, timeout=self.stream_timeout)
+            if response.status_code == 200:
+                return True
+            logger.error(f"Erreur chargement {model} ({response.status_code}): {response.text[:200]}")
+        except Exception as e:
+            logger.error(f"Erreur chargement {model}: {e}")
+        UPSTREAM_ERRORS.labels("load").inc()
+        return False
+
+    async def unload_model(self, model: str) -> bool:
+        return await self.load_model(model, keep_alive=0)
+
+    async def generate(self, model: str, prompt: str, system: Optional[str] = None,
+                       keep_alive=None) -> Optional[str]:
+        """Génération non streamée (tâches de fond : résumés...). None en cas d'échec."""
+        payload = {
+            "model": model, "prompt": prompt, "stream": False,
+            "keep_alive": settings.OLLAMA_KEEP_ALIVE if keep_alive is None else keep_alive
+        }
+        if system:
+            payload["system"] = system
+        try:
+            response = await self.client.post("/api/generate", json=payload, timeout=self.stream_timeout)
+            if response.status_code == 200:
+                return response.json().get("response", "")
+            logger.error(f"Erreur generate ({response.status_code}): {response.text[:200]}")
+        except Exception as e:
+            logger.error(f"Erreur generate: {e}")
+        UPSTREAM_ERRORS.labels("generate").inc()
+        return None
 
-    async def pull_model(self, model_name: str):
-        url = f"{self.base_url}/api/pull"
-        async with httpx.AsyncClient(timeout=None) as client:
-            try:
-                async with client.stream("POST", url, json={"name": model_name}) as response:
-                    async for line in response.aiter_lines():
-                        if line:
-                            yield f"data: {line}\n\n"
-            except Exception as e:
-                logger.error(f"Erreur pull model: {e}")
-                yield f"data: {json.dumps({'error': str(e)})}\n\n"
+    async def pull_model(self, model_name: str) -> AsyncIterator[dict]:
+        """
+        Progression de /api/pull, une ligne NDJSON décodée par étape
+        ({"status", "digest", "total", "completed"} ou {"error"}).
+        Les erreurs de transport sont propagées à l'appelant.
+        """
+        async with self.client.stream(
+            "POST", "/api/pull", json={"model": model_name, "stream": True}, timeout=self.stream_timeout
+        ) as response:
+            async for line in response.aiter_lines():
+                if line:
+                    yield json.loads(line)
 
     async def delete_model(self, model_name: str) -> bool:
-        url = f"{self.base_url}/api/delete"
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.request("DELETE", url, json={"name": model_name})
-                return response.status_code == 200
-            except Exception as e:
-                logger.error(f"Erreur delete service: {e}")
-                return False
-
-    async def chat_stream(self, model, prompt, chat_id=None, image=None):
-        url = f"{self.base_url}/api/generate"
-        
+        try:
+            response = await self.client.request("DELETE", "/api/delete", json={"name": model_name})
+            return response.status_code == 200
+        except Exception as e:
+            UPSTREAM_ERRORS.labels("delete").inc()
+            logger.error(f"Erreur delete service: {e}")
+            return False
+
+    @staticmethod
+    def _image_body(payload: dict, image) -> dict:
+        """
+        Corps JSON envoyé en flux pour une image préparée (image_service.PreparedImage) :
+        le payload base64 est relu par blocs depuis le disque au lieu d'être recopié
+        dans une chaîne puis dans le JSON (plusieurs fois la taille de l'image en mémoire).
+        """
+        head = json.dumps(payload)[:-1].encode("utf-8") + b', "images": ["'
+        tail = b'"]}'
+
+        async def content():
+            yield head
+            chunks = image.chunks()
+            while chunk := await asyncio.to_thread(next, chunks, None):
+                yield chunk
+            yield tail
+
+        return {
+            "content": content(),
+            "headers": {
+                "Content-Type": "application/json",
+                "Content-Length": str(len(head) + image.size + len(tail)),
+            },
+        }
+
+    async def chat_stream(self, model, prompt, chat_id=None, image=None, system=None,
+                          context=None, keep_alive=None, options=None) -> AsyncIterator[StreamChunk]:
+        """
+        Relais de génération : chaque ligne NDJSON est découpée sur les octets
+        bruts et parsée une seule fois ; l'appelant relaie `raw` et accumule `token`.
+        `context` (renvoyé par Ollama dans le dernier chunk du tour précédent)
+        évite de réévaluer tout l'historique de la conversation. `image` : payload
+        base64 (str) ou image préparée par image_service, envoyée en flux.
+        """
         payload = {
-            "model": model, 
-            "prompt": prompt, 
-            "stream": True
+            "model": model,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": settings.OLLAMA_KEEP_ALIVE if keep_alive is None else keep_alive
         }
 
-        if image:
+        if system:
+            payload["system"] = system
+        if context:
+            payload["context"] = context
+        if options:
+            payload["options"] = options
+        if isinstance(image, str):
             payload["images"] = [image]
+            body = {"json": payload}
+        elif image:
+            body = self._image_body(payload, image)
+        else:
+            body = {"json": payload}
+
+        try:
+            async with self.client.stream("POST", "/api/generate", timeout=self.stream_timeout, **body) as response:
+                pending = b""
+                async for data in response.aiter_bytes():
+                    lines = (pending + data).split(b"\n")
+                    pending = lines.pop()
+                    for line in lines:
+                        if line.strip():
+                            chunk = StreamChunk.from_line(line)
+                            if "error" in chunk.data:
+                                UPSTREAM_ERRORS.labels("chat").inc()
+                            yield chunk
+                if pending.strip():
+                    chunk = StreamChunk.from_line(pending)
+                    if "error" in chunk.data:
+                        UPSTREAM_ERRORS.labels("chat").inc()
+                    yield chunk
+        except Exception as e:
+            UPSTREAM_ERRORS.labels("chat").inc()
+            logger.error(f"Erreur chat stream: {e}")
+            yield StreamChunk.error(str(e))
 
-        async with httpx.AsyncClient(timeout=None) as client:
-            try:
-                async with client.stream("POST", url, json=payload) as response:
-                    async for line in response.aiter_lines():
-                        if line:
-                            yield f"data: {line}\n\n"
-            except Exception as e:
-                logger.error(f"Erreur chat stream: {e}")
-                yield f"data: {json.dumps({'error': str(e)})}\n\n"
-
-ollama_service = OllamaService()
\ No newline at end of file
+ollama_service = OllamaService()
@@ -0,0 +1,309 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import deque
+from contextlib import aclosing
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.core.config import DATA_DIR, settings
+from app.core.logger import logger
+from app.core.metrics import PULL_BYTES, PULL_RATE, PULLS, UPSTREAM_ERRORS
+from app.services.event_service import event_bus
+from app.services.health_service import health_monitor
+from app.services.ollama_service import ollama_service
+from app.services.residency_service import residency_manager
+from app.services.response_cache_service import response_cache
+
+JOBS_FILE = os.path.join(DATA_DIR, "pull_jobs.json")
+
+ACTIVE = ("queued", "running")
+FINISHED = ("completed", "failed", "cancelled")
+
+
+class QueueFullError(Exception):
+    """Trop de téléchargements en attente."""
+
+
+class PullJob:
+    """État d'un téléchargement de modèle, agrégé depuis le flux de /api/pull."""
+
+    def __init__(self, model: str, job_id: Optional[str] = None):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.model = model
+        self.status = "queued"
+        self.detail = ""                            # Dernier statut texte d'Ollama
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.layers: Dict[str, Tuple[int, int]] = {}  # digest -> (total, completed)
+        self.rate = 0.0                             # octets / seconde (fenêtre glissante)
+        self._samples: Deque[Tuple[float, int]] = deque()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def total(self) -> int:
+        return sum(total for total, _ in self.layers.values())
+
+    @property
+    def completed(self) -> int:
+        return sum(done for _, done in self.layers.values())
+
+    @property
+    def eta(self) -> Optional[float]:
+        remaining = self.total - self.completed
+        if self.status != "running" or self.rate <= 0 or remaining <= 0:
+            return None
+        return round(remaining / self.rate, 1)
+
+    def update(self, data: dict):
+        self.detail = data.get("status", self.detail)
+        digest = data.get("digest")
+        if digest and data.get("total"):
+            received = data.get("completed", 0) - self.layers.get(digest, (0, 0))[1]
+            if received > 0:
+                PULL_BYTES.labels(self.model).inc(received)
+            self.layers[digest] = (data["total"], data.get("completed", 0))
+            now = time.monotonic()
+            self._samples.append((now, self.completed))
+            while len(self._samples) > 2 and now - self._samples[0][0] > settings.PULL_RATE_WINDOW:
+                self._samples.popleft()
+            (t0, b0), (t1, b1) = self._samples[0], self._samples[-1]
+            if t1 > t0:
+                self.rate = max(0.0, (b1 - b0) / (t1 - t0))
+
+    def to_dict(self, with_layers: bool = False) -> Dict:
+        """État public du job ; `with_layers` : progression par couche en plus (persistance)."""
+        total, completed = self.total, self.completed
+        data = {
+            "job_id": self.id,
+            "model": self.model,
+            "status": self.status,
+            "detail": self.detail,
+            "error": self.error,
+            "total": total,
+            "completed": completed,
+            "percent": round(completed * 100 / total, 1) if total else 0.0,
+            "layers": len(self.layers),
+            "layers_done": sum(1 for t, c in self.layers.values() if t and c >= t),
+            "rate": round(self.rate),
+            "eta": self.eta,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if with_layers:
+            data["layer_progress"] = {digest: list(sizes) for digest, sizes in self.layers.items()}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "PullJob":
+        job = cls(data["model"], data["job_id"])
+        job.status = data.get("status", "queued")
+        job.detail = data.get("detail", "")
+        job.error = data.get("error")
+        job.created_at = data.get("created_at", job.created_at)
+        job.started_at = data.get("started_at")
+        job.finished_at = data.get("finished_at")
+        # Progression reprise là où elle s'était arrêtée (total / completed / percent en découlent)
+        progress = data.get("layer_progress", {})
+        job.layers = {digest: (int(total), int(done)) for digest, (total, done) in progress.items()}
+        return job
+
+
+class PullManager:
+    """
+    File de téléchargements de modèles : au plus PULL_MAX_CONCURRENT en parallèle,
+    PULL_MAX_QUEUED en attente. La progression est publiée sur le topic "pulls"
+    du canal d'événements et l'état des jobs est persisté : un téléchargement
+    interrompu (arrêt du backend) reprend au démarrage suivant, Ollama
+    conservant les couches déjà reçues.
+    """
+
+    def __init__(self, path: str = JOBS_FILE, ollama=None):
+        self.path = path
+        self.ollama = ollama or ollama_service
+        self.jobs: Dict[str, PullJob] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._last_publish: Dict[str, float] = {}
+        self._last_persist = 0.0
+        self._unsaved: Optional[List[Dict]] = None   # Dernier état à écrire
+        self._writer: Optional[asyncio.Task] = None
+
+    # --- Persistance ---
+
+    def _persist(self, force: bool = True):
+        """
+        Instantané des jobs pris sur la boucle, écrit (fsync) dans un thread : une
+        seule écriture à la fois, les instantanés arrivés entre-temps sont fusionnés.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_persist < settings.PULL_PERSIST_INTERVAL:
+            return
+        self._last_persist = now
+        finished = sorted((j for j in self.jobs.values() if j.status in FINISHED), key=lambda j: j.created_at)
+        keep = [j for j in self.jobs.values() if j.status in ACTIVE] + finished[-settings.PULL_HISTORY_SIZE:]
+        self._unsaved = [j.to_dict(with_layers=True) for j in sorted(keep, key=lambda j: j.created_at)]
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.get_running_loop().create_task(self._write_unsaved())
+
+    async def _write_unsaved(self):
+        while self._unsaved is not None:
+            data, self._unsaved = self._unsaved, None
+            await asyncio.to_thread(self._write, data)
+
+    def _write(self, data: List[Dict]):
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.error(f"Erreur sauvegarde des téléchargements: {e}")
+
+    def _load(self) -> List[PullJob]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return [PullJob.from_dict(d) for d in json.load(f)]
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Fichier des téléchargements illisible, ignoré : {e}")
+            return []
+
+    # --- Cycle de vie ---
+
+    async def start(self):
+        """Recharge l'historique et relance les téléchargements interrompus."""
+        self._semaphore = asyncio.Semaphore(settings.PULL_MAX_CONCURRENT)
+        resumed = 0
+        for job in self._load():
+            self.jobs[job.id] = job
+            if job.status in ACTIVE:
+                job.status = "queued"
+                self._launch(job)
+                resumed += 1
+        if resumed:
+            logger.info(f"📥 {resumed} téléchargement(s) interrompu(s) repris")
+
+    async def stop(self):
+        """Arrêt du backend : les jobs actifs restent "actifs" sur disque pour reprendre."""
+        tasks = [j.task for j in self.jobs.values() if j.task and not j.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._persist()
+        await self._writer
+
+    # --- API ---
+
+    def submit(self, model: str) -> PullJob:
+        for job in self.jobs.values():
+            if job.model == model and job.status in ACTIVE:
+                return job  # Déjà en cours ou en attente : même job
+        if sum(1 for j in self.jobs.values() if j.status == "queued") >= settings.PULL_MAX_QUEUED:
+            raise QueueFullError(f"File de téléchargement pleine ({settings.PULL_MAX_QUEUED} en attente)")
+        job = PullJob(model)
+        self.jobs[job.id] = job
+        self._launch(job)
+        self._persist()
+        self._publish(job, force=True)
+        logger.info(f"📥 Pull en file : {model} (job {job.id})")
+        return job
+
+    def get(self, job_id: str) -> Optional[PullJob]:
+        return self.jobs.get(job_id)
+
+    def current_rate(self) -> float:
+        """Débit cumulé des téléchargements en cours (octets/s)."""
+        return sum(job.rate for job in self.jobs.values() if job.status == "running")
+
+    def list_jobs(self) -> List[Dict]:
+        return [j.to_dict() for j in sorted(self.jobs.values(), key=lambda j: j.created_at, reverse=True)]
+
+    def cancel(self, job_id: str) -> Optional[PullJob]:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if job.status in ACTIVE:
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            PULLS.labels("cancelled").inc()
+            if job.task and not job.task.done():
+                job.task.cancel()
+            self._persist()
+            self._publish(job, force=True)
+            logger.info(f"⏹️ Pull annulé : {job.model}")
+        return job
+
+    # --- Exécution ---
+
+    def _launch(self, job: PullJob):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.PULL_MAX_CONCURRENT)
+        job.task = asyncio.get_running_loop().create_task(self._run(job))
+
+    def _publish(self, job: PullJob, force: bool = False):
+        # Progression limitée à quelques événements par seconde et par job
+        now = time.monotonic()
+        if not force and now - self._last_publish.get(job.id, 0.0) < settings.PULL_PUBLISH_INTERVAL:
+            return
+        self._last_publish[job.id] = now
+        event_bus.publish_event("pulls", job.to_dict())
+
+    async def _run(self, job: PullJob):
+        try:
+            async with self._semaphore:
+                if job.status != "queued":
+                    return
+                job.status = "running"
+                job.started_at = time.time()
+                self._persist()
+                self._publish(job, force=True)
+
+                async with aclosing(self.ollama.pull_model(job.model)) as stream:
+                    async for data in stream:
+                        if "error" in data:
+                            raise RuntimeError(data["error"])
+                        job.update(data)
+                        self._publish(job)
+                        self._persist(force=False)
+                        if data.get("status") == "success":
+                            break
+                    else:
+                        raise RuntimeError("Flux de téléchargement interrompu avant la fin")
+
+                job.status = "completed"
+                job.finished_at = time.time()
+                logger.info(f"✅ Modèle téléchargé : {job.model}")
+        except asyncio.CancelledError:
+            # Annulation par l'utilisateur (statut déjà posé) ou arrêt du backend (reprise au démarrage)
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            job.finished_at = time.time()
+            UPSTREAM_ERRORS.labels("pull").inc()
+            logger.error(f"Erreur pull model {job.model}: {e}")
+        finally:
+            self._last_publish.pop(job.id, None)
+            if job.status in FINISHED:
+                if job.status != "cancelled":
+                    PULLS.labels(job.status).inc()  # Annulations comptées par cancel()
+                self._persist()
+                self._publish(job, force=True)
+                if job.status == "completed":
+                    residency_manager.forget(job.model)  # Taille en mémoire à réobserver
+                    response_cache.purge(job.model)  # Nouveau digest : anciennes réponses caduques
+                    self.ollama.invalidate()
+                    # La liste des modèles (topic "models") est republiée sans attendre la sonde
+                    health_monitor.refresh()
+
+
+# Singleton
+pull_manager = PullManager()
+PULL_RATE.function = pull_manager.current_rate
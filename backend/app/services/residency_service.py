@@ -0,0 +1,233 @@
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.services.chat_history_service import chat_history_service
+from app.services.gpu_service import gpu_service
+from app.services.ollama_service import ollama_service
+
+# Taille d'un modèle jamais vu en mémoire : taille du fichier + cache KV / buffers
+LOAD_OVERHEAD = 1.2
+
+
+class ResidencyManager:
+    """
+    Contrôle des modèles résidents en mémoire (lus via /api/ps) :
+    - préchargement au démarrage du modèle par défaut, sinon des plus utilisés ;
+    - keep_alive choisi par requête : les modèles épinglés (préchargés) restent
+      chargés jusqu'à éviction, les autres expirent après OLLAMA_KEEP_ALIVE ;
+    - avant une requête sur un modèle absent, éviction des modèles les moins
+      récemment utilisés si la VRAM (gpu_service) ne suffit pas ; les modèles
+      en cours de génération ne sont jamais déchargés.
+    Table /api/ps gardée en cache RESIDENCY_REFRESH_TTL secondes : un modèle déjà
+    résident est servi sans verrou ni aller-retour vers Ollama.
+    """
+
+    def __init__(self, ollama=None, gpu=None, history=None, vram_mb: Optional[int] = None):
+        self.ollama = ollama or ollama_service
+        self.gpu = gpu or gpu_service
+        self.history = history or chat_history_service
+        self.vram_mb = settings.RESIDENCY_VRAM_MB if vram_mb is None else vram_mb
+        self.resident: Dict[str, Dict] = {}     # nom -> entrée de /api/ps
+        self.pinned: set = set()
+        self.stats = {"hits": 0, "misses": 0, "preloads": 0, "evictions": 0, "preload_seconds": 0.0}
+        self._last_used: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}        # nom -> VRAM observée (octets)
+        self._active: Dict[str, int] = {}       # requêtes en cours par modèle
+        self._refreshed = 0.0                   # dernière lecture de /api/ps (monotonic)
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    # --- État ---
+
+    async def refresh(self) -> Optional[Dict[str, Dict]]:
+        running = await self.ollama.list_running()
+        if running is None:
+            return None
+        self.resident = {m.get("name"): m for m in running}
+        self._refreshed = time.monotonic()
+        for name, entry in self.resident.items():
+            self._sizes[name] = entry.get("size_vram") or entry.get("size") or 0
+        return self.resident
+
+    def _fresh(self) -> bool:
+        return time.monotonic() - self._refreshed < settings.RESIDENCY_REFRESH_TTL
+
+    async def vram_budget(self) -> Optional[int]:
+        """Octets de VRAM utilisables par les modèles, None si inconnus (pas d'éviction)."""
+        resident = sum(m.get("size_vram", 0) for m in self.resident.values())
+        if self.vram_mb:
+            return int(self.vram_mb * 1024**2 * settings.RESIDENCY_VRAM_RATIO)
+        stats = await asyncio.to_thread(self.gpu.get_gpu_stats)
+        if not stats.get("available") or not stats.get("total_mb"):
+            return None
+        # Mémoire occupée par d'autres processus que les modèles d'Ollama
+        other = max(0, stats["used_mb"] * 1024**2 - resident)
+        return int(stats["total_mb"] * 1024**2 * settings.RESIDENCY_VRAM_RATIO) - other
+
+    async def _estimate(self, model: str) -> int:
+        if model in self._sizes:
+            return self._sizes[model]
+        for m in (await self.ollama.list_models()).get("models", []):
+            if m.get("name") == model:
+                return int(m.get("size", 0) * LOAD_OVERHEAD)
+        return 0
+
+    def keep_alive_for(self, model: str) -> str:
+        return settings.RESIDENCY_PINNED_KEEP_ALIVE if model in self.pinned else settings.OLLAMA_KEEP_ALIVE
+
+    async def state(self) -> Dict:
+        await self.refresh()
+        now = time.monotonic()
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "resident": [
+                {
+                    "name": name,
+                    "size": entry.get("size", 0),
+                    "size_vram": entry.get("size_vram", 0),
+                    "expires_at": entry.get("expires_at"),
+                    "pinned": name in self.pinned,
+                    "active": self._active.get(name, 0),
+                    "idle_seconds": round(now - self._last_used[name], 1) if name in self._last_used else None,
+                }
+                for name, entry in self.resident.items()
+            ],
+            "vram_budget": await self.vram_budget(),
+            "pinned": sorted(self.pinned),
+            "stats": dict(self.stats, hit_rate=round(self.stats["hits"] / lookups, 3) if lookups else None),
+        }
+
+    # --- Éviction ---
+
+    async def _make_room(self, model: str, evict: bool = True) -> bool:
+        """Libère la VRAM nécessaire à `model` (LRU, épinglés en dernier). False si elle manque."""
+        budget = await self.vram_budget()
+        if budget is None:
+            return True
+        need = await self._estimate(model)
+        used = sum(m.get("size_vram", 0) for m in self.resident.values())
+        if used + need <= budget:
+            return True
+        if not evict:
+            return False
+        candidates = sorted(
+            (name for name in self.resident if name != model and not self._active.get(name)),
+            key=lambda name: (name in self.pinned, self._last_used.get(name, 0.0))
+        )
+        for victim in candidates:
+            if used + need <= budget:
+                break
+            if await self.ollama.unload_model(victim):
+                used -= self.resident.pop(victim).get("size_vram", 0)
+                self.stats["evictions"] += 1
+                logger.info(f"⏏️ Modèle déchargé (LRU) : {victim}")
+        if used + need > budget:
+            logger.warning(f"⚠️ VRAM insuffisante pour {model} : chargement partiel sur CPU probable")
+            return False
+        return True
+
+    # --- Requêtes ---
+
+    async def acquire(self, model: str) -> str:
+        """
+        Avant une génération : compte le hit / miss, fait de la place si le modèle
+        doit être chargé et renvoie le keep_alive à envoyer. Appeler release() ensuite,
+        uniquement si acquire() a abouti (la requête n'est comptée active qu'à la fin).
+        """
+        if model in self.resident and self._fresh():
+            self.stats["hits"] += 1
+        else:
+            # Modèle absent du cache ou cache périmé : /api/ps relu sous verrou avant d'évincer
+            async with self._lock:
+                resident = await self.refresh()
+                if resident is not None and model in resident:
+                    self.stats["hits"] += 1
+                else:
+                    self.stats["misses"] += 1
+                    if resident is not None:
+                        await self._make_room(model)
+        # Aucun await entre ici et le retour : pas de compteur orphelin en cas d'annulation
+        self._active[model] = self._active.get(model, 0) + 1
+        self._last_used[model] = time.monotonic()
+        return self.keep_alive_for(model)
+
+    def release(self, model: str):
+        self._last_used[model] = time.monotonic()
+        if self._active.get(model, 0) > 1:
+            self._active[model] -= 1
+        else:
+            self._active.pop(model, None)
+
+    async def preload(self, model: str, evict: bool = True) -> bool:
+        """Charge et épingle `model` ; sans `evict`, uniquement s'il tient dans la VRAM libre."""
+        async with self._lock:
+            if await self.refresh() is None:
+                return False
+            if model not in self.resident and not await self._make_room(model, evict):
+                logger.info(f"Préchargement de {model} ignoré : VRAM insuffisante")
+                return False
+            self.pinned.add(model)
+            self._last_used.setdefault(model, time.monotonic())
+            started = time.perf_counter()
+            # Même si déjà chargé : le keep_alive épinglé remplace l'expiration en cours
+            if not await self.ollama.load_model(model, keep_alive=self.keep_alive_for(model)):
+                self.pinned.discard(model)
+                return False
+            elapsed = time.perf_counter() - started
+            if model not in self.resident:
+                self.stats["preloads"] += 1
+                self.stats["preload_seconds"] = round(self.stats["preload_seconds"] + elapsed, 3)
+                logger.info(f"🔥 Modèle préchargé : {model} ({elapsed:.1f}s)")
+            await self.refresh()
+            return True
+
+    def forget(self, model: str):
+        """Modèle supprimé ou re-téléchargé : sa taille et son épinglage ne valent plus."""
+        self.pinned.discard(model)
+        self._sizes.pop(model, None)
+        self._last_used.pop(model, None)
+
+    # --- Démarrage ---
+
+    async def _candidates(self, installed: List[str]) -> List[str]:
+        models = [settings.OLLAMA_DEFAULT_MODEL]
+        models += await asyncio.to_thread(self.history.most_used_models, settings.RESIDENCY_PRELOAD + 1)
+        picked: List[str] = []
+        for model in models:
+            if model in installed and model not in picked:
+                picked.append(model)
+        return picked[:settings.RESIDENCY_PRELOAD]
+
+    async def warm_up(self, timeout: float = None):
+        """Attend qu'Ollama réponde (lancé en parallèle du backend) puis précharge."""
+        deadline = time.monotonic() + (settings.RESIDENCY_STARTUP_TIMEOUT if timeout is None else timeout)
+        tags = await self.ollama.probe()
+        while tags is None and time.monotonic() < deadline:
+            await asyncio.sleep(1.0)
+            tags = await self.ollama.probe()
+        if tags is None:
+            logger.warning("⚠️ Ollama injoignable : aucun modèle préchargé")
+            return
+        installed = [m.get("name") for m in tags.get("models", [])]
+        for model in await self._candidates(installed):
+            await self.preload(model, evict=False)
+
+    def start(self):
+        if settings.RESIDENCY_PRELOAD > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.warm_up())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+
+# Singleton
+residency_manager = ResidencyManager()
@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Set
+
+from app.core.config import DATA_DIR, settings
+from app.core.logger import logger
+from app.services.ollama_service import ollama_service
+
+CACHE_FILE = settings.RESPONSE_CACHE_PATH or os.path.join(DATA_DIR, "response_cache.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key       TEXT PRIMARY KEY,
+    model     TEXT NOT NULL,
+    lines     BLOB NOT NULL,
+    size      INTEGER NOT NULL,
+    created   REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_lru ON responses(last_used);
+CREATE INDEX IF NOT EXISTS idx_responses_model ON responses(model);
+"""
+
+
+def is_deterministic(options: Optional[Dict]) -> bool:
+    """Réponse reproductible : température nulle ou graine fixée."""
+    options = options or {}
+    return options.get("temperature") == 0 or options.get("seed") is not None
+
+
+class ResponseCache:
+    """
+    Cache exact des générations déterministes, sur disque (SQLite), LRU borné
+    à RESPONSE_CACHE_MAX_MB. Clé : digest du modèle (/api/tags), prompt système,
+    prompt final, contexte KV, images et options. Les lignes NDJSON d'Ollama
+    sont conservées telles quelles (compressées) et rejouées dans le même
+    format SSE qu'une génération réelle. Un modèle re-téléchargé change de
+    digest : ses anciennes entrées ne correspondent plus et sont purgées.
+    """
+
+    def __init__(self, path: str = CACHE_FILE, max_bytes: Optional[int] = None, ollama=None,
+                 enabled: Optional[bool] = None):
+        self.path = path
+        self.max_bytes = settings.RESPONSE_CACHE_MAX_MB * 1024**2 if max_bytes is None else max_bytes
+        self.enabled = settings.RESPONSE_CACHE_ENABLED if enabled is None else enabled
+        self.ollama = ollama or ollama_service
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._size = 0
+        self._writes: Set[asyncio.Task] = set()  # Écritures de fin de stream en cours
+
+    # --- Connexion (ouverte au premier usage : rien sur disque si le cache est désactivé) ---
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # Perte possible des dernières entrées : sans gravité
+            conn.executescript(_SCHEMA)
+            self._size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # --- Clé ---
+
+    async def key(self, model: str, prompt: str, system: Optional[str] = None, context: Optional[List[int]] = None,
+                  image_key: Optional[str] = None, options: Optional[Dict] = None) -> Optional[str]:
+        """Clé de la requête, ou None si elle n'est pas cacheable (cache désactivé, non déterministe...)."""
+        if not self.enabled or not is_deterministic(options):
+            return None
+        tags = await self.ollama.tags()
+        digest = next((m.get("digest") for m in (tags or {}).get("models", []) if m.get("name") == model), None)
+        if not digest:
+            return None
+        material = json.dumps({
+            "digest": digest,
+            "system": system or "",
+            "prompt": prompt,
+            "context": hashlib.sha256(json.dumps(context or []).encode("ascii")).hexdigest(),
+            "images": image_key,  # Hash du contenu (image_service), pas le payload base64
+            "options": options,
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    # --- Lecture / écriture (thread : appeler via asyncio.to_thread) ---
+
+    def _get(self, key: str) -> Optional[List[bytes]]:
+        with self._lock:
+            conn = self._db()
+            row = conn.execute("SELECT lines FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.stats["hits"] += 1
+        return zlib.decompress(row[0]).split(b"\n")
+
+    def _put(self, key: str, model: str, lines: List[bytes]):
+        blob = zlib.compress(b"\n".join(lines))
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            previous = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, lines, size, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, blob, len(blob), now, now)
+            )
+            self._size += len(blob) - (previous[0] if previous else 0)
+            self.stats["stores"] += 1
+            # Éviction LRU jusqu'à repasser sous la limite
+            while self._size > self.max_bytes:
+                oldest = conn.execute("SELECT key, size FROM responses ORDER BY last_used LIMIT 64").fetchall()
+                if not oldest:
+                    break
+                for old_key, size in oldest:
+                    if self._size <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                    self._size -= size
+                    self.stats["evictions"] += 1
+
+    def _purge(self, model: Optional[str] = None) -> int:
+        with self._lock:
+            conn = self._db()
+            if model is None:
+                removed = conn.execute("DELETE FROM responses").rowcount
+            else:
+                removed = conn.execute("DELETE FROM responses WHERE model = ?", (model,)).rowcount
+            self._size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        return removed
+
+    async def get(self, key: str) -> Optional[List[bytes]]:
+        try:
+            return await asyncio.to_thread(self._get, key)
+        except Exception as e:
+            logger.error(f"Erreur lecture du cache de réponses: {e}")
+            return None
+
+    async def put(self, key: str, model: str, lines: List[bytes]):
+        try:
+            await asyncio.to_thread(self._put, key, model, lines)
+        except Exception as e:
+            logger.error(f"Erreur écriture du cache de réponses: {e}")
+
+    def store(self, key: str, model: str, lines: List[bytes]):
+        """put() en tâche de fond (le stream est déjà envoyé) ; tâche gardée jusqu'à sa fin."""
+        task = asyncio.get_running_loop().create_task(self.put(key, model, lines))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def stop(self):
+        """Attend les écritures en cours (avant close())."""
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    def purge(self, model: Optional[str] = None):
+        """Modèle re-téléchargé ou supprimé (ou tout le cache si model=None), en tâche de fond."""
+        if self._conn is None and not os.path.exists(self.path):
+            return
+        asyncio.get_running_loop().run_in_executor(None, self._purge, model)
+
+    def info(self) -> Dict:
+        with self._lock:
+            entries = self._db().execute("SELECT COUNT(*) FROM responses").fetchone()[0] if self.enabled else 0
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "size_bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else None,
+            **self.stats,
+        }
+
+
+# Singleton
+response_cache = ResponseCache()
@@ -0,0 +1,208 @@
+import asyncio
+import math
+import statistics
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.residency_service import residency_manager
+
+# Classes de priorité (la plus petite passe en premier)
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+class SchedulerFullError(Exception):
+    """File d'attente pleine : la requête est refusée (429)."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Admission:
+    """
+    Place réservée dans la file par check_admission(), jusqu'à l'entrée en file
+    (acquire) ou release() : l'appelant la rend explicitement si la requête échoue
+    avant. Filet de sécurité seulement : une réponse jamais démarrée par le serveur
+    (client parti avant le premier octet) libère sa place quand le ticket est collecté.
+    """
+    __slots__ = ("_scheduler", "__weakref__")
+
+    def __init__(self, scheduler: "RequestScheduler"):
+        self._scheduler = scheduler
+        scheduler._admitted.add(self)
+
+    def release(self):
+        self._scheduler._admitted.discard(self)
+
+
+class _Waiter:
+    __slots__ = ("model", "priority", "enqueued", "future")
+
+    def __init__(self, model: str, priority: int):
+        self.model = model
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class RequestScheduler:
+    """
+    Ordonnanceur des générations envoyées à Ollama :
+    - au plus SCHEDULER_MAX_ACTIVE générations en cours, SCHEDULER_MODEL_CONCURRENCY
+      par modèle, SCHEDULER_MAX_QUEUED en attente (au-delà : 429 + Retry-After) ;
+    - priorité aux requêtes interactives sur les tâches de fond ;
+    - regroupement par modèle : tant qu'un modèle génère, les requêtes pour un
+      modèle déjà chargé passent devant, un autre modèle n'est chargé que quand
+      le GPU se libère ; une requête qui attend depuis SCHEDULER_AGING secondes
+      passe devant tout le monde (pas de famine).
+    """
+
+    def __init__(self, max_active: int = None, model_concurrency: int = None, max_queued: int = None,
+                 aging: float = None, residency=None):
+        self.max_active = max_active or settings.SCHEDULER_MAX_ACTIVE
+        self.model_concurrency = model_concurrency or settings.SCHEDULER_MODEL_CONCURRENCY
+        self.max_queued = settings.SCHEDULER_MAX_QUEUED if max_queued is None else max_queued
+        self.aging = settings.SCHEDULER_AGING if aging is None else aging
+        self.residency = residency or residency_manager
+        self._waiting: List[_Waiter] = []
+        self._admitted: "weakref.WeakSet[Admission]" = weakref.WeakSet()  # Admis, pas encore en file (voir Admission)
+        self._active: Dict[str, int] = {}
+        self._waits: Deque[float] = deque(maxlen=1000)
+        self._service_time: Optional[float] = None  # Moyenne glissante d'une génération (s)
+        self.stats = {"granted": 0, "rejected": 0, "cancelled": 0, "model_switches": 0}
+
+    # --- Admission ---
+
+    def _queued(self) -> int:
+        return len(self._waiting) + len(self._admitted)
+
+    def retry_after(self) -> int:
+        per_request = self._service_time or 5.0
+        return max(1, math.ceil(per_request * (self._queued() + 1) / self.max_active))
+
+    def check_admission(self) -> Admission:
+        """
+        Lève SchedulerFullError si la file est pleine (avant de répondre au client),
+        sinon réserve une place : le ticket est à passer à acquire() / slot().
+        """
+        # Places admises comprises : au plus max_active + max_queued requêtes à la fois
+        if self._queued() + sum(self._active.values()) >= self.max_queued + self.max_active:
+            self.stats["rejected"] += 1
+            raise SchedulerFullError(
+                f"Trop de requêtes en attente ({self._queued()})", self.retry_after()
+            )
+        return Admission(self)
+
+    # --- Attribution des créneaux ---
+
+    def _warm(self, model: str, busy: set) -> bool:
+        return model in busy or model in self.residency.resident
+
+    def _dispatch(self):
+        now = time.monotonic()
+        busy = {model for model, count in self._active.items() if count}
+
+        def rank(waiter: _Waiter):
+            aged = now - waiter.enqueued >= self.aging
+            return (INTERACTIVE if aged else waiter.priority,
+                    not (aged or self._warm(waiter.model, busy)), waiter.enqueued)
+
+        active = sum(self._active.values())
+        for waiter in sorted(self._waiting, key=rank):
+            if active >= self.max_active:
+                break
+            if self._active.get(waiter.model, 0) >= self.model_concurrency:
+                continue
+            aged = now - waiter.enqueued >= self.aging
+            if busy and not aged and not self._warm(waiter.model, busy):
+                continue  # Pas de chargement concurrent : on laisse finir le lot en cours
+            if waiter.model not in busy:
+                self.stats["model_switches"] += 1
+            self._waiting.remove(waiter)
+            self._active[waiter.model] = self._active.get(waiter.model, 0) + 1
+            busy.add(waiter.model)
+            active += 1
+            self.stats["granted"] += 1
+            self._waits.append(now - waiter.enqueued)
+            waiter.future.set_result(None)
+
+    async def acquire(self, model: str, priority: int = INTERACTIVE, admission: Optional[Admission] = None):
+        """
+        Attend un créneau. `admission` : ticket de check_admission(), consommé à
+        l'entrée en file ; sans ticket, les requêtes interactives sont contrôlées
+        ici, les tâches de fond ne sont jamais refusées.
+        """
+        if admission is None and priority == INTERACTIVE:
+            admission = self.check_admission()
+        waiter = _Waiter(model, priority)
+        self._waiting.append(waiter)
+        if admission is not None:
+            admission.release()  # Place réservée -> place en file, sans await entre les deux
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(model)  # Créneau accordé juste avant l'annulation
+            else:
+                self._waiting.remove(waiter)
+                self.stats["cancelled"] += 1
+            raise
+
+    def release(self, model: str, duration: Optional[float] = None):
+        if self._active.get(model, 0) > 1:
+            self._active[model] -= 1
+        else:
+            self._active.pop(model, None)
+        if duration is not None:
+            self._service_time = duration if self._service_time is None else 0.8 * self._service_time + 0.2 * duration
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, model: str, priority: int = INTERACTIVE, admission: Optional[Admission] = None):
+        """Créneau de génération pour `model`, libéré à la sortie du bloc."""
+        await self.acquire(model, priority, admission)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(model, time.monotonic() - started)
+
+    # --- Métriques ---
+
+    def metrics(self) -> Dict:
+        waits = sorted(self._waits)
+        queued: Dict[str, int] = {}
+        for waiter in self._waiting:
+            queued[waiter.model] = queued.get(waiter.model, 0) + 1
+        return {
+            "active": sum(self._active.values()),
+            "queued": len(self._waiting),
+            "admitted": len(self._admitted),
+            "queued_background": sum(1 for w in self._waiting if w.priority == BACKGROUND),
+            "models": {
+                model: {"active": self._active.get(model, 0), "queued": queued.get(model, 0)}
+                for model in sorted(set(self._active) | set(queued))
+            },
+            "wait_seconds": {
+                "avg": round(statistics.fmean(waits), 3) if waits else 0.0,
+                "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0.0,
+                "max": round(waits[-1], 3) if waits else 0.0,
+            },
+            "service_seconds": round(self._service_time, 3) if self._service_time else None,
+            "limits": {
+                "max_active": self.max_active,
+                "model_concurrency": self.model_concurrency,
+                "max_queued": self.max_queued,
+            },
+            **self.stats,
+        }
+
+
+# Singleton
+request_scheduler = RequestScheduler()
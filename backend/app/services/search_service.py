@@ -1,21 +1,202 @@
-from duckduckgo_search import DDGS
+import asyncio
+import json
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.metrics import SEARCH_OUTCOMES, SEARCH_STAGE_SECONDS
+from app.core.tracing import record
+
+# Un résultat : {"title": ..., "href": ..., "body": ...}
+Results = List[Dict[str, str]]
+
+
+def normalize_query(query: str) -> str:
+    """Clé de cache : casse, espaces et formes Unicode équivalentes confondus."""
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+# --- Backends (appels bloquants, exécutés hors de la boucle asyncio) ---
+
+class DuckDuckGoBackend:
+    name = "duckduckgo"
+
+    def search(self, query: str, max_results: int) -> Results:
+        # Import paresseux : paquet optionnel, et coûteux à importer au démarrage
+        from duckduckgo_search import DDGS
+        with DDGS() as ddgs:
+            return [r for r in ddgs.text(query, max_results=max_results)]
+
+
+class FixtureBackend:
+    """
+    Résultats lus dans un fichier JSON (tests, benchmarks, hors ligne) :
+    soit une liste de résultats, soit {requête normalisée: [...], "*": [...]}.
+    `delay` simule la latence réseau.
+    """
+    name = "fixture"
+
+    def __init__(self, path: str, delay: float = 0.0):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.results = data if isinstance(data, dict) else {"*": data}
+        self.delay = delay
+
+    def search(self, query: str, max_results: int) -> Results:
+        if self.delay:
+            time.sleep(self.delay)
+        results = self.results.get(normalize_query(query), self.results.get("*", []))
+        return results[:max_results]
+
+
+class HttpBackend:
+    """Service de recherche HTTP local : GET <url>?q=...&max_results=N -> {"results": [...]}."""
+    name = "http"
+
+    def __init__(self, url: str):
+        self.url = url
+        self._client = httpx.Client(timeout=settings.WEB_SEARCH_TIMEOUT)
+
+    def search(self, query: str, max_results: int) -> Results:
+        response = self._client.get(self.url, params={"q": query, "max_results": max_results})
+        response.raise_for_status()
+        return response.json().get("results", [])
+
+
+def build_backend(name: str = None, target: str = None):
+    name = (name or settings.WEB_SEARCH_BACKEND).lower()
+    target = target if target is not None else settings.WEB_SEARCH_TARGET
+    if name == "duckduckgo":
+        return DuckDuckGoBackend()
+    if name == "fixture":
+        return FixtureBackend(target)
+    if name == "http":
+        return HttpBackend(target)
+    raise ValueError(f"Backend de recherche inconnu : {name}")
+
+
+# --- Service ---
 
 class SearchService:
-    def search_web(self, query: str, max_results: int = 5):
-        """Recherche sur le web et retourne un condensé des résultats."""
+    """
+    Étape de recherche web du chat :
+    - exécutée dans un pool de threads dédié, jamais sur la boucle asyncio ;
+    - budget de temps strict : au-delà, on répond sans contexte web ;
+    - cache TTL + LRU par requête normalisée, et une seule requête en vol
+      par clé (les appels concurrents identiques attendent la même).
+    """
+
+    def __init__(self, backend=None, timeout: float = None, cache_size: int = None, ttl: float = None):
+        self._backend = backend
+        self.timeout = timeout if timeout is not None else settings.WEB_SEARCH_TIMEOUT
+        self.cache_size = cache_size if cache_size is not None else settings.WEB_SEARCH_CACHE_SIZE
+        self.ttl = ttl if ttl is not None else settings.WEB_SEARCH_CACHE_TTL
+        self._cache: "OrderedDict[Tuple[str, int], Tuple[float, Results]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, int], asyncio.Future] = {}
+        # Pool dédié : une recherche bloquée n'occupe pas l'exécuteur par défaut
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="web-search")
+        self.stats = {"hits": 0, "misses": 0, "shared": 0, "timeouts": 0, "errors": 0}
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = build_backend()
+        return self._backend
+
+    # --- Cache ---
+
+    def _cache_get(self, key) -> Optional[Results]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        stored_at, results = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return results
+
+    def _cache_put(self, key, results: Results):
+        self._cache[key] = (time.monotonic(), results)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    # --- Recherche ---
+
+    async def search(self, query: str, max_results: int = 5) -> Optional[Results]:
+        """Résultats bruts, ou None si la recherche a échoué ou dépassé le budget."""
+        key = (normalize_query(query), max_results)
+        if not key[0]:
+            return None
+        started = time.perf_counter()
+        outcome = "hit"
         try:
-            with DDGS() as ddgs:
-                results = [r for r in ddgs.text(query, max_results=max_results)]
-                if not results:
-                    return "Aucun résultat trouvé sur le web."
-                
-                # Formatage des résultats pour l'IA
-                context = "\n--- RÉSULTATS WEB ---\n"
-                for r in results:
-                    context += f"Titre: {r['title']}\nLien: {r['href']}\nExtrait: {r['body']}\n\n"
-                return context
-        except Exception as e:
-            print(f"Erreur de recherche: {e}")
-            return "Impossible d'accéder aux données web pour le moment."
-
-search_service = SearchService()
\ No newline at end of file
+            cached = self._cache_get(key)
+            if cached is not None:
+                self.stats["hits"] += 1
+                return cached
+
+            future = self._inflight.get(key)
+            if future is not None:
+                outcome = "shared"
+                self.stats["shared"] += 1
+            else:
+                outcome = "miss"
+                self.stats["misses"] += 1
+                loop = asyncio.get_running_loop()
+                future = loop.run_in_executor(self._executor, self.backend.search, query, max_results)
+                self._inflight[key] = future
+                # Même après un timeout côté appelant, le résultat tardif alimente le cache
+                future.add_done_callback(lambda f: self._on_done(key, f, started))
+
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                self.stats["timeouts"] += 1
+                logger.warning(f"⏱️ Recherche web abandonnée après {self.timeout}s, réponse sans contexte web")
+            except Exception as e:
+                outcome = "error"
+                self.stats["errors"] += 1
+                logger.error(f"Erreur de recherche: {e}")
+            return None
+        finally:
+            # Étape "total" : attente vue par le chat (budget compris) ; "backend" : appel réel
+            SEARCH_OUTCOMES.labels(outcome).inc()
+            SEARCH_STAGE_SECONDS.labels("total").observe(time.perf_counter() - started)
+            record("web_search", started, outcome=outcome)
+
+    def _on_done(self, key, future: asyncio.Future, started: float):
+        self._inflight.pop(key, None)
+        if not future.cancelled():
+            SEARCH_STAGE_SECONDS.labels("backend").observe(time.perf_counter() - started)
+        if not future.cancelled() and future.exception() is None:
+            self._cache_put(key, future.result())
+
+    @staticmethod
+    def format_context(results: Results) -> str:
+        """Formatage des résultats pour l'IA."""
+        if not results:
+            return "Aucun résultat trouvé sur le web."
+        context = "\n--- RÉSULTATS WEB ---\n"
+        for r in results:
+            context += f"Titre: {r.get('title', '')}\nLien: {r.get('href', '')}\nExtrait: {r.get('body', '')}\n\n"
+        return context
+
+    async def get_context(self, query: str, max_results: int = 5) -> Optional[str]:
+        """Contexte web prêt à injecter dans le prompt, ou None (timeout / erreur)."""
+        results = await self.search(query, max_results)
+        return None if results is None else self.format_context(results)
+
+
+search_service = SearchService()
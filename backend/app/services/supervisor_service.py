@@ -0,0 +1,334 @@
+import asyncio
+import logging
+import os
+import shlex
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from app.core.config import settings, load_user_settings
+from app.core.logger import logger
+from app.services.ollama_service import ollama_service
+
+STARTING = "starting"        # Premier lancement : aucun serveur ne répond encore
+READY = "ready"
+DEGRADED = "degraded"        # Sondes en échec (sous le seuil, ou serveur non relançable)
+RESTARTING = "restarting"    # Arrêt / relance en cours, backoff compris
+STOPPED = "stopped"
+
+# Au-delà de cette durée sans incident, le backoff repart de sa valeur initiale
+STABLE_SECONDS = 60.0
+
+# Sortie d'Ollama (slog : "level=WARN ...", journal HTTP "[GIN] ...") -> niveau de log
+_LEVELS = (("level=ERROR", logging.ERROR), ("level=WARN", logging.WARNING), ("[GIN]", logging.DEBUG))
+
+
+def _host_of(base_url: str) -> str:
+    """OLLAMA_HOST du processus lancé : même hôte et port que OLLAMA_BASE_URL."""
+    parts = urlsplit(base_url)
+    return f"{parts.hostname or '127.0.0.1'}:{parts.port or 11434}"
+
+
+class OllamaSupervisor:
+    """
+    Cycle de vie du serveur Ollama. Au démarrage, un serveur qui répond déjà
+    (lancé à la main, service système, autre instance du backend) est réutilisé :
+    rien n'est lancé en double. Sinon `ollama serve` est lancé et possédé par le
+    superviseur : sa sortie part dans les logs, sa fin est détectée aussitôt,
+    et il est relancé (backoff exponentiel) s'il s'arrête ou si
+    OLLAMA_SUPERVISOR_FAILURES sondes de santé consécutives échouent. Avant
+    chaque relance, le port est sondé : si un autre serveur l'a pris entre-temps,
+    il est adopté.
+
+    L'état (starting / ready / degraded / restarting) peut être attendu :
+    `await wait_ready(timeout)`.
+    """
+
+    def __init__(self, ollama=None, binary: Optional[str] = None, base_url: Optional[str] = None,
+                 autostart: Optional[bool] = None, interval: Optional[float] = None,
+                 failures: Optional[int] = None, start_timeout: Optional[float] = None,
+                 backoff: Optional[float] = None, backoff_max: Optional[float] = None):
+        self.ollama = ollama or ollama_service
+        self.binary = binary or settings.OLLAMA_BINARY
+        self.base_url = base_url or settings.OLLAMA_BASE_URL
+        self.autostart = settings.OLLAMA_AUTOSTART if autostart is None else autostart
+        self.interval = interval or settings.OLLAMA_SUPERVISOR_INTERVAL
+        self.max_failures = failures or settings.OLLAMA_SUPERVISOR_FAILURES
+        self.start_timeout = start_timeout or settings.OLLAMA_START_TIMEOUT
+        self.backoff = backoff or settings.OLLAMA_RESTART_BACKOFF
+        self.backoff_max = backoff_max or settings.OLLAMA_RESTART_BACKOFF_MAX
+        self.output = logger.getChild("ollama")
+
+        self.state = STOPPED
+        self.since = time.time()
+        self.owned = False              # Processus lancé par le superviseur (sinon serveur externe)
+        self.failures = 0               # Sondes consécutives en échec
+        self.attempt = 0                # Relances depuis le dernier fonctionnement stable
+        self.next_restart: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.stats = {"spawns": 0, "restarts": 0, "crashes": 0, "health_restarts": 0, "adopted": 0}
+        self._process: Optional[subprocess.Popen] = None
+        self._exit_code: Optional[int] = None
+        self._ready = asyncio.Event()
+        self._wake = asyncio.Event()    # Fin du processus : réveille la boucle sans attendre la sonde
+        self._ready_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._spawning: Optional[asyncio.Future] = None  # Lancement en cours (thread)
+        self._listeners: List[Callable[[Dict], None]] = []
+
+    # --- État ---
+
+    def add_listener(self, listener: Callable[[Dict], None]):
+        """Appelé (dans la boucle asyncio) à chaque changement d'état."""
+        self._listeners.append(listener)
+
+    def _set_state(self, state: str, error: Optional[str] = None):
+        if error is not None:
+            self.last_error = error
+        if state == self.state:
+            return
+        self.state = state
+        self.since = time.time()
+        if state == READY:
+            self._ready.set()
+            self._ready_at = time.monotonic()
+        else:
+            self._ready.clear()
+        for listener in self._listeners:
+            try:
+                listener(self.info())
+            except Exception as e:
+                logger.error(f"Erreur listener superviseur: {e}")
+
+    @property
+    def restarting(self) -> bool:
+        """Ollama est en cours de (re)lancement : mieux vaut attendre que d'échouer."""
+        return self.state in (STARTING, RESTARTING)
+
+    async def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """True dès qu'Ollama répond ; False si `timeout` expire avant."""
+        if self.state == READY:
+            return True
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def info(self) -> Dict:
+        process = self._process
+        return {
+            "state": self.state,
+            "since": self.since,
+            "owned": self.owned,
+            "pid": process.pid if process is not None and process.poll() is None else None,
+            "autostart": self.autostart,
+            "consecutive_failures": self.failures,
+            "next_restart_in": round(max(0.0, self.next_restart - time.monotonic()), 1) if self.next_restart else None,
+            "last_exit_code": self._exit_code,
+            "last_error": self.last_error,
+            "stats": dict(self.stats),
+        }
+
+    # --- Processus ---
+
+    def _command(self) -> List[str]:
+        # Chemin de l'exécutable (espaces compris) ou commande complète ("python fake_ollama.py")
+        if os.path.isfile(self.binary):
+            return [self.binary, "serve"]
+        return shlex.split(self.binary, posix=os.name != "nt") + ["serve"]
+
+    def _environment(self) -> Dict[str, str]:
+        env = os.environ.copy()
+        env["OLLAMA_HOST"] = _host_of(self.base_url)
+        models_path = load_user_settings().get("ollama_models_path")
+        if models_path:
+            env["OLLAMA_MODELS"] = str(models_path)
+            logger.info(f"📂 Dossier Ollama personnalisé : {models_path}")
+        return env
+
+    def _popen(self) -> subprocess.Popen:
+        """Thread : réglages utilisateur (disque) et fork/exec d'`ollama serve`."""
+        kwargs = {"creationflags": subprocess.CREATE_NO_WINDOW} if os.name == "nt" else {}
+        return subprocess.Popen(
+            self._command(), env=self._environment(),
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **kwargs
+        )
+
+    async def _spawn(self):
+        loop = asyncio.get_running_loop()
+        spawning = asyncio.ensure_future(asyncio.to_thread(self._popen))
+        # Processus enregistré même si la supervision est annulée pendant le lancement : stop() l'arrête
+        spawning.add_done_callback(lambda future: self._on_spawned(future, loop))
+        self._spawning = spawning
+        await asyncio.shield(spawning)
+
+    def _on_spawned(self, future: asyncio.Future, loop: asyncio.AbstractEventLoop):
+        self._spawning = None
+        if future.cancelled() or future.exception() is not None:
+            return  # OSError remontée par _spawn()
+        process = future.result()
+        self._process = process
+        self.owned = True
+        self.stats["spawns"] += 1
+        threading.Thread(target=self._pump, args=(process, loop), name="ollama-output", daemon=True).start()
+        logger.info(f"🟢 Ollama lancé (pid {process.pid})")
+
+    def _pump(self, process: subprocess.Popen, loop: asyncio.AbstractEventLoop):
+        """Thread : sortie du processus vers les logs, puis signalement de sa fin."""
+        for raw in process.stdout:
+            line = raw.decode("utf-8", errors="replace").rstrip()
+            if line:
+                level = next((lvl for marker, lvl in _LEVELS if marker in line), logging.INFO)
+                self.output.log(level, line)
+        process.stdout.close()
+        code = process.wait()
+        try:
+            loop.call_soon_threadsafe(self._on_exit, process, code)
+        except RuntimeError:
+            pass  # Boucle fermée (arrêt du backend)
+
+    def _on_exit(self, process: subprocess.Popen, code: int):
+        if process is not self._process:
+            return  # Ancien processus arrêté volontairement
+        self._exit_code = code
+        if self.state != STOPPED:
+            self.stats["crashes"] += 1
+            logger.warning(f"⚠️ Ollama s'est arrêté (code {code})")
+            self._wake.set()
+
+    async def _terminate(self, timeout: float = 5.0):
+        process, self._process = self._process, None
+        if process is None or process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            await asyncio.to_thread(process.wait, timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            await asyncio.to_thread(process.wait)
+
+    # --- Supervision ---
+
+    async def _alive(self) -> bool:
+        return await self.ollama.probe() is not None
+
+    async def _wait_alive(self, timeout: float) -> bool:
+        """Sonde avec backoff jusqu'à la réponse du serveur, la fin du processus ou le délai."""
+        deadline = time.monotonic() + timeout
+        delay = 0.05
+        while time.monotonic() < deadline:
+            if await self._alive():
+                return True
+            if self._process is not None and self._process.poll() is not None:
+                return False
+            await asyncio.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+            delay = min(delay * 1.5, 1.0)
+        return False
+
+    def _adopt(self):
+        """Serveur qui répond sans avoir été lancé par le superviseur : réutilisé tel quel."""
+        self.owned = False
+        self.failures = 0
+        self.stats["adopted"] += 1
+        self._set_state(READY)
+        logger.info(f"🟢 Serveur Ollama déjà actif sur {self.base_url} : réutilisé")
+
+    async def _restart(self, reason: str):
+        """Arrête le processus possédé (s'il tourne encore) et en relance un, après backoff."""
+        self._set_state(STARTING if self.state == STARTING else RESTARTING, reason)
+        if self.attempt:
+            delay = min(self.backoff * 2 ** (self.attempt - 1), self.backoff_max)
+            self.next_restart = time.monotonic() + delay
+            logger.info(f"🔁 Relance d'Ollama dans {delay:.1f}s ({reason})")
+            await asyncio.sleep(delay)
+            self.next_restart = None
+        self.attempt += 1
+        self.failures = 0
+        await self._terminate()
+        # Un autre serveur a pu prendre le port pendant l'attente : pas de doublon
+        if await self._alive():
+            self._adopt()
+            return
+        try:
+            await self._spawn()
+        except OSError as e:
+            # Exécutable introuvable : inutile de réessayer, seul un serveur externe peut encore apparaître
+            self.autostart = False
+            self._set_state(DEGRADED, f"Impossible de lancer Ollama ({self.binary}) : {e}")
+            logger.warning(f"⚠️ {self.last_error}")
+            return
+        if self.stats["spawns"] > 1:
+            self.stats["restarts"] += 1
+        if await self._wait_alive(self.start_timeout):
+            self.ollama.invalidate()  # Nouveau serveur : métadonnées en cache périmées
+            self._set_state(READY)
+            logger.info("✅ Ollama prêt")
+        else:
+            self.last_error = "Ollama n'a pas répondu après son lancement"
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            exited = self._process is not None and self._process.poll() is not None
+            if not exited and await self._alive():
+                self.failures = 0
+                if self.state == STARTING and not self.owned:
+                    self._adopt()
+                elif self.state != READY:
+                    self._set_state(READY)
+                elif self.attempt and time.monotonic() - self._ready_at > STABLE_SECONDS:
+                    self.attempt = 0
+            else:
+                self.failures += 1
+                if self.autostart and (exited or self.restarting):
+                    # Processus arrêté, premier lancement ou relance restée sans réponse
+                    await self._restart("processus arrêté" if exited else "aucun serveur ne répond")
+                    continue
+                if self.autostart and self.failures >= self.max_failures:
+                    self.stats["health_restarts"] += 1
+                    await self._restart(f"{self.failures} sondes de santé en échec")
+                    continue
+                self._set_state(DEGRADED)
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _supervise(self):
+        while True:
+            try:
+                await self._run()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erreur superviseur Ollama: {e}")
+                await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._set_state(STARTING)
+            self._task = asyncio.get_running_loop().create_task(self._supervise())
+
+    async def stop(self, stop_process: Optional[bool] = None):
+        """Arrête la supervision ; le processus possédé est arrêté avec (OLLAMA_STOP_ON_EXIT)."""
+        self._set_state(STOPPED)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._spawning is not None:
+            await asyncio.gather(self._spawning, return_exceptions=True)
+        if settings.OLLAMA_STOP_ON_EXIT if stop_process is None else stop_process:
+            if self._process is not None and self._process.poll() is None:
+                logger.info("🛑 Arrêt d'Ollama")
+            await self._terminate()
+
+
+# Singleton
+ollama_supervisor = OllamaSupervisor()
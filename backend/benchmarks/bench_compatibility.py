@@ -0,0 +1,104 @@
+"""
+Benchmark : estimation de compatibilité matériel / modèles.
+
+Plusieurs modèles installés sur le stub (métadonnées /api/show lentes) plus
+le catalogue. On mesure :
+- passe à froid : un /api/show par modèle installé (en parallèle) ;
+- passes suivantes : aucune requête, métadonnées en cache par digest ;
+- après re-téléchargement d'un modèle : seul son /api/show est relu ;
+puis la répartition des couches du catalogue sur quelques profils matériels.
+
+    cd backend && python -m benchmarks.bench_compatibility --installed 8 --show-delay 0.05
+"""
+import argparse
+import asyncio
+import time
+
+from app.services.compatibility_service import FitEstimator, HardwareProfile
+from app.services.ollama_service import OllamaService
+from benchmarks.stub_ollama import StubConfig, StubOllama
+
+# Profils matériels fixes (RAM 32 Go à 80 %, 16 threads) : résultats indépendants de la machine
+PROFILES = [
+    HardwareProfile(f"GPU {vram_gb} Go" if vram_gb else "CPU seul", int(vram_gb * 1024**3 * 0.9),
+                    int(32 * 1024**3 * 0.8), 16)
+    for vram_gb in (0, 8, 24)
+]
+
+
+class _FixedGPU:
+    def __init__(self, total_mb: int):
+        self.total_mb = total_mb
+
+    def get_gpu_stats(self):
+        return {"available": bool(self.total_mb), "name": f"GPU {self.total_mb} Mo", "usage": 0,
+                "used_mb": 0, "total_mb": self.total_mb}
+
+
+async def _timed(estimator: FitEstimator, num_ctx=None):
+    start = time.perf_counter()
+    result = await estimator.check_all(num_ctx)
+    return time.perf_counter() - start, result
+
+
+async def _run(stub: StubOllama, repeat: int):
+    service = OllamaService(base_url=stub.base_url)
+    estimator = FitEstimator(ollama=service, gpu=_FixedGPU(8192))
+    rows = []
+    cold, result = await _timed(estimator)
+    rows.append(("passe à froid", cold, stub.server.requests["/api/show"], len(result["models"])))
+
+    before = stub.server.requests["/api/show"]
+    warm = [(await _timed(estimator))[0] for _ in range(repeat)]
+    rows.append((f"{repeat} passes en cache (médiane)", sorted(warm)[len(warm) // 2],
+                 stub.server.requests["/api/show"] - before, len(result["models"])))
+
+    async for _ in service.pull_model("stub-0:latest"):
+        pass
+    service.invalidate()
+    before = stub.server.requests["/api/show"]
+    repulled, _ = await _timed(estimator)
+    rows.append(("après re-pull d'un modèle", repulled, stub.server.requests["/api/show"] - before,
+                 len(result["models"])))
+
+    splits = {}
+    for profile in PROFILES:
+        estimator._hardware, estimator._hardware_at = profile, time.monotonic()
+        for num_ctx in (4096, 32768):
+            splits[(profile.gpu_name, num_ctx)] = (await estimator.check_all(num_ctx))["models"]
+    await service.close()
+    return rows, splits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--installed", type=int, default=8)
+    parser.add_argument("--show-delay", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    config = StubConfig(models=[f"stub-{i}:latest" for i in range(args.installed)], show_delay=args.show_delay,
+                        pull_layers=[1024], pull_steps=1)
+    with StubOllama(config) as stub:
+        rows, splits = asyncio.run(_run(stub, args.repeat))
+
+    print(f"--- {args.installed} modèles installés, /api/show à {args.show_delay * 1000:.0f} ms ---")
+    for label, elapsed, shows, models in rows:
+        print(f"{label:<28} {elapsed * 1000:8.2f} ms | /api/show : {shows:>3} | {models} modèles évalués")
+
+    print("\n--- répartition des couches (GPU / total) et empreinte, catalogue, RAM 32 Go ---")
+    columns = list(splits)
+    print(f"{'modèle':<16}" + "".join(f"{f'{label} {ctx // 1024}k':>18}" for label, ctx in columns))
+    for i, model in enumerate(splits[columns[0]]):
+        if model["installed"]:
+            continue
+        cells = []
+        for column in columns:
+            fit = splits[column][i]
+            mark = {"compatible": "ok", "partial": "part.", "cpu_only": "CPU", "incompatible": "non"}[fit["status"]]
+            cells.append(f"{mark} {fit['gpu_layers']}/{fit['layers']} {fit['total_bytes'] / 1024**3:4.1f}G")
+        print(f"{model['model']:<16}" + "".join(f"{cell:>18}" for cell in cells))
+
+
+if __name__ == "__main__":
+    main()
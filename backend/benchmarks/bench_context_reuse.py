@@ -0,0 +1,82 @@
+"""
+Benchmark : temps jusqu'au premier token (TTFT) au fil d'une conversation.
+
+Le stub facture l'évaluation du prompt au token (--prompt-eval-delay) et renvoie
+`prompt_eval_count` et `context` comme Ollama. Deux stratégies :
+- historique complet renvoyé à chaque tour (sans réutilisation) ;
+- réutilisation du `context` du tour précédent (seul le nouveau message est évalué).
+
+    cd backend && python -m benchmarks.bench_context_reuse --turns 20
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.services.ollama_service import OllamaService
+from benchmarks.stub_ollama import StubConfig, StubOllama
+
+SYSTEM = "You are Horizon, a helpful and precise AI. Always answer in English."
+WORDS = "model memory cache token context prompt server thread request answer question history".split()
+
+
+def _message(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+async def _turn(service: OllamaService, prompt: str, system: str, context=None):
+    start = time.perf_counter()
+    ttft = None
+    reply, final = [], {}
+    async for chunk in service.chat_stream("stub-model:latest", prompt, system=system, context=context):
+        if chunk.token and ttft is None:
+            ttft = time.perf_counter() - start
+        reply.append(chunk.token)
+        if chunk.data.get("done"):
+            final = chunk.data
+    return ttft, "".join(reply), final
+
+
+async def _conversation(base_url: str, turns: int, words: int, reuse: bool):
+    service = OllamaService(base_url=base_url)
+    await _turn(service, "warm-up", SYSTEM)  # Connexion du pool établie hors mesure
+    rng = random.Random(7)
+    history, context, rows = [], None, []
+    for turn in range(1, turns + 1):
+        message = _message(rng, words)
+        if reuse:
+            ttft, reply, final = await _turn(service, message, SYSTEM, context)
+            context = final.get("context")
+        else:
+            prompt = "\n".join(history + [f"user: {message}"])
+            ttft, reply, final = await _turn(service, prompt, SYSTEM)
+            history += [f"user: {message}", f"assistant: {reply}"]
+        rows.append((turn, ttft, final.get("prompt_eval_count")))
+    await service.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--words", type=int, default=60, help="mots par message utilisateur")
+    parser.add_argument("--prompt-eval-delay", type=float, default=0.0002, help="secondes par token de prompt")
+    args = parser.parse_args()
+
+    config = StubConfig(response_tokens=40, prompt_eval_delay=args.prompt_eval_delay)
+    with StubOllama(config) as stub:
+        full = asyncio.run(_conversation(stub.base_url, args.turns, args.words, reuse=False))
+        reused = asyncio.run(_conversation(stub.base_url, args.turns, args.words, reuse=True))
+
+    print(f"--- {args.turns} tours, {args.words} mots par message, "
+          f"{args.prompt_eval_delay * 1e3:.2f} ms par token de prompt ---")
+    print(f"{'tour':>4} | {'historique complet':>28} | {'contexte réutilisé':>28}")
+    shown = sorted({1, 2, args.turns // 2, args.turns})
+    for (turn, ttft_a, count_a), (_, ttft_b, count_b) in zip(full, reused):
+        if turn in shown:
+            print(f"{turn:>4} | TTFT {ttft_a * 1000:7.1f} ms, {count_a:>5} tok | "
+                  f"TTFT {ttft_b * 1000:7.1f} ms, {count_b:>5} tok")
+
+
+if __name__ == "__main__":
+    main()
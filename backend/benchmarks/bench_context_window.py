@@ -0,0 +1,99 @@
+"""
+Benchmark : taille du prompt et TTFT sur une longue conversation.
+
+Compare, contre le stub (num_ctx réduit, évaluation du prompt facturée au token) :
+- l'historique complet renvoyé à chaque tour (croît sans limite, dépasse num_ctx) ;
+- la fenêtre du ContextWindowManager : contexte KV tant qu'il tient dans le
+  budget, puis résumé glissant (tâche de fond) + derniers messages.
+
+    cd backend && python -m benchmarks.bench_context_window --turns 60
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from app.services.chat_history_service import ChatHistoryService
+from app.services.context_service import ContextWindowManager
+from app.services.ollama_service import OllamaService
+from benchmarks.stub_ollama import StubConfig, StubOllama
+
+MODEL = "stub-model:latest"
+SYSTEM = "You are Horizon, a helpful and precise AI. Always answer in English."
+WORDS = "model memory cache token context prompt server thread request answer question history".split()
+
+
+async def _stream(service: OllamaService, prompt: str, context=None):
+    start = time.perf_counter()
+    ttft, reply, final = None, [], {}
+    async for chunk in service.chat_stream(MODEL, prompt, system=SYSTEM, context=context):
+        if chunk.token and ttft is None:
+            ttft = time.perf_counter() - start
+        reply.append(chunk.token)
+        if chunk.data.get("done"):
+            final = chunk.data
+    return ttft, "".join(reply), final
+
+
+async def _run(base_url: str, db_path: str, turns: int, words: int, windowed: bool):
+    service = OllamaService(base_url=base_url)
+    history = ChatHistoryService(db_path)
+    manager = ContextWindowManager(history=history, ollama=service)
+    rng = random.Random(3)
+    chat_id = f"bench_{'window' if windowed else 'full'}"
+    context, rows = None, []
+    await _stream(service, "warm-up")
+
+    for turn in range(1, turns + 1):
+        message = " ".join(rng.choice(WORDS) for _ in range(words))
+        question = f"Question: {message}"
+        if windowed:
+            history.append_message(chat_id, MODEL, "user", message)
+            prompt, context = await manager.build(chat_id, MODEL, SYSTEM, question, context)
+        else:
+            prior = history.get_messages_after(chat_id) if turn > 1 else []
+            history.append_message(chat_id, MODEL, "user", message)
+            prompt = manager.compose("", prior, question)
+        ttft, reply, final = await _stream(service, prompt, context)
+        history.append_message(chat_id, MODEL, "assistant", reply)
+        if windowed:
+            context = final.get("context")
+        rows.append((turn, ttft, final.get("prompt_eval_count")))
+        await asyncio.sleep(0.01)  # Temps de frappe : laisse avancer le résumé en arrière-plan
+
+    await manager.stop()
+    summary, covered = history.get_summary(chat_id)
+    history.close()
+    await service.close()
+    return rows, covered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--words", type=int, default=60)
+    parser.add_argument("--num-ctx", type=int, default=2048)
+    parser.add_argument("--prompt-eval-delay", type=float, default=0.0002)
+    args = parser.parse_args()
+
+    config = StubConfig(response_tokens=40, prompt_eval_delay=args.prompt_eval_delay, num_ctx=args.num_ctx)
+    with StubOllama(config) as stub, tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "history.db")
+        full, _ = asyncio.run(_run(stub.base_url, db_path, args.turns, args.words, windowed=False))
+        window, covered = asyncio.run(_run(stub.base_url, db_path, args.turns, args.words, windowed=True))
+
+    print(f"--- {args.turns} tours, num_ctx {args.num_ctx}, {args.prompt_eval_delay * 1e3:.2f} ms par token ---")
+    print(f"{'tour':>4} | {'historique complet':>28} | {'fenêtre + résumé':>28}")
+    shown = sorted({1, 10, args.turns // 2, args.turns})
+    for (turn, ttft_a, count_a), (_, ttft_b, count_b) in zip(full, window):
+        if turn in shown:
+            print(f"{turn:>4} | TTFT {ttft_a * 1000:7.1f} ms, {count_a:>5} tok | "
+                  f"TTFT {ttft_b * 1000:7.1f} ms, {count_b:>5} tok")
+    worst = max(count for _, _, count in window)
+    print(f"prompt évalué max (fenêtre) : {worst} tokens ; messages résumés : jusqu'à l'id {covered}")
+
+
+if __name__ == "__main__":
+    main()
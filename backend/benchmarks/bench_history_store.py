@@ -0,0 +1,84 @@
+"""
+Benchmark : historique réécrit en entier (ancien save_to_history) vs ChatHistoryService (SQLite).
+
+Simule une conversation de N tours (un message user + une réponse assistant par
+tour) et mesure le temps passé dans l'appelant, le temps jusqu'à validation sur
+disque et le volume écrit.
+
+    cd backend && python -m benchmarks.bench_history_store --turns 1000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from app.core.config import settings
+from app.services.chat_history_service import ChatHistoryService
+
+USER_MSG = "Peux-tu m'expliquer la différence entre un processus et un thread ? " * 2
+ASSISTANT_MSG = "Un processus possède son propre espace mémoire, alors qu'un thread le partage. " * 8
+
+
+def legacy_save(data_dir: Path, chat_id: str, model: str, role: str, content: str) -> int:
+    """Copie de l'ancien save_to_history : relit et réécrit tout le fichier."""
+    file_path = data_dir / f"{chat_id}.json"
+    if file_path.exists():
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    else:
+        data = {"id": chat_id, "model": model, "messages": []}
+    data["messages"].append({"role": role, "content": content})
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+    return file_path.stat().st_size
+
+
+def run_legacy(turns: int) -> tuple:
+    with tempfile.TemporaryDirectory() as tmp:
+        written, start = 0, time.perf_counter()
+        for _ in range(turns):
+            written += legacy_save(Path(tmp), "chat_bench", "stub", "user", USER_MSG)
+            written += legacy_save(Path(tmp), "chat_bench", "stub", "assistant", ASSISTANT_MSG)
+        return time.perf_counter() - start, written
+
+
+def run_sqlite(turns: int, synchronous: str, wait_each: bool = False) -> tuple:
+    settings.HISTORY_DB_SYNCHRONOUS = synchronous
+    with tempfile.TemporaryDirectory() as tmp:
+        service = ChatHistoryService(os.path.join(tmp, "history.db"))
+        start = time.perf_counter()
+        for _ in range(turns):
+            service.append_message("chat_bench", "stub", "user", USER_MSG)
+            future = service.append_message("chat_bench", "stub", "assistant", ASSISTANT_MSG)
+            if wait_each:
+                future.result()  # Une transaction par tour (cadence réelle d'un chat)
+        submitted = time.perf_counter() - start
+        service.flush(timeout=None)
+        elapsed = time.perf_counter() - start
+        # Vérifie que la relecture reconstruit bien la conversation
+        assert len(service.get_conversation("chat_bench")["messages"]) == turns * 2
+        service.close()
+        written = sum(p.stat().st_size for p in Path(tmp).iterdir())
+        return elapsed, written, submitted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"--- Conversation de {args.turns} tours ({args.turns * 2} messages) ---")
+    elapsed, written = run_legacy(args.turns)
+    print(f"{'réécriture complète (avant)':<30} {elapsed:8.3f} s | {written / 1024**2:10.2f} Mo écrits | "
+          f"{elapsed / (args.turns * 2) * 1e3:7.3f} ms/message (bloquant)")
+    for synchronous, wait_each in (("NORMAL", False), ("FULL", False), ("FULL", True)):
+        elapsed, written, submitted = run_sqlite(args.turns, synchronous, wait_each)
+        label = f"SQLite {synchronous}" + (" (commit/tour)" if wait_each else " (par lots)")
+        print(f"{label:<30} {elapsed:8.3f} s | {written / 1024**2:10.2f} Mo (base) | "
+              f"{submitted / (args.turns * 2) * 1e3:7.3f} ms/message côté appelant")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark : image de ~20 Mo jointe au chat.
+
+Mesure le pic de mémoire Python (tracemalloc) et la durée de préparation
+et de l'envoi du corps JSON à Ollama :
+- avant : `await file.read()` puis base64 de tout le contenu en mémoire, puis
+  json.dumps du payload ;
+- pipeline : lecture par blocs + hash, encodage en flux (ou réduction avec
+  Pillow) vers le cache disque, puis corps JSON relu par blocs pendant l'envoi
+  (OllamaService._image_body) : la même image renvoyée n'est pas ré-encodée.
+
+    cd backend && python -m benchmarks.bench_image_upload --size-mb 20
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from app.services.image_service import ImagePipeline, _pillow_available
+from app.services.ollama_service import OllamaService
+
+
+def _make_image(path: str, size_mb: int):
+    """JPEG bruité (peu compressible) d'environ size_mb Mo, ou octets aléatoires sans Pillow."""
+    if not _pillow_available():
+        with open(path, "wb") as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(1024**2))
+        return
+    from PIL import Image
+
+    side = int((size_mb * 1024**2 / 1.2) ** 0.5)
+    Image.frombytes("RGB", (side, side), os.urandom(side * side * 3)).save(path, "JPEG", quality=95)
+
+
+def _measure(work):
+    tracemalloc.start()
+    start = time.perf_counter()
+    body_size = work()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, body_size
+
+
+def _before(path: str):
+    with open(path, "rb") as f:
+        contents = f.read()
+    image_base64 = base64.b64encode(contents).decode("utf-8")
+    return len(json.dumps({"model": "llava", "prompt": "Décris l'image", "images": [image_base64]}).encode("utf-8"))
+
+
+async def _send(body: dict) -> int:
+    """Consomme le corps comme le ferait httpx pendant l'envoi."""
+    sent = 0
+    async for chunk in body["content"]:
+        sent += len(chunk)
+    assert sent == int(body["headers"]["Content-Length"])
+    return sent
+
+
+def _pipeline(pipeline: ImagePipeline, path: str):
+    with open(path, "rb") as f:
+        image = pipeline.prepare_file(f)
+    body = OllamaService._image_body({"model": "llava", "prompt": "Décris l'image"}, image)
+    try:
+        return asyncio.run(_send(body))
+    finally:
+        image.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=20)
+    parser.add_argument("--max-side", type=int, default=1024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "photo.jpg")
+        _make_image(path, args.size_mb)
+        size = os.path.getsize(path)
+        print(f"--- image de {size / 1024**2:.1f} Mo, Pillow {'présent' if _pillow_available() else 'absent'} ---")
+        print(f"{'':<34} {'durée':>9} {'pic mémoire':>12} {'corps JSON':>12}")
+
+        def row(label, result):
+            elapsed, peak, body = result
+            print(f"{label:<34} {elapsed * 1000:7.0f} ms {peak / 1024**2:9.1f} Mo {body / 1024**2:9.2f} Mo")
+
+        row("avant (lecture + base64)", _measure(lambda: _before(path)))
+        variants = [("flux base64", 0)] + ([(f"réduction {args.max_side}px", args.max_side)] if _pillow_available() else [])
+        for label, max_side in variants:
+            pipeline = ImagePipeline(os.path.join(tmp, f"cache_{max_side}"), max_side=max_side, cache_max_mb=200)
+            row(f"pipeline, {label}", _measure(lambda: _pipeline(pipeline, path)))
+            row(f"pipeline, {label}, cache", _measure(lambda: _pipeline(pipeline, path)))
+
+
+if __name__ == "__main__":
+    main()
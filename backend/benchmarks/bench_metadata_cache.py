@@ -0,0 +1,69 @@
+"""
+Benchmark : trafic vers Ollama pendant le polling de l'interface.
+
+Plusieurs clients interrogent la liste des modèles et la santé à intervalle
+régulier (TopBar, FileManager, Dashboard...). On compte les requêtes reçues
+par le stub :
+- avant : chaque appel devient un aller-retour /api/tags ;
+- après : cache TTL + single-flight, santé lue depuis la sonde en arrière-plan
+  (une requête par intervalle de sonde, quel que soit le nombre de clients).
+
+    cd backend && python -m benchmarks.bench_metadata_cache --clients 6 --duration 3
+"""
+import argparse
+import asyncio
+import time
+
+from app.core.config import settings
+from app.services.ollama_service import OllamaService
+from benchmarks.stub_ollama import StubOllama
+
+
+async def _poll(call, interval: float, duration: float):
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        await call()
+        await asyncio.sleep(interval)
+
+
+async def _run(base_url: str, clients: int, interval: float, duration: float, cached: bool):
+    service = OllamaService(base_url=base_url)
+    if cached:
+        list_call, health_call = service.list_models, lambda: asyncio.sleep(0)  # Santé : état de la sonde
+        probe_interval = settings.HEALTH_PROBE_INTERVAL * interval  # Même échelle de temps que les clients
+        pollers = [_poll(service.probe, probe_interval, duration)]
+    else:
+        list_call = health_call = service._fetch_tags
+        pollers = []
+    pollers += [_poll(list_call, interval, duration) for _ in range(clients)]
+    pollers += [_poll(health_call, interval, duration) for _ in range(2)]
+    await asyncio.gather(*pollers)
+
+    # Rafale : 50 appels simultanés juste après une invalidation
+    service.invalidate()
+    await asyncio.gather(*(service.list_models() for _ in range(50)))
+    stats = dict(service.cache_stats)
+    await service.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=6, help="clients qui listent les modèles")
+    parser.add_argument("--interval", type=float, default=0.1, help="période de polling (s)")
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    print(f"--- {args.clients} clients modèles + 2 clients santé, toutes les {args.interval * 1000:.0f} ms "
+          f"pendant {args.duration:.0f} s, puis rafale de 50 appels ---")
+    for cached in (False, True):
+        with StubOllama() as stub:
+            stats = asyncio.run(_run(stub.base_url, args.clients, args.interval, args.duration, cached))
+            upstream = stub.server.requests["/api/tags"]
+        label = "cache + single-flight" if cached else "sans cache"
+        print(f"{label:<22} requêtes /api/tags : {upstream:>5} ({upstream / args.duration:6.1f}/s)"
+              + (f" | {stats}" if cached else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark : coût de l'instrumentation et validité de /metrics.
+
+- coût par mise à jour (Counter.inc, Histogram.observe avec labels) et par
+  scrape, comparé à une requête HTTP servie par l'application ;
+- "Prometheus local" : quelques chats et un téléchargement contre le stub,
+  puis scrape de /metrics, analyse du format d'exposition (HELP / TYPE,
+  buckets cumulatifs, _count = bucket +Inf) et affichage des séries clés.
+
+    cd backend && python -m benchmarks.bench_metrics --chats 5
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+from collections import defaultdict
+
+from benchmarks.stub_ollama import StubConfig, StubOllama
+
+_SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(.*)\})? (\S+)$')
+_LABEL_RE = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def scrape(text: str) -> dict:
+    """Analyse le format texte de Prometheus ; lève AssertionError si une règle est violée."""
+    types, samples = {}, defaultdict(list)
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ", 3)
+            assert kind in ("counter", "gauge", "histogram"), line
+            types[name] = kind
+            continue
+        match = _SAMPLE_RE.match(line)
+        assert match, f"ligne invalide : {line!r}"
+        name, _, labels, value = match.groups()
+        family = re.sub(r"_(bucket|sum|count)$", "", name) if name not in types else name
+        assert family in types, f"série sans TYPE : {name}"
+        samples[name].append((dict(_LABEL_RE.findall(labels or "")), float(value)))
+
+    for name, kind in types.items():
+        if kind != "histogram":
+            continue
+        series = defaultdict(list)
+        for labels, value in samples[f"{name}_bucket"]:
+            le = labels.pop("le")
+            series[tuple(sorted(labels.items()))].append((float(le), value))
+        counts = {tuple(sorted(l.items())): v for l, v in samples[f"{name}_count"]}
+        for key, buckets in series.items():
+            values = [v for _, v in sorted(buckets)]
+            assert values == sorted(values), f"{name} : buckets non cumulatifs"
+            assert buckets[-1][0] == float("inf") and values[-1] == counts[key], f"{name} : +Inf != _count"
+    return {"types": types, "samples": samples}
+
+
+def _per_call(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=5)
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+
+    # Application démarrée sur un dossier de données jetable (historique, téléchargements,
+    # caches, logs, réglages) : backend/data n'est ni migré ni modifié
+    data_dir = tempfile.mkdtemp(prefix="horizon_bench_")
+    os.environ["DATA_PATH"] = data_dir
+    with open(os.path.join(data_dir, "user_settings.json"), "w", encoding="utf-8") as f:
+        json.dump({"internetAccess": True}, f)  # Recherche web dans les chats (séries web_search)
+    with StubOllama(StubConfig(token_delay=0.002, pull_layers=[8 * 1024**2], pull_steps=8)) as stub:
+        os.environ["OLLAMA_BASE_URL"] = stub.base_url
+        os.environ["WEB_SEARCH_BACKEND"] = "http"  # Recherche web du chat servie par le stub
+        os.environ["WEB_SEARCH_TARGET"] = f"{stub.base_url}/search"
+        from fastapi.testclient import TestClient
+
+        from app.core import metrics
+        from app.main import app
+
+        counter = metrics.Counter("bench_counter_total", "bench", ("model",))
+        histogram = metrics.Histogram("bench_seconds", "bench", ("route",))
+        print(f"--- coût de l'instrumentation ({args.calls} appels) ---")
+        print(f"{'Counter.labels().inc()':<30} {_per_call(lambda: counter.labels('m').inc(), args.calls) * 1e9:8.0f} ns")
+        print(f"{'Histogram.labels().observe()':<30} "
+              f"{_per_call(lambda: histogram.labels('/r').observe(0.042), args.calls) * 1e9:8.0f} ns")
+
+        with TestClient(app) as client:
+            for i in range(args.chats):
+                client.post("/api/v1/chat", data={"prompt": f"Question {i}", "model": "stub-model:latest",
+                                                  "chat_id": f"bench_{i}"}).read()
+            job = client.post("/api/v1/models/pull", data={"model_name": "stub-model:latest"}).json()
+            while client.get(f"/api/v1/models/pulls/{job['job_id']}").json()["status"] not in ("completed", "failed"):
+                time.sleep(0.05)
+            client.get("/api/v1/inconnu")  # Route inconnue : label <unmatched>
+            http = _per_call(lambda: client.get("/api/v1/scheduler"), 300)
+            text = client.get("/metrics").text
+            render = _per_call(metrics.render, 200)
+        print(f"{'requête HTTP (TestClient)':<30} {http * 1e6:8.0f} µs")
+        print(f"{'scrape /metrics (rendu)':<30} {render * 1e6:8.0f} µs ({len(text.splitlines())} lignes)")
+
+    result = scrape(text)
+    print(f"\n--- scrape : {len(result['types'])} métriques, format valide ---")
+    for name, labels in (
+        ("horizon_chat_ttft_seconds_count", {"model": "stub-model:latest", "cache": "miss"}),
+        ("horizon_chat_stream_duration_seconds_sum", {"model": "stub-model:latest", "cache": "miss"}),
+        ("horizon_chat_tokens_total", {"model": "stub-model:latest"}),
+        ("horizon_chat_tokens_per_second_count", {"model": "stub-model:latest"}),
+        ("horizon_chat_active_streams", {}),
+        ("horizon_history_write_seconds_count", {}),
+        ("horizon_pull_bytes_total", {"model": "stub-model:latest"}),
+        ("horizon_pulls_total", {"status": "completed"}),
+        ("horizon_web_search_stage_seconds_count", {"stage": "total"}),
+        ("horizon_web_search_stage_seconds_count", {"stage": "backend"}),
+        ("horizon_http_request_duration_seconds_count", {"method": "POST", "route": "/api/v1/chat", "status": "200"}),
+        ("horizon_http_request_duration_seconds_count", {"method": "GET", "route": "<unmatched>", "status": "404"}),
+    ):
+        found = [v for l, v in result["samples"].get(name, []) if all(l.get(k) == v2 for k, v2 in labels.items())]
+        print(f"{name:<46} {','.join(f'{k}={v}' for k, v in labels.items()):<42} {found[0] if found else '-'}")
+
+
+if __name__ == "__main__":
+    main()
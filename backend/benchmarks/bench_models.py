@@ -0,0 +1,94 @@
+"""
+Benchmark d'inférence d'un modèle : TTFT, tokens/s (génération et évaluation
+du prompt) et temps de chargement, par longueur de prompt et niveau de
+concurrence (même mesure que POST /api/v1/benchmarks).
+
+Le run est ajouté à l'historique (backend/data/benchmarks.jsonl) et comparé
+au dernier run identique. Avec --stub, tout tourne hors ligne contre le
+serveur Ollama factice aux temps synthétiques (historique temporaire, sauf --history).
+
+    cd backend && python -m benchmarks.bench_models --model qwen2.5:7b
+    cd backend && python -m benchmarks.bench_models --stub --token-delay 0.02 --prompt-eval-delay 0.0005
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+from contextlib import ExitStack
+
+from app.core.config import settings
+from app.services.benchmark_service import BENCH_FILE, DEFAULT_CONCURRENCY, PROMPT_SETS, BenchmarkRunner
+from app.services.ollama_service import OllamaService
+from benchmarks.stub_ollama import StubConfig, StubOllama
+
+
+def _print_run(run: dict):
+    print(f"--- {run['model']} sur {run['host']} : {run['status']} en {run['duration']} s, "
+          f"chargement {run['load_seconds']} s ---")
+    if run["error"]:
+        print(f"erreur : {run['error']}")
+        return
+    print(f"{'prompt':<8} {'conc.':>5} {'tokens':>7} {'TTFT p50':>10} {'TTFT p95':>10} "
+          f"{'génération':>11} {'prompt':>11} {'débit total':>12} {'erreurs':>8}")
+    for cell in run["cells"]:
+        print(f"{cell['prompt']:<8} {cell['concurrency']:>5} {cell['prompt_tokens'] or 0:>7.0f} "
+              f"{cell['ttft_p50_ms'] or 0:>7.1f} ms {cell['ttft_p95_ms'] or 0:>7.1f} ms "
+              f"{cell['decode_tps'] or 0:>7.1f} t/s {cell['prompt_tps'] or 0:>7.1f} t/s "
+              f"{cell['throughput_tps'] or 0:>8.1f} t/s {cell['errors']:>8}")
+    comparison = run["comparison"]
+    if comparison is None:
+        print("(aucun run identique précédent : pas de comparaison)")
+        return
+    print(f"comparé au run {comparison['baseline']} (seuil {comparison['threshold']:.0%}) : "
+          + (", ".join(comparison["regressions"]) if comparison["regressions"] else "aucune régression"))
+
+
+async def _run(base_url: str, path: str, args) -> dict:
+    service = OllamaService(base_url=base_url)
+    runner = BenchmarkRunner(path, ollama=service)
+    try:
+        return await runner.run(
+            args.model, prompts=args.prompts, concurrency=args.concurrency, repeat=args.repeat,
+            max_tokens=args.max_tokens, cold_start=args.cold_start,
+            on_progress=lambda run: print(f"  {len(run['cells'])}/{len(args.prompts) * len(args.concurrency)} cellules",
+                                          end="\r", flush=True)
+        )
+    finally:
+        await service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=None, help="modèle (défaut : OLLAMA_DEFAULT_MODEL, ou celui du stub)")
+    parser.add_argument("--prompts", type=lambda v: v.split(","), default=list(PROMPT_SETS),
+                        help=f"jeux de prompts ({','.join(PROMPT_SETS)})")
+    parser.add_argument("--concurrency", type=lambda v: [int(c) for c in v.split(",")],
+                        default=list(DEFAULT_CONCURRENCY))
+    parser.add_argument("--repeat", type=int, default=None)
+    parser.add_argument("--max-tokens", type=int, default=None)
+    parser.add_argument("--cold-start", action="store_true", help="décharge le modèle avant le run")
+    parser.add_argument("--history", default=None, help=f"fichier d'historique (défaut : {BENCH_FILE})")
+    stub = parser.add_argument_group("serveur factice (hors ligne)")
+    stub.add_argument("--stub", action="store_true")
+    stub.add_argument("--load-delay", type=float, default=0.5)
+    stub.add_argument("--token-delay", type=float, default=0.02)
+    stub.add_argument("--prompt-eval-delay", type=float, default=0.0005)
+    args = parser.parse_args()
+
+    with ExitStack() as stack:
+        if args.stub:
+            config = StubConfig(load_delay=args.load_delay, token_delay=args.token_delay,
+                                prompt_eval_delay=args.prompt_eval_delay)
+            base_url = stack.enter_context(StubOllama(config)).base_url
+            args.model = args.model or config.models[0]
+            path = args.history or os.path.join(stack.enter_context(tempfile.TemporaryDirectory()), "benchmarks.jsonl")
+        else:
+            base_url, path = settings.OLLAMA_BASE_URL, args.history or BENCH_FILE
+            args.model = args.model or settings.OLLAMA_DEFAULT_MODEL
+        run = asyncio.run(_run(base_url, path, args))
+    print()
+    _print_run(run)
+
+
+if __name__ == "__main__":
+    main()
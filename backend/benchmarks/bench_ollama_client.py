@@ -0,0 +1,85 @@
+"""
+Micro-benchmark : surcoût par requête vers Ollama, client jetable vs client partagé.
+
+"Avant" reproduit l'ancien OllamaService (un httpx.AsyncClient créé puis fermé à
+chaque appel), "après" utilise le pool keep-alive de OllamaService.
+
+    cd backend && python -m benchmarks.bench_ollama_client --requests 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.services.ollama_service import OllamaService
+from benchmarks.stub_ollama import StubOllama
+
+
+def _report(label: str, samples: list):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<32} moyenne {statistics.mean(samples) * 1e3:7.3f} ms | "
+          f"p50 {statistics.median(samples) * 1e3:7.3f} ms | p95 {p95 * 1e3:7.3f} ms")
+
+
+async def _bench_legacy(base_url: str, n: int) -> dict:
+    async def health():
+        async with httpx.AsyncClient(timeout=2.0) as client:
+            return (await client.get(f"{base_url}/api/tags")).status_code == 200
+
+    async def chat():
+        async with httpx.AsyncClient(timeout=None) as client:
+            async with client.stream("POST", f"{base_url}/api/generate", json={"model": "stub-model:latest", "prompt": "hi", "stream": True}) as response:
+                async for _ in response.aiter_lines():
+                    pass
+
+    return {"health": await _timed(health, n), "chat": await _timed(chat, n)}
+
+
+async def _bench_pooled(base_url: str, n: int) -> dict:
+    service = OllamaService(base_url=base_url)
+    await service.start()
+
+    async def chat():
+        async for _ in service.chat_stream("stub-model:latest", "hi"):
+            pass
+
+    try:
+        # probe() et non check_connection() : ce dernier est servi par le cache de /api/tags,
+        # sans aller-retour HTTP à comparer
+        return {"health": await _timed(service.probe, n), "chat": await _timed(chat, n)}
+    finally:
+        await service.close()
+
+
+async def _timed(fn, n: int) -> list:
+    await fn()  # Échauffement
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    with StubOllama() as stub:
+        legacy = asyncio.run(_bench_legacy(stub.base_url, args.requests))
+        pooled = asyncio.run(_bench_pooled(stub.base_url, args.requests))
+
+    print(f"--- {args.requests} requêtes séquentielles vers {stub.base_url} ---")
+    for op in ("health", "chat"):
+        _report(f"{op} / client jetable (avant)", legacy[op])
+        _report(f"{op} / client partagé (après)", pooled[op])
+        gain = statistics.mean(legacy[op]) / statistics.mean(pooled[op])
+        print(f"{'':<32} gain x{gain:.1f}")
+
+
+if __name__ == "__main__":
+    main()
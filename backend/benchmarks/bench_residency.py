@@ -0,0 +1,109 @@
+"""
+Benchmark : résidence des modèles en mémoire (chargements à froid).
+
+Le stub simule le temps de chargement / déchargement d'un modèle et une VRAM
+limitée (éviction LRU par le serveur quand elle est pleine, comme Ollama).
+Même suite de requêtes sur plusieurs modèles, deux configurations :
+- sans gestionnaire : chaque modèle est chargé à la première requête ;
+- avec ResidencyManager : modèle par défaut préchargé au démarrage, keep_alive
+  par modèle, éviction LRU décidée avant la requête (modèle par défaut en dernier).
+
+    cd backend && python -m benchmarks.bench_residency --requests 40 --load-delay 0.8
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.core.config import settings
+from app.services.chat_history_service import ChatHistoryService
+from app.services.ollama_service import OllamaService
+from app.services.residency_service import ResidencyManager
+from benchmarks.stub_ollama import StubConfig, StubOllama
+
+MODELS = [settings.OLLAMA_DEFAULT_MODEL, "mistral:7b", "llava:13b"]
+WEIGHTS = [0.6, 0.3, 0.1]
+
+
+async def _ttft(service: OllamaService, model: str, keep_alive=None) -> float:
+    start = time.perf_counter()
+    ttft = None
+    async for chunk in service.chat_stream(model, "Bonjour", keep_alive=keep_alive):
+        if chunk.token and ttft is None:
+            ttft = time.perf_counter() - start
+    return ttft
+
+
+async def _run(base_url: str, workload, managed: bool, vram_mb: int, db_path: str):
+    service = OllamaService(base_url=base_url)
+    manager, history = None, None
+    warm_up = 0.0
+    if managed:
+        history = ChatHistoryService(db_path)
+        manager = ResidencyManager(ollama=service, history=history, vram_mb=vram_mb)
+        start = time.perf_counter()
+        await manager.warm_up(timeout=5)  # Au démarrage, pendant que l'utilisateur ouvre l'interface
+        warm_up = time.perf_counter() - start
+
+    samples = []
+    for model in workload:
+        if manager:
+            keep_alive = await manager.acquire(model)
+            try:
+                samples.append(await _ttft(service, model, keep_alive))
+            finally:
+                manager.release(model)
+        else:
+            samples.append(await _ttft(service, model))
+
+    state = await manager.state() if manager else None
+    if history:
+        history.close()
+    await service.close()
+    return samples, warm_up, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--load-delay", type=float, default=0.8, help="chargement d'un modèle (s)")
+    parser.add_argument("--unload-delay", type=float, default=0.1, help="déchargement d'un modèle (s)")
+    parser.add_argument("--slots", type=float, default=2.5, help="VRAM exprimée en nombre de modèles")
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    workload = rng.choices(MODELS, weights=WEIGHTS, k=args.requests)
+    model_vram = 5 * 1024**3
+    vram = int(args.slots * model_vram)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for managed in (False, True):
+            config = StubConfig(
+                models=list(MODELS), response_tokens=8, load_delay=args.load_delay,
+                unload_delay=args.unload_delay, model_vram=model_vram, vram=vram
+            )
+            with StubOllama(config) as stub:
+                db_path = os.path.join(tmp, f"history_{managed}.db")
+                samples, warm_up, state = asyncio.run(
+                    _run(stub.base_url, workload, managed, vram // 1024**2, db_path)
+                )
+                rows.append((managed, samples, warm_up, state, dict(stub.server.counters)))
+
+    print(f"--- {args.requests} requêtes sur {len(MODELS)} modèles, VRAM pour {args.slots} modèles, "
+          f"chargement {args.load_delay * 1000:.0f} ms ---")
+    for managed, samples, warm_up, state, counters in rows:
+        label = "avec gestionnaire" if managed else "sans gestionnaire"
+        cold = sum(1 for s in samples if s >= args.load_delay)
+        print(f"{label:<18} 1re requête {samples[0] * 1000:7.1f} ms | TTFT médian {statistics.median(samples) * 1000:6.1f} ms"
+              f" | moyen {statistics.mean(samples) * 1000:6.1f} ms | requêtes à froid {cold:>3}"
+              f" | chargements {counters['loads']:>3}, déchargements {counters['unloads']:>3}")
+        if state:
+            print(f"{'':<18} préchargement {warm_up * 1000:.0f} ms (hors requêtes) | compteurs {state['stats']}")
+            print(f"{'':<18} résidents : {[m['name'] + (' (épinglé)' if m['pinned'] else '') for m in state['resident']]}")
+
+
+if __name__ == "__main__":
+    main()
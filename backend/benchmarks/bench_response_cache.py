@@ -0,0 +1,88 @@
+"""
+Benchmark : questions déterministes répétées (température 0).
+
+Même prompt envoyé plusieurs fois, avec génération lente sur le stub :
+- sans cache : une génération complète à chaque fois ;
+- avec ResponseCache : la première génère, les suivantes sont rejouées
+  depuis le disque (même flux SSE) ; après un re-téléchargement du modèle
+  (nouveau digest), la réponse est régénérée.
+
+    cd backend && python -m benchmarks.bench_response_cache --repeat 10 --token-delay 0.01
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from app.services.ollama_service import OllamaService, StreamChunk
+from app.services.response_cache_service import ResponseCache
+from benchmarks.stub_ollama import StubConfig, StubOllama
+
+MODEL = "stub-model:latest"
+PROMPT = "Question: Quels sont les avantages du mode WAL de SQLite ?"
+SYSTEM = "Tu es Horizon, une IA utile et précise. Réponds toujours en français."
+OPTIONS = {"temperature": 0}
+
+
+async def _ask(service: OllamaService, cache: ResponseCache):
+    """Même chemin que /api/v1/chat : clé, lecture, sinon génération puis écriture."""
+    start = time.perf_counter()
+    key = await cache.key(MODEL, PROMPT, SYSTEM, None, None, OPTIONS) if cache else None
+    lines = await cache.get(key) if key else None
+    body, hit = [], lines is not None
+    if hit:
+        chunks = [StreamChunk.from_line(line) for line in lines]
+    else:
+        chunks = [chunk async for chunk in service.chat_stream(MODEL, PROMPT, system=SYSTEM, options=OPTIONS)]
+        if key:
+            await cache.put(key, MODEL, [chunk.line for chunk in chunks])
+    for chunk in chunks:
+        body.append(chunk.raw)
+    return time.perf_counter() - start, b"".join(body), hit
+
+
+async def _run(base_url: str, repeat: int, db_path: str, cached: bool):
+    service = OllamaService(base_url=base_url)
+    cache = ResponseCache(db_path, ollama=service, enabled=True) if cached else None
+    rows = [await _ask(service, cache) for _ in range(repeat)]
+    repulled = None
+    if cache:
+        async for _ in service.pull_model(MODEL):
+            pass
+        service.invalidate()
+        cache.purge(MODEL)
+        await asyncio.sleep(0.05)
+        repulled = await _ask(service, cache)
+        info = cache.info()
+        cache.close()
+    await service.close()
+    return rows, repulled, info if cache else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    args = parser.parse_args()
+
+    config = StubConfig(response_tokens=args.tokens, token_delay=args.token_delay, pull_layers=[1024], pull_steps=1)
+    with StubOllama(config) as stub, tempfile.TemporaryDirectory() as tmp:
+        live, _, _ = asyncio.run(_run(stub.base_url, args.repeat, os.path.join(tmp, "none.db"), cached=False))
+        cached, repulled, info = asyncio.run(_run(stub.base_url, args.repeat, os.path.join(tmp, "cache.db"), cached=True))
+
+    print(f"--- {args.repeat} fois le même prompt, {args.tokens} tokens à {args.token_delay * 1000:.0f} ms ---")
+    print(f"{'sans cache':<24} médiane {statistics.median(t for t, _, _ in live) * 1000:8.1f} ms")
+    print(f"{'avec cache (1re)':<24} {cached[0][0] * 1000:8.1f} ms")
+    print(f"{'avec cache (suivantes)':<24} médiane {statistics.median(t for t, _, _ in cached[1:]) * 1000:8.1f} ms"
+          f" | hits {sum(hit for _, _, hit in cached)}/{len(cached)}")
+    # Rejeu comparé au flux live qui a été mis en cache (les durées du stub varient d'une génération à l'autre)
+    print(f"{'rejeu identique au live':<24} {'oui' if cached[1][1] == cached[0][1] else 'non'}")
+    print(f"{'après re-pull':<24} {repulled[0] * 1000:8.1f} ms ({'hit' if repulled[2] else 'miss, régénéré'})")
+    print(f"{'cache':<24} {info}")
+
+
+if __name__ == "__main__":
+    main()
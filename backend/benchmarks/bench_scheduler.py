@@ -0,0 +1,94 @@
+"""
+Benchmark : requêtes de chat concurrentes sur plusieurs modèles.
+
+Le stub simule des chargements de modèle coûteux et une VRAM pour un seul
+modèle : deux modèles demandés en alternance se délogent l'un l'autre.
+Même rafale de requêtes (ordre mélangé), deux configurations :
+- accès direct : toutes les requêtes partent en même temps vers Ollama ;
+- RequestScheduler : créneaux par modèle, regroupement des requêtes d'un même
+  modèle, file bornée (429 au-delà).
+
+    cd backend && python -m benchmarks.bench_scheduler --requests 24 --load-delay 0.5
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from app.services.ollama_service import OllamaService
+from app.services.residency_service import ResidencyManager
+from app.services.scheduler_service import RequestScheduler, SchedulerFullError
+from benchmarks.stub_ollama import StubConfig, StubOllama
+
+MODELS = ["alpha:7b", "beta:7b"]
+
+
+async def _request(service: OllamaService, model: str, scheduler=None, residency=None):
+    start = time.perf_counter()
+    if scheduler is None:
+        async for _ in service.chat_stream(model, "Bonjour"):
+            pass
+        return time.perf_counter() - start
+    try:
+        admission = scheduler.check_admission()
+    except SchedulerFullError:
+        return None
+    async with scheduler.slot(model, admission=admission):
+        await residency.acquire(model)
+        try:
+            async for _ in service.chat_stream(model, "Bonjour"):
+                pass
+        finally:
+            residency.release(model)
+    return time.perf_counter() - start
+
+
+async def _run(base_url: str, workload, scheduled: bool, max_queued: int, vram_mb: int):
+    service = OllamaService(base_url=base_url)
+    scheduler = residency = None
+    if scheduled:
+        residency = ResidencyManager(ollama=service, vram_mb=vram_mb)
+        scheduler = RequestScheduler(max_active=4, model_concurrency=4, max_queued=max_queued, residency=residency)
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(_request(service, m, scheduler, residency) for m in workload))
+    elapsed = time.perf_counter() - start
+    await service.close()
+    return latencies, elapsed, scheduler.metrics() if scheduler else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=24)
+    parser.add_argument("--load-delay", type=float, default=0.5, help="chargement d'un modèle (s)")
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--max-queued", type=int, default=64)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    workload = [rng.choice(MODELS) for _ in range(args.requests)]
+    print(f"--- {args.requests} requêtes simultanées, {len(MODELS)} modèles, VRAM pour un seul, "
+          f"chargement {args.load_delay * 1000:.0f} ms ---")
+    model_vram = 5 * 1024**3
+    vram = int(model_vram * 1.5)
+    for scheduled in (False, True):
+        config = StubConfig(
+            models=list(MODELS), response_tokens=16, token_delay=args.token_delay,
+            load_delay=args.load_delay, model_vram=model_vram, vram=vram
+        )
+        with StubOllama(config) as stub:
+            latencies, elapsed, metrics = asyncio.run(
+                _run(stub.base_url, workload, scheduled, args.max_queued, vram // 1024**2)
+            )
+            counters = dict(stub.server.counters)
+        served = [l for l in latencies if l is not None]
+        label = "ordonnanceur" if scheduled else "accès direct"
+        print(f"{label:<14} total {elapsed:6.2f} s | latence médiane {statistics.median(served):5.2f} s"
+              f" | max {max(served):5.2f} s | chargements {counters['loads']:>3}"
+              f" | refusées {len(latencies) - len(served)}")
+        if metrics:
+            print(f"{'':<14} attente {metrics['wait_seconds']} | changements de modèle {metrics['model_switches']}")
+
+
+if __name__ == "__main__":
+    main()
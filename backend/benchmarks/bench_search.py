@@ -0,0 +1,67 @@
+"""
+Benchmark : latence de la recherche plein texte (FTS5 + BM25) sur l'historique.
+
+Remplit une base temporaire avec N messages synthétiques puis mesure la latence
+de requêtes variées (mot fréquent, mot rare, plusieurs mots, préfixe). Le
+vocabulaire synthétique est volontairement minuscule : chaque mot courant apparaît
+dans la moitié des messages, ce qui représente le pire cas pour le classement.
+
+    cd backend && python -m benchmarks.bench_search --messages 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.services.chat_history_service import ChatHistoryService
+
+VOCABULARY = (
+    "python modèle docker réseau mémoire processeur thread processus fichier serveur "
+    "client requête réponse image vidéo script fonction classe variable boucle erreur "
+    "exception base données index recherche cache disque carte graphique pilote "
+    "installation configuration paramètre utilisateur interface fenêtre bouton"
+).split()
+RARE_WORDS = ["kubernetes", "quaternion", "zeppelin", "ornithorynque", "hyperviseur"]
+QUERIES = ["python", "mémoire cache", "ornithorynque", "serveur requête réponse", "config*", "kubernetes docker"]
+
+
+def populate(service: ChatHistoryService, messages: int, per_chat: int = 20):
+    rng = random.Random(42)
+    for i in range(messages):
+        words = [rng.choice(VOCABULARY) for _ in range(rng.randint(8, 60))]
+        if rng.random() < 0.01:
+            words.insert(rng.randrange(len(words)), rng.choice(RARE_WORDS))
+        role = "user" if i % 2 == 0 else "assistant"
+        service.append_message(f"chat_{i // per_chat}", "stub", role, " ".join(words))
+    service.flush(timeout=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = ChatHistoryService(os.path.join(tmp, "history.db"))
+        start = time.perf_counter()
+        populate(service, args.messages)
+        print(f"--- {args.messages} messages indexés en {time.perf_counter() - start:.1f} s "
+              f"(FTS5 : {'oui' if service.fts_enabled else 'non'}) ---")
+
+        for query in QUERIES:
+            samples = []
+            for page in range(args.repeat):
+                start = time.perf_counter()
+                results, _ = service.search(query, limit=20, offset=(page % 3) * 20)
+                samples.append(time.perf_counter() - start)
+            samples.sort()
+            print(f"{query!r:<28} p50 {statistics.median(samples) * 1e3:7.2f} ms | "
+                  f"p95 {samples[int(len(samples) * 0.95) - 1] * 1e3:7.2f} ms | {len(results)} résultat(s)")
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark : démarrage à froid du backend.
+
+Lance le serveur (uvicorn, processus neuf) plusieurs fois contre le stub
+Ollama et mesure le délai jusqu'à la première réponse de /api/v1/system/health
+(sondée toutes les 10 ms : pas de backoff qui arrondirait la mesure). Affiche ensuite le rapport
+de démarrage du dernier lancement (/api/v1/system/startup) : étapes, jalons
+et imports les plus lents.
+
+    cd backend && python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks.stub_ollama import StubOllama
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(url: str):
+    try:
+        with urllib.request.urlopen(url, timeout=1.0) as response:
+            return json.load(response) if response.status == 200 else None
+    except Exception:
+        return None
+
+
+def _start_once(env: dict, timeout: float):
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        healthy = None
+        while time.perf_counter() - started < timeout and process.poll() is None:
+            if _get(f"{base}/api/v1/system/health") is not None:
+                healthy = time.perf_counter() - started
+                break
+            time.sleep(0.01)
+        report = _get(f"{base}/api/v1/system/startup?limit=10") if healthy else None
+        return healthy, report
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    with StubOllama() as stub:
+        env = {**os.environ, "OLLAMA_BASE_URL": stub.base_url}
+        results, report = [], None
+        for i in range(args.runs):
+            healthy, report = _start_once(env, args.timeout)
+            results.append(healthy)
+            print(f"  lancement {i + 1}/{args.runs} : "
+                  f"{'échec' if healthy is None else f'{healthy * 1000:.0f} ms'}", end="\r", flush=True)
+
+    ok = [r for r in results if r is not None]
+    print(f"\n--- {len(ok)}/{args.runs} démarrages ---")
+    if ok:
+        print(f"première réponse de santé : médiane {statistics.median(ok) * 1000:.0f} ms, "
+              f"min {min(ok) * 1000:.0f} ms, max {max(ok) * 1000:.0f} ms (depuis le lancement du processus)")
+    if not report:
+        return
+    print(f"interpréteur avant main.py : {report['interpreter_ms']} ms")
+    print(f"étapes : {report['stages_ms']}")
+    print(f"jalons (depuis main.py) : {report['marks_ms']}")
+    print(f"imports ({report['modules_timed']} modules mesurés) :")
+    for module in report["imports"]:
+        print(f"  {module['module']:<40} total {module['total_ms']:>7.1f} ms   propre {module['self_ms']:>7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
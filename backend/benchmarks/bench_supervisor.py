@@ -0,0 +1,190 @@
+"""
+Benchmark : superviseur Ollama contre un exécutable `ollama` factice.
+
+Scénarios (port libre, superviseur neuf à chaque fois) :
+- serveur déjà actif : réutilisé, aucun processus lancé ;
+- lancement à froid : délai jusqu'à l'état ready ;
+- plantage du processus : détection et relance ;
+- serveur bloqué (processus vivant, plus de réponse) : relance après N sondes en échec ;
+- plantages en boucle : délais de backoff entre les relances ;
+- attente d'un chat pendant une relance (wait_ready) ;
+- sortie du processus capturée dans les logs.
+
+    cd backend && python -m benchmarks.bench_supervisor
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import sys
+import tempfile
+import time
+
+from benchmarks.stub_ollama import StubOllama
+
+FAKE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_ollama.py")
+_FAKE_ENV = ("FAKE_OLLAMA_START_DELAY", "FAKE_OLLAMA_CRASH_AFTER", "FAKE_OLLAMA_HANG_AFTER", "FAKE_OLLAMA_ONCE")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _Lines(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.levels = []
+
+    def emit(self, record):
+        self.levels.append(record.levelname)
+
+
+def _supervisor(args, **env):
+    """Superviseur neuf sur un port libre ; l'exécutable factice hérite de `env`."""
+    from app.services.ollama_service import OllamaService
+    from app.services.supervisor_service import OllamaSupervisor
+
+    for name in _FAKE_ENV:
+        os.environ.pop(name, None)
+    os.environ.update({name: str(value) for name, value in env.items()})
+    base_url = f"http://127.0.0.1:{_free_port()}"
+    supervisor = OllamaSupervisor(
+        ollama=OllamaService(base_url), binary=f'"{sys.executable}" "{FAKE}"', base_url=base_url,
+        autostart=True, interval=args.interval, failures=args.failures, start_timeout=10,
+        backoff=args.backoff, backoff_max=args.backoff_max,
+    )
+    timeline = []
+    supervisor.add_listener(lambda info: timeline.append((time.perf_counter(), info["state"])))
+    return supervisor, timeline
+
+
+def _first(timeline, state, after=0.0):
+    return next((t for t, s in timeline if s == state and t >= after), None)
+
+
+async def _until(predicate, timeout: float = 20.0):
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("scénario bloqué")
+        await asyncio.sleep(0.005)
+
+
+async def _adopt(args):
+    from app.services.ollama_service import OllamaService
+    from app.services.supervisor_service import OllamaSupervisor
+
+    with StubOllama() as stub:
+        supervisor = OllamaSupervisor(ollama=OllamaService(stub.base_url), binary="ollama-absent",
+                                      base_url=stub.base_url, interval=args.interval)
+        started = time.perf_counter()
+        supervisor.start()
+        await supervisor.wait_ready(10)
+        elapsed = time.perf_counter() - started
+        info = supervisor.info()
+        await supervisor.stop()
+    print(f"{'serveur déjà actif':<26} ready en {elapsed * 1000:6.1f} ms, owned={info['owned']}, "
+          f"lancements {info['stats']['spawns']}, adoptés {info['stats']['adopted']}")
+
+
+async def _cold(args):
+    supervisor, timeline = _supervisor(args)
+    started = time.perf_counter()
+    supervisor.start()
+    ready = await supervisor.wait_ready(10)
+    elapsed = time.perf_counter() - started
+    info = supervisor.info()
+    await supervisor.stop()
+    print(f"{'lancement à froid':<26} {'ready' if ready else 'ÉCHEC'} en {elapsed * 1000:6.1f} ms "
+          f"(pid {info['pid']}, owned={info['owned']})")
+
+
+async def _crash(args, flag):
+    supervisor, timeline = _supervisor(args, FAKE_OLLAMA_CRASH_AFTER=0.5, FAKE_OLLAMA_ONCE=flag)
+    supervisor.start()
+    await supervisor.wait_ready(10)
+    first_pid = supervisor.info()["pid"]
+    await _until(lambda: supervisor.restarting)
+    down = time.perf_counter()
+    waited = await supervisor.wait_ready(10)  # Comme un chat arrivé pendant la relance
+    back = time.perf_counter()
+    info = supervisor.info()
+    await supervisor.stop()
+    print(f"{'plantage du processus':<26} relance détectée, ready {(back - down) * 1000:6.1f} ms après "
+          f"(pid {first_pid} -> {info['pid']}, code {info['last_exit_code']}, plantages {info['stats']['crashes']})")
+    print(f"{'chat pendant la relance':<26} wait_ready -> {waited} après {(back - down) * 1000:6.1f} ms")
+
+
+async def _hang(args, flag):
+    supervisor, timeline = _supervisor(args, FAKE_OLLAMA_HANG_AFTER=0.5, FAKE_OLLAMA_ONCE=flag)
+    supervisor.start()
+    await supervisor.wait_ready(10)
+    ready = time.perf_counter()
+    await _until(lambda: supervisor.stats["health_restarts"] > 0 and supervisor.state == "ready", 30)
+    degraded = _first(timeline, "degraded", ready)
+    restarting = _first(timeline, "restarting", ready)
+    back = _first(timeline, "ready", ready)
+    info = supervisor.info()
+    await supervisor.stop()
+    print(f"{'serveur bloqué':<26} degraded à +{(degraded - ready) * 1000:.0f} ms, relance à "
+          f"+{(restarting - ready) * 1000:.0f} ms, ready à +{(back - ready) * 1000:.0f} ms "
+          f"(blocage à +500 ms, {args.failures} sondes, relances santé {info['stats']['health_restarts']})")
+
+
+async def _crash_loop(args):
+    supervisor, timeline = _supervisor(args, FAKE_OLLAMA_CRASH_AFTER=0.2)
+    spawned = []
+    spawn = supervisor._spawn
+
+    async def timed_spawn():
+        spawned.append(time.perf_counter())
+        await spawn()
+
+    supervisor._spawn = timed_spawn
+    supervisor.start()
+    await _until(lambda: len(spawned) >= args.loops, 60)
+    info = supervisor.info()
+    await supervisor.stop()
+    gaps = [b - a for a, b in zip(spawned, spawned[1:])]
+    print(f"{'plantages en boucle':<26} écarts entre lancements (s) : "
+          f"{', '.join(f'{g:.2f}' for g in gaps)} (backoff {args.backoff} s x2, plafond {args.backoff_max} s ; "
+          f"état {info['state']}, relances {info['stats']['restarts']})")
+
+
+async def _run(args):
+    from app.core.logger import logger
+
+    logger.setLevel(logging.WARNING)  # Journal du superviseur : avertissements seuls
+    output = logger.getChild("ollama")
+    lines = _Lines()
+    output.setLevel(logging.DEBUG)
+    output.addHandler(lines)
+    output.propagate = False  # Sortie du faux serveur comptée, pas affichée
+    with tempfile.TemporaryDirectory() as tmp:
+        await _adopt(args)
+        await _cold(args)
+        await _crash(args, os.path.join(tmp, "crash"))
+        await _hang(args, os.path.join(tmp, "hang"))
+        await _crash_loop(args)
+    levels = {level: lines.levels.count(level) for level in sorted(set(lines.levels))}
+    print(f"{'sortie capturée':<26} {len(lines.levels)} lignes {levels}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interval", type=float, default=0.2, help="Intervalle des sondes (s)")
+    parser.add_argument("--failures", type=int, default=3, help="Sondes en échec avant relance")
+    parser.add_argument("--backoff", type=float, default=0.25)
+    parser.add_argument("--backoff-max", type=float, default=2.0)
+    parser.add_argument("--loops", type=int, default=6, help="Lancements observés en boucle de plantages")
+    args = parser.parse_args()
+
+    os.environ.setdefault("OLLAMA_HEALTH_TIMEOUT", "0.3")  # Serveur bloqué : sondes vite en échec
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
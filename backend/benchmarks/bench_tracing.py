@@ -0,0 +1,136 @@
+"""
+Benchmark : coût du traçage des requêtes et du profileur par échantillonnage.
+
+- coût d'un span hors requête tracée (traçage désactivé) et dans une trace ;
+- latence d'une requête HTTP et d'un chat complet, traçage désactivé / activé ;
+- cascade d'un chat (réglages, recherche web, historique, contexte, cache,
+  ordonnanceur, chargement et évaluation du prompt côté Ollama, streaming) ;
+- capture du profileur sur N chats : fonctions les plus coûteuses.
+
+    cd backend && python -m benchmarks.bench_tracing --chats 20
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.stub_ollama import StubConfig, StubOllama
+
+
+def _per_call(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n
+
+
+def _median_ms(fn, n: int) -> float:
+    durations = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1000
+
+
+def _print_waterfall(trace: dict):
+    print(f"{trace['method']} {trace['route']} -> {trace['status']} : en-têtes {trace['headers_ms']} ms, "
+          f"total {trace['duration_ms']} ms")
+    scale = 50 / max(trace["duration_ms"], 1e-3)
+    for s in trace["spans"]:
+        bar = " " * int(s["start_ms"] * scale) + "#" * max(1, int(s["duration_ms"] * scale))
+        attrs = " ".join(f"{k}={v}" for k, v in s.get("attrs", {}).items())
+        print(f"  {'  ' * s['depth'] + s['name']:<24} {s['start_ms']:>8.1f} {s['duration_ms']:>8.1f} ms  "
+              f"|{bar:<51}| {attrs}")
+
+
+def _run(client, model: str, args):
+    n = 0
+
+    def chat():
+        nonlocal n
+        n += 1
+        client.post("/api/v1/chat", data={"prompt": f"Question {n}", "model": model,
+                                          "chat_id": f"bench_trace_{n}"}).read()
+
+    print("\n--- latence médiane (traçage désactivé / activé) ---")
+    results = {}
+    for enabled in (False, True, False, True):  # Deux passes alternées : effet de chauffe réparti
+        client.post("/api/v1/debug/tracing", data={"enabled": str(enabled).lower()})
+        results.setdefault(enabled, []).append(
+            (_median_ms(lambda: client.get("/api/v1/scheduler"), 300), _median_ms(chat, args.chats))
+        )
+    for enabled, label in ((False, "désactivé"), (True, "activé")):
+        http, chats = (min(v) for v in zip(*results[enabled]))
+        print(f"{label:<12} GET /api/v1/scheduler {http:7.3f} ms   chat {chats:7.1f} ms")
+
+    traces = client.get("/api/v1/debug/traces", params={"route": "/api/v1/chat", "limit": 1}).json()
+    print(f"\n--- cascade d'un chat ({traces['tracing']['buffered']} traces en mémoire) ---")
+    _print_waterfall(traces["traces"][0])
+
+    client.post("/api/v1/debug/tracing", data={"enabled": "false"})
+    print(f"\n--- profileur : {args.chats} chats ---")
+    client.post("/api/v1/debug/profile", data={"requests": args.chats, "interval_ms": 2})
+    for _ in range(args.chats):
+        chat()
+    report = client.get("/api/v1/debug/profile").json()
+    collapsed = client.get("/api/v1/debug/profile", params={"format": "collapsed"}).text
+    print(f"{report['status']} : {report['captured']} requêtes, {report['samples']} relevés, "
+          f"coût {report['sampling_overhead_ms']} ms, {len(collapsed.splitlines())} piles repliées")
+    # Le stub tourne dans le même processus : ses threads sont écartés de l'affichage
+    threads = {t: c for t, c in report["threads"].items() if "process_request_thread" not in t}
+    print(f"threads : {threads}")
+    own = Counter()
+    for line in collapsed.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        if stack.split(";", 1)[0] in threads:
+            own[stack.rsplit(";", 1)[-1]] += int(count)
+    total = sum(own.values()) or 1
+    for name, count in own.most_common(12):
+        print(f"  {100 * count / total:5.1f} % propre  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--calls", type=int, default=500_000)
+    args = parser.parse_args()
+
+    # Dossier de données jetable : backend/data (historique, logs, réglages) n'est pas touché ;
+    # recherche web activée dans ses réglages pour qu'elle apparaisse dans la cascade
+    data_dir = tempfile.mkdtemp(prefix="horizon_bench_")
+    os.environ["DATA_PATH"] = data_dir
+    with open(os.path.join(data_dir, "user_settings.json"), "w", encoding="utf-8") as f:
+        json.dump({"internetAccess": True}, f)
+
+    config = StubConfig(token_delay=0.001, prompt_eval_delay=0.0002, load_delay=0.05)
+    with StubOllama(config) as stub:
+        os.environ["OLLAMA_BASE_URL"] = stub.base_url
+        os.environ["WEB_SEARCH_BACKEND"] = "http"  # Recherche web du chat servie par le stub
+        os.environ["WEB_SEARCH_TARGET"] = f"{stub.base_url}/search"
+        from fastapi.testclient import TestClient
+
+        from app.core import tracing
+        from app.main import app
+
+        def enter_exit():
+            with tracing.span("bench"):
+                pass
+
+        print(f"--- coût d'un span ({args.calls} appels) ---")
+        off = _per_call(enter_exit, args.calls)
+        token = tracing._current.set(tracing.Trace("GET", "/bench"))
+        on = _per_call(enter_exit, args.calls // 10)
+        tracing._current.reset(token)
+        print(f"{'traçage désactivé':<22} {off * 1e9:8.0f} ns")
+        print(f"{'dans une trace':<22} {on * 1e9:8.0f} ns")
+
+        with TestClient(app) as client:
+            _run(client, config.models[0], args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark : étape de recherche web du chat, sans réseau.
+
+Le backend est simulé (fichier fixture avec latence, ou service HTTP du stub).
+On mesure :
+- le retard maximal de la boucle asyncio pendant une recherche : appel
+  bloquant dans le handler (avant) contre exécution hors boucle (après) ;
+- la latence à froid et depuis le cache ;
+- le comportement quand le backend dépasse le budget de temps.
+
+    cd backend && python -m benchmarks.bench_web_search --delay 0.8 --timeout 0.5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from app.services.search_service import FixtureBackend, HttpBackend, SearchService
+from benchmarks.stub_ollama import StubConfig, StubOllama
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "web_search.json")
+
+
+async def _max_loop_lag(work) -> tuple:
+    """Exécute `work` en mesurant le plus grand retard d'un tick de 5 ms."""
+    lag = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal lag
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lag = max(lag, time.perf_counter() - start - 0.005)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.02)
+    start = time.perf_counter()
+    result = await work()
+    elapsed = time.perf_counter() - start
+    running = False
+    await task
+    return elapsed, lag, result
+
+
+async def _bench(backend, delay: float, timeout: float, repeat: int):
+    print(f"--- backend {backend.name}, latence simulée {delay * 1000:.0f} ms ---")
+
+    async def blocking():
+        return backend.search("ollama api", 5)
+
+    elapsed, lag, _ = await _max_loop_lag(blocking)
+    print(f"{'bloquant (avant)':<28} durée {elapsed * 1000:7.1f} ms   boucle gelée {lag * 1000:7.1f} ms")
+
+    service = SearchService(backend=backend, timeout=max(timeout, delay * 4))
+    elapsed, lag, _ = await _max_loop_lag(lambda: service.get_context("ollama api"))
+    print(f"{'hors boucle, à froid':<28} durée {elapsed * 1000:7.1f} ms   boucle gelée {lag * 1000:7.1f} ms")
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await service.get_context("  Ollama   API ")  # même clé normalisée
+        samples.append(time.perf_counter() - start)
+    print(f"{'cache (médiane)':<28} durée {statistics.median(samples) * 1e6:7.1f} µs")
+
+    concurrent = SearchService(backend=backend, timeout=max(timeout, delay * 4))
+    start = time.perf_counter()
+    await asyncio.gather(*(concurrent.search("fastapi sse") for _ in range(20)))
+    print(f"{'20 requêtes identiques':<28} durée {(time.perf_counter() - start) * 1000:7.1f} ms   "
+          f"(une seule en vol : {concurrent.stats})")
+
+    strict = SearchService(backend=backend, timeout=timeout)
+    elapsed, lag, context = await _max_loop_lag(lambda: strict.get_context("sqlite fts5"))
+    print(f"{f'budget {timeout * 1000:.0f} ms':<28} durée {elapsed * 1000:7.1f} ms   "
+          f"contexte web : {'oui' if context else 'non (réponse sans web)'}")
+    await asyncio.sleep(delay)
+    print(f"{'résultat tardif en cache':<28} {'oui' if strict._cache else 'non'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--delay", type=float, default=0.8, help="latence simulée du backend (s)")
+    parser.add_argument("--timeout", type=float, default=0.5, help="budget de la recherche (s)")
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+
+    asyncio.run(_bench(FixtureBackend(FIXTURE, delay=args.delay), args.delay, args.timeout, args.repeat))
+    print()
+    with StubOllama(StubConfig(search_delay=args.delay)) as stub:
+        asyncio.run(_bench(HttpBackend(f"{stub.base_url}/search"), args.delay, args.timeout, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
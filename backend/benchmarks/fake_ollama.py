@@ -0,0 +1,68 @@
+"""
+Exécutable `ollama` factice pour le superviseur : `python fake_ollama.py serve`.
+
+Sert le stub Ollama sur l'adresse de OLLAMA_HOST (comme `ollama serve`) et
+écrit des lignes façon slog sur stdout / stderr. Pannes simulées (variables
+d'environnement, secondes) :
+
+    FAKE_OLLAMA_START_DELAY   délai avant d'ouvrir le port
+    FAKE_OLLAMA_CRASH_AFTER   le processus s'arrête (code 2) après ce délai
+    FAKE_OLLAMA_HANG_AFTER    le serveur ne répond plus (connexions acceptées, jamais servies)
+                              mais le processus reste en vie
+    FAKE_OLLAMA_ONCE=<fichier>  pannes au premier lancement seulement (fichier témoin)
+
+    OLLAMA_BINARY="python benchmarks/fake_ollama.py" python -m uvicorn app.main:app
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_ollama import StubOllama, _Handler  # noqa: E402
+
+
+def _log(level: str, msg: str, stream=sys.stderr):
+    print(f'time={time.strftime("%Y-%m-%dT%H:%M:%S")} level={level} source=fake_ollama.py msg="{msg}"',
+          file=stream, flush=True)
+
+
+def _delay(name: str) -> float:
+    return float(os.environ.get(name) or 0)
+
+
+def main():
+    if sys.argv[1:] != ["serve"]:
+        print("usage: fake_ollama.py serve", file=sys.stderr)
+        sys.exit(1)
+    host, _, port = os.environ.get("OLLAMA_HOST", "127.0.0.1:11434").rpartition(":")
+    crash, hang = _delay("FAKE_OLLAMA_CRASH_AFTER"), _delay("FAKE_OLLAMA_HANG_AFTER")
+    flag = os.environ.get("FAKE_OLLAMA_ONCE")
+    if flag:
+        if os.path.exists(flag):
+            crash = hang = 0.0  # Lancement suivant : fonctionnement normal
+        else:
+            open(flag, "w").close()
+
+    _log("INFO", f"server config env=\"OLLAMA_HOST:{host}:{port} OLLAMA_MODELS:{os.environ.get('OLLAMA_MODELS', '')}\"")
+    time.sleep(_delay("FAKE_OLLAMA_START_DELAY"))
+    StubOllama(host=host or "127.0.0.1", port=int(port)).start()
+    _log("INFO", f"Listening on {host}:{port} (version 0.0.0-fake)")
+    print(f"[GIN] {time.strftime('%Y/%m/%d - %H:%M:%S')} | 200 | GET \"/\"", flush=True)
+
+    started = time.monotonic()
+    while True:
+        elapsed = time.monotonic() - started
+        if crash and elapsed >= crash:
+            _log("ERROR", "simulated crash")
+            os._exit(2)
+        if hang and elapsed >= hang:
+            _log("WARN", "simulated hang")
+            # Connexions keep-alive déjà ouvertes comprises : plus aucune réponse
+            _Handler.handle_one_request = lambda handler: time.sleep(3600)
+            hang = 0.0
+        time.sleep(0.01)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+Serveur Ollama factice pour les benchmarks (aucun modèle, aucun GPU).
+
+Implémente le sous-ensemble de l'API utilisé par le backend, avec des temps
+de réponse synthétiques configurables, ainsi qu'un service de recherche web
+factice (/search) pour le backend "http" de search_service. Utilisable en thread depuis un script :
+
+    with StubOllama() as stub:
+        service = OllamaService(base_url=stub.base_url)
+"""
+import json
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from urllib.parse import parse_qs, urlsplit
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+_DURATION_RE = re.compile(r"(-?\d+(?:\.\d+)?)(ms|s|m|h)?")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}
+
+
+@dataclass
+class StubConfig:
+    models: List[str] = field(default_factory=lambda: ["stub-model:latest"])
+    response_tokens: int = 16      # Nombre de tokens générés par /api/generate
+    token_delay: float = 0.0       # Délai entre deux tokens (secondes)
+    search_delay: float = 0.0      # Latence de /search (backend de recherche web "http")
+    prompt_eval_delay: float = 0.0 # Coût d'évaluation d'un token de prompt (secondes)
+    num_ctx: int = 4096            # Renvoyé par /api/show (paramètre du Modelfile)
+    show_delay: float = 0.0        # Latence de /api/show (lecture du GGUF par Ollama)
+    pull_layers: List[int] = field(default_factory=lambda: [4 * 1024**2, 1024])  # Tailles des couches (octets)
+    pull_steps: int = 4            # Lignes de progression par couche
+    pull_delay: float = 0.0        # Délai entre deux lignes de progression (secondes)
+    load_delay: float = 0.0        # Chargement d'un modèle absent de la mémoire (secondes)
+    unload_delay: float = 0.0      # Déchargement d'un modèle (secondes)
+    model_vram: int = 5 * 1024**3  # Mémoire occupée par un modèle chargé (octets)
+    vram: int = 0                  # Mémoire totale (0 = illimitée) ; pleine : éviction LRU comme Ollama
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, comme le vrai serveur
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def config(self) -> StubConfig:
+        return self.server.config
+
+    # --- Helpers HTTP ---
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        return json.loads(body) if body else {}
+
+    def _send_json(self, data, status: int = 200):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _send_line(self, data: dict):
+        line = json.dumps(data).encode("utf-8") + b"\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    # --- Routes ---
+
+    def do_GET(self):
+        self.server.requests[urlsplit(self.path).path] += 1
+        if self.path == "/api/tags":
+            self._send_json({"models": [
+                {"name": name, "model": name, "size": 4 * 1024**3,
+                 "digest": f"sha256:{zlib.crc32(f'{name}/{self.server.revisions[name]}'.encode()):064x}"}
+                for name in self.config.models
+            ]})
+        elif self.path == "/api/ps":
+            self._ps()
+        elif self.path == "/api/version":
+            self._send_json({"version": "0.0.0-stub"})
+        elif self.path.startswith("/search"):
+            self._search()
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        self.server.requests[self.path] += 1
+        payload = self._read_json()
+        if self.path == "/api/generate":
+            self._generate(payload)
+        elif self.path == "/api/show":
+            time.sleep(self.config.show_delay)
+            self._send_json({
+                "parameters": f"num_ctx                        {self.config.num_ctx}",
+                "model_info": {
+                    "general.architecture": "stub", "general.parameter_count": 7_241_732_096,
+                    "stub.context_length": 32768, "stub.block_count": 32, "stub.embedding_length": 4096,
+                    "stub.attention.head_count": 32, "stub.attention.head_count_kv": 8,
+                },
+                "details": {"family": "stub", "parameter_size": "7B", "quantization_level": "Q4_K_M"}
+            })
+        elif self.path == "/api/pull":
+            self._pull(payload)
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_DELETE(self):
+        payload = self._read_json()
+        name = payload.get("name") or payload.get("model")
+        if self.path == "/api/delete" and name in self.config.models:
+            self.config.models.remove(name)
+            self._send_json({})
+        else:
+            self._send_json({"error": "model not found"}, status=404)
+
+    @staticmethod
+    def _tokenize(text: str) -> List[int]:
+        return [zlib.crc32(word.encode("utf-8")) % 32000 for word in text.split()]
+
+    @staticmethod
+    def _keep_alive(value) -> float:
+        """keep_alive d'Ollama en secondes (défaut 5 min, négatif = indéfiniment)."""
+        if value is None:
+            return 300.0
+        if isinstance(value, (int, float)):
+            seconds = float(value)
+        else:
+            match = _DURATION_RE.fullmatch(str(value).strip())
+            seconds = float(match.group(1)) * _DURATION_UNITS[match.group(2)] if match else 300.0
+        return float("inf") if seconds < 0 else seconds
+
+    def _load(self, model: str, keep_alive) -> str:
+        """
+        Met le modèle en mémoire (load_delay s'il est absent) ou le décharge
+        (keep_alive=0). Chargements sérialisés, comme l'ordonnanceur d'Ollama.
+        """
+        server, ttl = self.server, self._keep_alive(keep_alive)
+        with server.residency_lock:
+            now = time.monotonic()
+            for name, (expires, _) in list(server.loaded.items()):
+                if expires <= now:
+                    del server.loaded[name]
+            if ttl == 0:
+                if server.loaded.pop(model, None) is not None:
+                    server.counters["unloads"] += 1
+                    time.sleep(self.config.unload_delay)
+                return "unload"
+            if model not in server.loaded:
+                while self.config.vram and server.loaded and \
+                        (len(server.loaded) + 1) * self.config.model_vram > self.config.vram:
+                    victim = min(server.loaded, key=lambda name: server.loaded[name][1])
+                    del server.loaded[victim]
+                    server.counters["unloads"] += 1
+                    time.sleep(self.config.unload_delay)
+                server.counters["loads"] += 1
+                time.sleep(self.config.load_delay)
+                now = time.monotonic()
+            server.loaded[model] = (now + ttl, now)
+            return "load"
+
+    def _ps(self):
+        now = time.monotonic()
+        with self.server.residency_lock:
+            loaded = dict(self.server.loaded)
+        models = []
+        for name, (expires, _) in loaded.items():
+            if expires <= now:
+                continue
+            remaining = min(expires - now, 10 * 365 * 86400)
+            models.append({
+                "name": name, "model": name, "size": self.config.model_vram, "size_vram": self.config.model_vram,
+                "expires_at": (datetime.now(timezone.utc) + timedelta(seconds=remaining)).isoformat()
+            })
+        self._send_json({"models": models})
+
+    def _generate(self, payload: dict):
+        model = payload.get("model")
+        started = time.monotonic()
+        reason = self._load(model, payload.get("keep_alive"))
+        load_duration = time.monotonic() - started
+        if not payload.get("prompt"):
+            # Prompt vide : chargement / déchargement seul, comme Ollama
+            self._send_json({"model": model, "response": "", "done": True, "done_reason": reason})
+            return
+        # Comme Ollama : avec un `context`, seul le nouveau prompt est évalué ;
+        # sans, le prompt système est évalué en plus.
+        context = payload.get("context") or []
+        prompt_tokens = self._tokenize(payload.get("prompt", ""))
+        if not context:
+            prompt_tokens = self._tokenize(payload.get("system", "")) + prompt_tokens
+        prompt_eval_duration = len(prompt_tokens) * self.config.prompt_eval_delay
+        num_predict = (payload.get("options") or {}).get("num_predict")
+        count = num_predict if isinstance(num_predict, int) and num_predict >= 0 else self.config.response_tokens
+        if payload.get("stream") is False:
+            time.sleep(prompt_eval_duration)
+            try:
+                self._send_json({
+                    "model": model, "response": " ".join(f"tok{i}" for i in range(count)),
+                    "done": True, "prompt_eval_count": len(prompt_tokens), "eval_count": count
+                })
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+            return
+        self._start_stream()
+        try:
+            if prompt_eval_duration:
+                time.sleep(prompt_eval_duration)
+            response_tokens = []
+            eval_started = time.monotonic()
+            for i in range(count):
+                if self.config.token_delay:
+                    time.sleep(self.config.token_delay)
+                response_tokens.append(i)
+                self._send_line({"model": model, "response": f"tok{i} ", "done": False})
+            self._send_line({
+                "model": model, "response": "", "done": True,
+                "context": context + prompt_tokens + response_tokens,
+                "prompt_eval_count": len(prompt_tokens),
+                "prompt_eval_duration": int(prompt_eval_duration * 1e9),
+                "eval_count": count,
+                "eval_duration": int((time.monotonic() - eval_started) * 1e9),
+                "load_duration": int(load_duration * 1e9),
+                "total_duration": int((time.monotonic() - started) * 1e9)
+            })
+            self._end_stream()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # Client déconnecté en cours de génération
+
+    def _search(self):
+        params = parse_qs(urlsplit(self.path).query)
+        query = params.get("q", [""])[0]
+        count = int(params.get("max_results", ["5"])[0])
+        if self.config.search_delay:
+            time.sleep(self.config.search_delay)
+        self._send_json({"results": [
+            {"title": f"{query} - résultat {i}", "href": f"https://example.com/{i}", "body": f"Extrait {i} pour {query}."}
+            for i in range(count)
+        ]})
+
+    def _pull(self, payload: dict):
+        name = payload.get("name") or payload.get("model")
+        self._start_stream()
+        try:
+            self._send_line({"status": "pulling manifest"})
+            for index, size in enumerate(self.config.pull_layers):
+                digest = f"sha256:{zlib.crc32(f'{name}/{index}'.encode()):064x}"
+                for step in range(1, self.config.pull_steps + 1):
+                    if self.config.pull_delay:
+                        time.sleep(self.config.pull_delay)
+                    self._send_line({
+                        "status": f"pulling {digest[7:19]}", "digest": digest,
+                        "total": size, "completed": size * step // self.config.pull_steps
+                    })
+            self._send_line({"status": "verifying sha256 digest"})
+            self._send_line({"status": "writing manifest"})
+            if name not in self.config.models:
+                self.config.models.append(name)
+            self.server.revisions[name] += 1  # Nouveau digest, comme une nouvelle version publiée
+            self._send_line({"status": "success"})
+            self._end_stream()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # Téléchargement annulé par le client
+
+
+class StubOllama:
+    """Lance le serveur factice dans un thread (port libre choisi par l'OS)."""
+
+    def __init__(self, config: StubConfig = None, host: str = "127.0.0.1", port: int = 0):
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.config = config or StubConfig()
+        self.server.loaded: Dict[str, tuple] = {}  # nom -> (expiration, dernière utilisation)
+        self.server.residency_lock = threading.Lock()
+        self.server.counters = {"loads": 0, "unloads": 0}
+        self.server.requests = Counter()  # Requêtes reçues par chemin
+        self.server.revisions = Counter()  # Version de chaque modèle (digest de /api/tags)
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serveur Ollama factice")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = StubOllama(StubConfig(token_delay=args.token_delay), port=args.port)
+    print(f"Stub Ollama sur {stub.base_url}")
+    stub.server.serve_forever()
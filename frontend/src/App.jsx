@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import AppLayout from './Layouts/AppLayout';
+import { subscribe } from './services/eventChannel';
 
 function App() {
   const [language, setLanguage] = useState('en');
@@ -41,38 +42,18 @@ function App() {
     startBackend();
   }, []);
 
-  // --- HEALTH CHECK & MONITORING ---
+  // --- HEALTH CHECK & MONITORING (poussés par le backend) ---
   useEffect(() => {
-    const fetchHealth = async () => {
-      try {
-        const res = await fetch("http://localhost:11451/api/v1/system/health");
-        const data = await res.json();
-        setHealthStatus(data.status);
-      } catch {
-        setHealthStatus('unreachable');
-      }
-    };
-
-    const fetchStats = async () => {
-      try {
-        const res = await fetch("http://localhost:11451/api/v1/monitoring");
-        if (res.ok) {
-          const data = await res.json();
-          setSystemStats(data);
-        }
-      } catch (e) {
-        console.error("Erreur monitoring:", e);
-      }
-    };
-
-    fetchHealth();
-    fetchStats();
-    const healthInterval = setInterval(fetchHealth, 5000);
-    const statsInterval = setInterval(fetchStats, 2000);
+    const unsubscribeHealth = subscribe("health", (data) => setHealthStatus(data.status));
+    const unsubscribeStats = subscribe("telemetry", (data) => setSystemStats(data));
+    const unsubscribeConnection = subscribe("connection", ({ connected }) => {
+      if (!connected) setHealthStatus('unreachable');
+    });
 
     return () => {
-      clearInterval(healthInterval);
-      clearInterval(statsInterval);
+      unsubscribeHealth();
+      unsubscribeStats();
+      unsubscribeConnection();
     };
   }, []);
 
@@ -111,6 +111,18 @@ const AIChatPanel = ({ selectedModel, chatId, setSelectedChatId, language }) =>
         body: formData,
       });
 
+      if (!response.ok) {
+        // 429 : serveur saturé, le délai conseillé est dans Retry-After
+        const { detail } = await response.json().catch(() => ({}));
+        const retry = response.headers.get('Retry-After');
+        setMessages(prev => {
+          const updated = [...prev];
+          updated[updated.length - 1] = { role: 'assistant', content: `⚠️ ${detail || response.statusText}${retry ? ` (${retry}s)` : ''}` };
+          return updated;
+        });
+        return;
+      }
+
       const reader = response.body.getReader();
       const decoder = new TextDecoder();
       let acc = "";
@@ -8,25 +8,54 @@ const Console = ({ isDarkMode }) => {
   // CHANGEMENT ICI : On référence le CONTENEUR du scroll, pas la fin du texte
   const containerRef = useRef(null);
 
+  const [level, setLevel] = useState('');
+  const [filterText, setFilterText] = useState('');
+
   const API_URL = "http://localhost:11451/api/v1/system/logs";
+  const MAX_LINES = 500;
+
+  useEffect(() => {
+    // Filtrage côté serveur (niveau minimum + texte)
+    const params = new URLSearchParams();
+    if (level) params.set('level', level);
+    if (filterText) params.set('contains', filterText);
 
-  const fetchLogs = async () => {
-    try {
-      const response = await fetch(`${API_URL}?limit=100`);
-      const data = await response.json();
-      if (Array.isArray(data.logs)) {
-        setLogs(data.logs);
+    let source = null;
+    let cancelled = false;
+
+    const start = async () => {
+      let cursor = null;
+      // Dernières lignes une seule fois...
+      try {
+        const response = await fetch(`${API_URL}?limit=100&${params}`);
+        const data = await response.json();
+        if (cancelled) return;
+        if (Array.isArray(data.logs)) setLogs(data.logs);
+        cursor = data.cursor;
+      } catch (error) {
+        console.error("Failed to fetch logs:", error);
       }
-    } catch (error) {
-      console.error("Failed to fetch logs:", error);
-    }
-  };
+      if (cancelled) return;
 
-  useEffect(() => {
-    fetchLogs();
-    const interval = setInterval(fetchLogs, 2000);
-    return () => clearInterval(interval);
-  }, []);
+      // ... puis uniquement les nouvelles lignes, poussées à partir du curseur
+      if (cursor) params.set('cursor', cursor);
+      source = new EventSource(`${API_URL}/stream?${params}`);
+      source.onmessage = (e) => {
+        const data = JSON.parse(e.data);
+        // Lignes sautées côté serveur (rotation trop volumineuse) : trou signalé
+        const gap = data.truncated ? ["--- lignes de log omises ---"] : [];
+        setLogs((prev) => [...prev, ...gap, ...data.logs].slice(-MAX_LINES));
+      };
+    };
+
+    // Petit délai pour ne pas relancer une requête à chaque frappe
+    const timer = setTimeout(start, 300);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+      if (source) source.close();
+    };
+  }, [level, filterText]);
 
   // CHANGEMENT ICI : Logique de scroll "sécurisée"
   useEffect(() => {
@@ -54,6 +83,24 @@ const Console = ({ isDarkMode }) => {
             System Logs
           </span>
         </div>
+        <div className="flex items-center gap-2">
+          <select
+            value={level}
+            onChange={(e) => setLevel(e.target.value)}
+            className={`px-2 py-1.5 rounded-lg text-[10px] font-bold uppercase border bg-transparent ${isDarkMode ? 'text-white/70 border-white/10' : 'text-slate-600 border-black/10'}`}
+          >
+            <option value="">All</option>
+            <option value="INFO">Info+</option>
+            <option value="WARNING">Warning+</option>
+            <option value="ERROR">Error</option>
+          </select>
+          <input
+            type="text"
+            value={filterText}
+            onChange={(e) => setFilterText(e.target.value)}
+            placeholder="Filter..."
+            className={`w-32 px-2 py-1.5 rounded-lg text-[10px] border bg-transparent outline-none ${isDarkMode ? 'text-white/70 border-white/10 placeholder-white/30' : 'text-slate-600 border-black/10 placeholder-slate-400'}`}
+          />
         <button 
           onClick={copyLogs}
           className="flex items-center gap-2 px-3 py-1.5 rounded-lg text-[10px] font-bold uppercase border transition-all hover:scale-105 active:scale-95"
@@ -61,6 +108,7 @@ const Console = ({ isDarkMode }) => {
           {copied ? <Check size={12} className="text-emerald-500" /> : <Copy size={12} className={isDarkMode ? 'text-white/50' : 'text-slate-400'} />}
           <span className={isDarkMode ? 'text-white/70' : 'text-slate-600'}>{copied ? 'Copied' : 'Copy'}</span>
         </button>
+        </div>
       </div>
 
       {/* Zone de défilement des logs */}
@@ -2,6 +2,7 @@ import React, { useState, useEffect, useRef } from 'react';
 import { User, Sparkles, ChevronDown, Check, Sun, Moon, Activity, AlertTriangle } from 'lucide-react'; // Ajout des icônes santé
 import { useTheme } from '../contexts/ThemeContext';
 import { translations } from '../constants/translations';
+import { subscribe } from '../services/eventChannel';
 
 const TopBar = ({ activeTab, selectedModel, setSelectedModel, userName, language }) => {
   const [availableModels, setAvailableModels] = useState([]);
@@ -34,22 +35,16 @@ const TopBar = ({ activeTab, selectedModel, setSelectedModel, userName, language
     }
   };
 
-  // --- Fetch Santé Système (NOUVEAU) ---
-  const checkHealth = async () => {
-    try {
-      const res = await fetch("http://localhost:11451/api/v1/system/health");
-      if (!res.ok) throw new Error("Backend Error");
-      const data = await res.json();
-      setHealthStatus(data.status === 'healthy' ? 'ok' : 'error');
-    } catch (e) {
-      setHealthStatus('error');
-    }
-  };
-
   useEffect(() => {
-    fetchModels();
-    checkHealth(); // Premier check
-    const intervalHealth = setInterval(checkHealth, 10000); // Check toutes les 10s
+    // Liste détaillée rechargée seulement quand les modèles installés changent
+    const unsubscribeModels = subscribe("models", () => fetchModels());
+    // Santé poussée par le backend (sonde en arrière-plan), plus de polling
+    const unsubscribeHealth = subscribe("health", (data) => {
+      setHealthStatus(data.status === 'healthy' ? 'ok' : 'error');
+    });
+    const unsubscribeConnection = subscribe("connection", ({ connected }) => {
+      if (!connected) setHealthStatus('error');
+    });
 
     const handleClickOutside = (e) => { 
       if (dropdownRef.current && !dropdownRef.current.contains(e.target)) setIsOpen(false); 
@@ -58,7 +53,9 @@ const TopBar = ({ activeTab, selectedModel, setSelectedModel, userName, language
     
     return () => {
       document.removeEventListener("mousedown", handleClickOutside);
-      clearInterval(intervalHealth);
+      unsubscribeModels();
+      unsubscribeHealth();
+      unsubscribeConnection();
     };
   }, []);
 
@@ -15,6 +15,7 @@ import {
 import { useTheme } from '../contexts/ThemeContext';
 import Console from '../components/Console';
 import { translations } from '../constants/translations';
+import { subscribe } from '../services/eventChannel';
 import { Command } from '@tauri-apps/plugin-shell';
 
 const Dashboard = ({ systemStats, language, healthStatus = 'loading' }) => {
@@ -33,6 +34,9 @@ const Dashboard = ({ systemStats, language, healthStatus = 'loading' }) => {
 
   const t = translations[language] || translations.en;
 
+  // --- MODÈLES INSTALLÉS (poussés par le backend) ---
+  useEffect(() => subscribe("models", ({ models = [] }) => setInstalledModels(models)), []);
+
   // --- LANCEMENT AUTOMATIQUE DU BACKEND ---
   useEffect(() => {
     const startBackend = async () => {
@@ -106,7 +110,45 @@ const Dashboard = ({ systemStats, language, healthStatus = 'loading' }) => {
       .map(name => ({ name, size: 'Unknown', descKey: 'custom_desc', descDefault: 'User Installed', isInstalled: true }))
   ];
 
-  // --- FONCTION TÉLÉCHARGER (AVEC SIMULATION PROGRESS) ---
+  // --- PROGRESSION DES TÉLÉCHARGEMENTS (poussée par le backend) ---
+  const finishDownload = (modelName, delay) => {
+    setTimeout(() => {
+      setDownloadingModels(prev => {
+        const next = new Set(prev);
+        next.delete(modelName);
+        return next;
+      });
+      setDownloadProgress(prev => {
+        const { [modelName]: _, ...rest } = prev;
+        return rest; // Supprime la progression
+      });
+    }, delay);
+  };
+
+  const applyPullState = (job) => {
+    if (job.status === 'queued' || job.status === 'running') {
+      setDownloadingModels(prev => prev.has(job.model) ? prev : new Set(prev).add(job.model));
+      setDownloadProgress(prev => ({ ...prev, [job.model]: Math.floor(job.percent) }));
+    } else if (job.status === 'completed') {
+      // Fin : 100% pendant 2 secondes
+      setDownloadProgress(prev => ({ ...prev, [job.model]: 100 }));
+      finishDownload(job.model, 2000);
+    } else {
+      if (job.status === 'failed') alert(job.error || t.dash?.error || "Error downloading model");
+      finishDownload(job.model, 0);
+    }
+  };
+
+  useEffect(() => {
+    // Téléchargements déjà en cours (reprise après redémarrage, autre fenêtre...)
+    fetch("http://localhost:11451/api/v1/models/pulls")
+      .then(res => res.json())
+      .then(jobs => jobs.filter(j => j.status === 'queued' || j.status === 'running').forEach(applyPullState))
+      .catch(() => {});
+    return subscribe("pulls", applyPullState);
+  }, []);
+
+  // --- FONCTION TÉLÉCHARGER ---
   const downloadModel = async (modelName) => {
     if (downloadingModels.has(modelName)) return;
 
@@ -115,62 +157,18 @@ const Dashboard = ({ systemStats, language, healthStatus = 'loading' }) => {
     setDownloadProgress(prev => ({ ...prev, [modelName]: 0 })); // Commence à 0%
 
     try {
-      // 2. Lancer la commande Backend
-      await fetch("http://localhost:11451/api/v1/models/pull", {
+      // 2. Mise en file côté backend ; la progression réelle arrive sur le topic "pulls"
+      const res = await fetch("http://localhost:11451/api/v1/models/pull", {
         method: 'POST',
         headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
         body: `model_name=${encodeURIComponent(modelName)}`
       });
-
-      // 3. Simulation de la barre de progression (0% -> 95%)
-      // On utilise un timer local pour ce modèle
-      const timer = setInterval(() => {
-        setDownloadProgress(prev => {
-          const current = prev[modelName] || 0;
-          if (current < 95) {
-            return { ...prev, [modelName]: current + 1 }; // Monte doucement
-          }
-          return prev;
-        });
-      }, 300); // Update toutes les 300ms
-
-      // 4. Vérification réelle (Est-ce que c'est fini ?)
-      const checkInterval = setInterval(async () => {
-        try {
-          const r = await fetch("http://localhost:11451/api/v1/models");
-          const d = await r.json();
-          const names = d.models ? d.models.map(m => m.name) : [];
-          
-          // Si le modèle est dans la liste, il est téléchargé !
-          if (names.includes(modelName)) {
-            // Arrêt des timers
-            clearInterval(timer);
-            clearInterval(checkInterval);
-
-            // Fin : 100% pendant 2 secondes
-            setDownloadProgress(prev => ({ ...prev, [modelName]: 100 }));
-            
-            setTimeout(() => {
-               // Nettoyage des états
-               setDownloadingModels(prev => {
-                 const next = new Set(prev);
-                 next.delete(modelName);
-                 return next;
-               });
-               setDownloadProgress(prev => {
-                 const { [modelName]: _, ...rest } = prev;
-                 return rest; // Supprime la progression
-               });
-            }, 2000);
-          }
-        } catch (e) { console.log("Attente fin DL..."); }
-      }, 3000); // Vérification toutes les 3 secondes
-
+      if (!res.ok) throw new Error((await res.json()).detail);
     } catch (e) {
       console.error("Erreur téléchargement:", e);
       alert(t.dash?.error || "Error downloading model");
       // Reset en cas d'erreur
-      setDownloadingModels(prev => { const next = new Set(prev); next.delete(modelName); return next; });
+      finishDownload(modelName, 0);
     }
   };
 
@@ -0,0 +1,80 @@
+// Canal d'événements partagé : une seule connexion SSE vers le backend pour
+// toute l'application (télémétrie, santé, modèles, téléchargements).
+const EVENTS_URL = "http://localhost:11451/api/v1/events";
+const STATE_TOPICS = ["telemetry", "health", "models"];
+// "logs" n'est pas demandé : la Console lit le flux du fichier de log, et le
+// serveur ne pousse les lignes de log qu'aux clients abonnés à ce topic
+const STREAM_TOPICS = ["pulls"];
+const TOPICS = [...STATE_TOPICS, ...STREAM_TOPICS];
+
+const listeners = {};
+const state = {};
+let source = null;
+
+const isObject = (value) => typeof value === "object" && value !== null && !Array.isArray(value);
+
+// Fusionne un delta : les sous-objets sont fusionnés, null est une valeur comme une autre
+const mergeDelta = (target, delta) => {
+  const next = { ...(target || {}) };
+  Object.entries(delta).forEach(([key, value]) => {
+    next[key] = isObject(value) && isObject(next[key]) ? mergeDelta(next[key], value) : value;
+  });
+  return next;
+};
+
+// Supprime le champ désigné par `path` (copie les objets traversés)
+const removePath = (target, [key, ...rest]) => {
+  if (!isObject(target) || !(key in target)) return target;
+  const next = { ...target };
+  if (rest.length) next[key] = removePath(next[key], rest);
+  else delete next[key];
+  return next;
+};
+
+const applyDelta = (target, delta, deleted = []) => deleted.reduce(removePath, mergeDelta(target, delta));
+
+const emit = (topic, payload) => {
+  (listeners[topic] || []).forEach((cb) => cb(payload));
+};
+
+const handleMessage = (topic) => (e) => {
+  const { type, data, deleted } = JSON.parse(e.data);
+  if (STATE_TOPICS.includes(topic)) {
+    state[topic] = type === "delta" ? applyDelta(state[topic], data, deleted) : data;
+    emit(topic, state[topic]);
+  } else {
+    emit(topic, data);
+  }
+};
+
+const connect = () => {
+  if (source) return;
+  source = new EventSource(`${EVENTS_URL}?topics=${TOPICS.join(",")}`);
+  TOPICS.forEach((topic) => {
+    source.addEventListener(topic, handleMessage(topic));
+  });
+  // EventSource se reconnecte seul ; le serveur renvoie un instantané complet
+  source.onerror = () => emit("connection", { connected: false });
+  source.onopen = () => emit("connection", { connected: true });
+};
+
+const disconnect = () => {
+  if (source) {
+    source.close();
+    source = null;
+  }
+};
+
+// Abonnement à un topic ; renvoie la fonction de désabonnement (pour useEffect)
+export const subscribe = (topic, cb) => {
+  (listeners[topic] = listeners[topic] || []).push(cb);
+  // Rejoue le dernier état connu (en différé : l'appelant récupère d'abord son désabonnement)
+  if (state[topic]) {
+    queueMicrotask(() => listeners[topic].includes(cb) && cb(state[topic]));
+  }
+  connect();
+  return () => {
+    listeners[topic] = listeners[topic].filter((l) => l !== cb);
+    if (Object.values(listeners).every((l) => l.length === 0)) disconnect();
+  };
+};
@@ -1,10 +1,67 @@
+import json
 import subprocess
 import os
 import time
 import sys
+import urllib.request
 import webbrowser
 
+OLLAMA_URL = "http://127.0.0.1:11434"
+BACKEND_URL = "http://localhost:11451"
+
+# Attente maximale de chaque service (secondes)
+OLLAMA_TIMEOUT = 60
+BACKEND_TIMEOUT = 60
+
+
+def probe(url, timeout=1.0):
+    """True si `url` répond 200."""
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return response.status == 200
+    except Exception:
+        return False
+
+
+def wait_ready(url, timeout, process=None, delay=0.05, max_delay=0.25):
+    """
+    Sonde `url` avec un backoff exponentiel (50 ms, 75 ms... 250 ms) : rend la
+    main dès que le service répond. Renvoie la durée d'attente, ou None si le
+    délai est dépassé ou si `process` s'est arrêté entre-temps.
+    """
+    start = time.perf_counter()
+    while True:
+        if probe(url):
+            return time.perf_counter() - start
+        if process is not None and process.poll() is not None:
+            return None
+        remaining = timeout - (time.perf_counter() - start)
+        if remaining <= 0:
+            return None
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 1.5, max_delay)
+
+
+def print_startup_report(launched):
+    """Temps de démarrage vus du lanceur, puis détail du backend (imports les plus lents)."""
+    print("\n--- TEMPS DE DEMARRAGE ---")
+    for name, elapsed in launched.items():
+        print(f"{name:<22} {'non prêt' if elapsed is None else f'{elapsed:.2f} s'}")
+    try:
+        with urllib.request.urlopen(f"{BACKEND_URL}/api/v1/system/startup?limit=5", timeout=2) as response:
+            report = json.load(response)
+    except Exception:
+        return
+    stages = ", ".join(f"{name} {ms:.0f} ms" for name, ms in report["stages_ms"].items())
+    print(f"{'backend':<22} {stages}")
+    for module in report["imports"]:
+        print(f"  import {module['module']:<30} {module['total_ms']:>7.1f} ms")
+
+
 def start_horizon():
+    launched_at = time.perf_counter()
+    launched = {}
+
     # Chemins racine
     root_dir = os.path.dirname(os.path.abspath(__file__))
     ollama_bin = os.path.join(root_dir, "bin", "ollama.exe")
@@ -19,32 +76,46 @@ def start_horizon():
 
     print("--- HORIZON AI : DEMARRAGE DU SYSTEME ---")
 
-    # 1. Lancement d'Ollama (sans fenêtre)
-    if os.path.exists(ollama_bin):
-        print("[OLLAMA] Initialisation du moteur IA...")
-        subprocess.Popen(
-            [ollama_bin, "serve"],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
-        )
-        time.sleep(2)
+    # 1. Ollama est lancé et supervisé par le backend (relancé s'il s'arrête),
+    # sauf s'il répond déjà : on lui indique seulement l'exécutable portable
+    if probe(f"{OLLAMA_URL}/api/tags"):
+        print("[OLLAMA] Moteur IA déjà actif.")
+        launched["ollama"] = 0.0
+    elif os.path.exists(ollama_bin):
+        print("[OLLAMA] Initialisation du moteur IA par le serveur...")
+        os.environ["OLLAMA_BINARY"] = ollama_bin
     else:
-        print("[ERREUR] ollama.exe non trouvé dans /bin/")
-        sys.exit(1)
+        print("[ATTENTION] ollama.exe non trouvé dans /bin/ : 'ollama' du PATH sera utilisé")
 
     # 2. Lancement du Backend (qui sert le Frontend sur le port 11451)
-    print("[SERVER] Démarrage de l'interface sur http://localhost:11451")
+    print(f"[SERVER] Démarrage de l'interface sur {BACKEND_URL}")
     # On spécifie le cwd pour que les chemins relatifs dans main.py fonctionnent
     backend_proc = subprocess.Popen([venv_python, "app/main.py"], cwd=backend_dir)
 
-    # 3. Ouverture du navigateur après une courte attente
-    time.sleep(4)
-    webbrowser.open("http://localhost:11451")
+    # 3. Ouverture du navigateur dès que le backend répond
+    if wait_ready(f"{BACKEND_URL}/api/v1/system/health", BACKEND_TIMEOUT, backend_proc) is None:
+        if backend_proc.poll() is not None:
+            print(f"[ERREUR] Le serveur s'est arrêté au démarrage (code {backend_proc.returncode})")
+            sys.exit(1)
+        print(f"[ATTENTION] Le serveur ne répond pas après {BACKEND_TIMEOUT} s")
+        launched["serveur"] = None
+    else:
+        launched["serveur"] = time.perf_counter() - launched_at
+    webbrowser.open(BACKEND_URL)
+    launched["navigateur"] = time.perf_counter() - launched_at
+
+    if "ollama" not in launched:
+        remaining = max(0.0, OLLAMA_TIMEOUT - (time.perf_counter() - launched_at))
+        if wait_ready(f"{OLLAMA_URL}/api/tags", remaining) is None:
+            print(f"[ATTENTION] Ollama ne répond pas après {OLLAMA_TIMEOUT} s")
+            launched["ollama"] = None
+        else:
+            launched["ollama"] = time.perf_counter() - launched_at
 
+    print_startup_report(launched)
     print("\n[OK] Horizon AI est prêt !")
     print("Gardez cette fenêtre ouverte pour maintenir les services actifs.")
-    
+
     try:
         backend_proc.wait()
     except KeyboardInterrupt:
@@ -52,4 +123,4 @@ def start_horizon():
         backend_proc.terminate()
 
 if __name__ == "__main__":
-    start_horizon()
\ No newline at end of file
+    start_horizon()